@@ -0,0 +1,9 @@
+from helpers.asgi_adapter import AsgiAdapter
+from main import app as wsgi_app
+
+# Fichier asgi.py , l'application Flask servie par un serveur ASGI (mode asgi , voir helpers/asgi_adapter.py) :
+#   SERVER_MODE=asgi gunicorn -c gunicorn.conf.py   (workers uvicorn.workers.UvicornWorker)
+#   uvicorn asgi:app --port 3000
+# uvicorn n'est pas dans requirements.txt , il est installe seulement pour ce mode (pip install uvicorn)
+
+app = AsgiAdapter(wsgi_app)
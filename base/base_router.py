@@ -1,16 +1,48 @@
-from flask import Blueprint
+from functools import wraps
+
+from flask import Blueprint, make_response, request
+
+from helpers.data_encoder import requested_format
+from helpers.model_registry import model_registry
+from helpers.response_cache import response_cache
 
 
 class BaseRouter:
+    # une instance par schema de validation , partagee par les requetes (creer un Schema a chaque requete
+    # reconstruit ses champs)
+    schemas = {}
+
     def __init__(self,name:str,file_name):
         self.router = Blueprint(name,file_name)
 
+    def schema(self,schema_class):
+        schema = self.schemas.get(schema_class)
+        if schema is None:
+            schema = self.schemas.setdefault(schema_class,schema_class())
+        return schema
+
     def get(self,path:str,name:str,command):
         self.router.add_url_rule(path,name,command,methods=["GET"])
 
     def post(self,path:str,name:str,command):
         self.router.add_url_rule(path,name,command,methods=["POST"])
 
+    # route POST dont la reponse est gardee dans le cache des reponses (avec ETag et 304)
+    def post_cached(self,path:str,name:str,command):
+        self.router.add_url_rule(path,name,self.registered_model(response_cache.cached(command)),methods=["POST"])
+
+    # le model_id est verifie avant le cache des reponses : une reponse gardee pour un modele supprime
+    # (DELETE /models/<id>) ou expire n'est plus servie
+    def registered_model(self,command):
+        @wraps(command)
+        def wrapper(*args,**kwargs):
+            payload = request.get_json(silent=True)
+            model_id = payload.get("model_id") if isinstance(payload,dict) else None
+            if model_id and model_registry.resolve(str(model_id)) is None:
+                return {"error": str({"model_id": ["Unknown or expired model."]})}, 400
+            return command(*args,**kwargs)
+        return wrapper
+
     def patch(self,path:str,name:str,command):
         self.router.add_url_rule(path,name,command,methods=["PATCH"])
 
@@ -18,4 +50,31 @@ class BaseRouter:
         self.router.add_url_rule(path,name,command,methods=["PUT"])
 
     def delete(self,path:str,name:str,command):
-        self.router.add_url_rule(path,name,command,methods=["DELETE"])
\ No newline at end of file
+        self.router.add_url_rule(path,name,command,methods=["DELETE"])
+
+    # options de sortie communes (voir validation/options_validation.py) , passees aux methodes du Service
+    def extract_options(self,data):
+        return {"output_format": requested_format(data.get("format")), "dtype": data.get("dtype", "float64")}
+
+    # format demande par l'entete Accept (l'attribut "format" est deja valide) que la route ne produit pas : 406
+    def unsupported_format(self,output_format:str,formats:tuple):
+        if output_format in formats:
+            return None
+        return {"error": f"This route returns {' or '.join(formats)}, not {output_format}."}, 406
+
+    # options du renderer svg (voir validation/options_validation.RenderOptions) , passees a step , impulse , ramp , bode
+    def render_options(self,data):
+        return {"renderer": data.get("renderer"), "simplify": data.get("simplify")}
+
+    # modele retourne par une conversion (close_loop , tf_to_ss , ss_to_tf , reduce) : si la requete utilise un
+    # modele enregistre , le resultat est enregistre aussi , son identifiant est dans la reponse JSON et l'entete
+    # X-Model-Id (voir helpers/model_registry.py)
+    def register_output(self,response,data,kind:str,arrays:dict):
+        if not data.get("model_id"):
+            return response
+        model = model_registry.register(kind,arrays)
+        if isinstance(response,dict):
+            response["model_id"] = model.id
+        response = make_response(response)
+        response.headers["X-Model-Id"] = model.id
+        return response
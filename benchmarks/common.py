@@ -0,0 +1,59 @@
+import os
+import resource
+import time
+
+import numpy as np
+
+# Outils communs aux scripts de benchmark (executer depuis la racine du projet ,
+# par exemple : python -m benchmarks.figure_soak)
+
+
+# memoire residente actuelle du processus en Mo (linux : /proc/self/statm)
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+# pic de memoire residente du processus en Mo
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024  # ru_maxrss est en Ko sous linux
+
+
+# executer `function` `repeat` fois et retourner les durees (secondes)
+def measure(function, repeat: int = 20, warmup: int = 2) -> np.ndarray:
+    for _ in range(warmup):
+        function()
+    durations = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations[i] = time.perf_counter() - start
+    return durations
+
+
+def summarize(durations) -> dict:
+    durations = np.asarray(durations)
+    return {
+        "mean_ms": float(durations.mean() * 1e3),
+        "p50_ms": float(np.percentile(durations, 50) * 1e3),
+        "p95_ms": float(np.percentile(durations, 95) * 1e3),
+        "p99_ms": float(np.percentile(durations, 99) * 1e3),
+    }
+
+
+def print_table(rows: list, columns: list):
+    widths = [max(len(str(column)), *(len(format_cell(row.get(column))) for row in rows)) for column in columns]
+    print("  ".join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(format_cell(row.get(column)).ljust(width) for column, width in zip(columns, widths)))
+
+
+def format_cell(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
@@ -0,0 +1,85 @@
+import argparse
+import threading
+
+import numpy as np
+
+from benchmarks.common import rss_mb
+from helpers.figure_engine import figure_engine
+
+# Test d'endurance du moteur de figures : N rendus (temporel , bode , poles-zeros , nyquist)
+# avec des donnees differentes a chaque fois , la memoire residente doit rester stable.
+# L'option --pyplot execute le meme test avec l'ancienne methode (plt.figure sans plt.close)
+# pour comparer.
+#
+#   python -m benchmarks.figure_soak --renders 10000 --threads 4
+
+
+def render_engine(i: int):
+    t = np.linspace(0, 10, 1000)
+    y = 1 - np.exp(-t / (1 + i % 7)) * np.cos((1 + i % 5) * t)
+    kind = i % 4
+    if kind == 0:
+        figure_engine.time_plot(t, y, title=f"Step Response {i}", xlim=[0, 10], ylim=[-1, 2])
+    elif kind == 1:
+        omega = np.logspace(-1, 2, 1000)
+        response = 1 / (1j * omega + 1 + i % 3)
+        figure_engine.bode_plot(omega, 20 * np.log10(np.abs(response)), np.degrees(np.angle(response)))
+    elif kind == 2:
+        figure_engine.pole_zero_plot(np.array([-1 + 1j * (i % 4), -1 - 1j * (i % 4)]), np.array([-0.5 - i % 3]))
+    else:
+        response = 1 / (1j * np.logspace(-2, 2, 1000) + 1) ** (1 + i % 3)
+        figure_engine.nyquist_plot(response.real, response.imag)
+
+
+def render_pyplot(i: int):
+    import io
+    import matplotlib
+    matplotlib.use("SVG")
+    import matplotlib.pyplot as plt
+
+    t = np.linspace(0, 10, 1000)
+    plt.figure(figsize=(8, 6))
+    plt.plot(t, 1 - np.exp(-t / (1 + i % 7)))
+    plt.grid(True)
+    plt.savefig(io.BytesIO(), format="svg")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--report-every", type=int, default=1000)
+    parser.add_argument("--pyplot", action="store_true", help="ancienne methode pyplot (pour comparer)")
+    args = parser.parse_args()
+
+    render = render_pyplot if args.pyplot else render_engine
+    counter = iter(range(args.renders))
+    lock = threading.Lock()
+    samples = []
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            render(i)
+            if (i + 1) % args.report_every == 0:
+                with lock:
+                    samples.append((i + 1, rss_mb()))
+                    print(f"{i + 1:>7} renders  rss={samples[-1][1]:.1f} MB", flush=True)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if len(samples) >= 2:
+        # la croissance est mesuree apres le premier palier (creation des modeles , caches des polices)
+        growth = samples[-1][1] - samples[0][1]
+        print(f"growth after warm-up: {growth:+.1f} MB over {samples[-1][0] - samples[0][0]} renders")
+
+
+if __name__ == "__main__":
+    main()
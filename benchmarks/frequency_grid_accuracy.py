@@ -0,0 +1,79 @@
+import argparse
+import time
+import warnings
+
+import control as ctrl
+import numpy as np
+
+from benchmarks.common import print_table
+from helpers.system_cache import system_cache
+from services.service import Service
+
+# Precision de la grille des frequences adaptee aux poles et zeros (helpers/frequency_grid.py)
+# par rapport a l'ancienne grille np.logspace(a, b, 1000) du diagramme de bode :
+# les deux courbes (amplitude en dB) sont interpolees (en log(omega)) sur une grille de reference tres dense
+# et l'erreur maximale est donnee en dB.
+# Les marges de stabilite calculees sur la grille sont comparees a ctrl.stability_margins.
+#
+#   python -m benchmarks.frequency_grid_accuracy
+
+SYSTEMS = {
+    "first order": ([1], [1, 1]),
+    "second order (zeta=0.2)": ([1], [1, 0.4, 1]),
+    "lightly damped (zeta=0.002)": ([1], [1, 0.004, 1]),
+    "notch": ([1, 0.01, 4], [1, 2, 4]),
+    "stiff (poles -1 , -1000)": ([1000], [1, 1001, 1000]),
+    "integrator": ([10], [1, 1, 0]),
+    "third order": ([10], [1, 3, 3, 1]),
+}
+
+REFERENCE_POINTS = 200000
+
+
+def max_error_db(system, service, omega, x_axis) -> float:
+    reference = np.logspace(x_axis[0], x_axis[1], REFERENCE_POINTS)
+    exact = 20 * np.log10(np.abs(service.frequency_response(system, reference)))
+    magnitude = 20 * np.log10(np.abs(service.frequency_response(system, omega)))
+    return float(np.max(np.abs(np.interp(np.log(reference), np.log(omega), magnitude) - exact)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--x-axis", type=float, nargs=2, default=[-1, 2])
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    service = Service()
+    rows = []
+    for name, (num, den) in SYSTEMS.items():
+        system = system_cache.tf(num, den)
+        fixed = np.logspace(args.x_axis[0], args.x_axis[1], 1000)
+        adaptive, _ = service.frequency_grid(system, args.x_axis)
+
+        start = time.perf_counter()
+        expected = ctrl.stability_margins(system)
+        ctrl_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        margins = service.stability_margins(system)
+        grid_ms = (time.perf_counter() - start) * 1e3
+        with np.errstate(invalid="ignore"):
+            difference = np.nanmax(np.abs(np.subtract(margins, expected)), initial=0.0)
+
+        rows.append({
+            "system": name,
+            "fixed points": len(fixed),
+            "adaptive points": len(adaptive),
+            "fixed error dB": max_error_db(system, service, fixed, args.x_axis),
+            "adaptive error dB": max_error_db(system, service, adaptive, args.x_axis),
+            "nyquist points": len(service.nyquist_data(system)["omega"]),
+            "margins diff": float(difference),
+            "ctrl margins ms": ctrl_ms,
+            "grid margins ms": grid_ms,
+        })
+
+    print_table(rows, ["system", "fixed points", "adaptive points", "fixed error dB", "adaptive error dB",
+                       "nyquist points", "margins diff", "ctrl margins ms", "grid margins ms"])
+
+
+if __name__ == "__main__":
+    main()
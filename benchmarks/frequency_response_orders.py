@@ -0,0 +1,77 @@
+import argparse
+import warnings
+
+import control as ctrl
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from helpers.frequency_response import polynomial_response, schur_form, state_space_response
+from helpers.simulator import modal_form
+
+# Vitesse et precision de la reponse frequentielle (helpers/frequency_response.py) par rapport a
+# ctrl.frequency_response pour des modeles d'etat stables aleatoires d'ordre 2 a 500 et pour les fonctions
+# de transfert equivalentes (Horner). Les temps "modal" et "schur" comprennent la decomposition de A
+# (eig ou schur) , les temps "warm" la reutilisent (modele deja dans le cache des systemes).
+# L'erreur est relative , par rapport a python-control.
+#
+#   python -m benchmarks.frequency_response_orders --orders 2 10 50 200 500 --points 1000
+
+
+def random_system(order: int, rng):
+    A = rng.normal(size=(order, order)) / np.sqrt(order)
+    A -= (np.linalg.eigvals(A).real.max() + 0.2) * np.eye(order)
+    return A, rng.normal(size=(order, 1)), rng.normal(size=(1, order)), np.zeros((1, 1))
+
+
+def relative_error(response, reference) -> str:
+    return f"{np.max(np.abs(response - reference) / np.abs(reference)):.1e}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[2, 10, 50, 200, 500])
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    rng = np.random.default_rng(0)
+    omega = np.logspace(-2, 3, args.points)
+    rows = []
+    for order in args.orders:
+        A, B, C, D = random_system(order, rng)
+        system = ctrl.ss(A, B, C, D)
+        modes = modal_form(A, B, C)
+        schur = schur_form(A, B, C)
+        reference = ctrl.frequency_response(system, omega).fresp[0, 0]
+        row = {"order": order, "points": args.points}
+        row["control ms"] = summarize(measure(lambda: ctrl.frequency_response(system, omega),
+                                              args.repeat, 0))["p50_ms"]
+
+        row["schur ms"] = summarize(measure(lambda: state_space_response(A, B, C, D, omega), args.repeat, 0))["p50_ms"]
+        row["schur warm ms"] = summarize(measure(lambda: state_space_response(A, B, C, D, omega, schur=schur),
+                                                 args.repeat, 0))["p50_ms"]
+        row["schur error"] = relative_error(state_space_response(A, B, C, D, omega, schur=schur)[0, 0], reference)
+        if modes is not None:
+            row["modal ms"] = summarize(measure(lambda: state_space_response(A, B, C, D, omega, modal_form(A, B, C)),
+                                                args.repeat, 0))["p50_ms"]
+            row["modal warm ms"] = summarize(measure(lambda: state_space_response(A, B, C, D, omega, modes),
+                                                     args.repeat, 0))["p50_ms"]
+            row["modal error"] = relative_error(state_space_response(A, B, C, D, omega, modes)[0, 0], reference)
+
+        # meme modele en fonction de transfert (les coefficients deviennent mal conditionnes aux ordres eleves)
+        if order <= 50:
+            transfer = ctrl.ss2tf(system)
+            num, den = transfer.num[0][0], transfer.den[0][0]
+            row["tf control ms"] = summarize(measure(lambda: ctrl.frequency_response(transfer, omega),
+                                                     args.repeat, 1))["p50_ms"]
+            row["tf horner ms"] = summarize(measure(lambda: polynomial_response(num, den, 1j * omega),
+                                                    args.repeat, 1))["p50_ms"]
+        rows.append(row)
+
+    print_table(rows, ["order", "points", "control ms", "schur ms", "schur warm ms", "schur error", "modal ms",
+                       "modal warm ms", "modal error", "tf control ms", "tf horner ms"])
+
+
+if __name__ == "__main__":
+    main()
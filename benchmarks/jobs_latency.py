@@ -0,0 +1,84 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+from benchmarks.common import measure, print_table, summarize
+
+# Latence d'une petite requete synchrone (/tf/step/performance) pendant qu'une analyse longue (/tf/sweep dense)
+# occupe le serveur : executee directement dans un thread du serveur (comme avant /jobs) , ou soumise a /jobs
+# (executee par le pool de processus , voir helpers/job_pool.py). Donne aussi le temps total d'un job
+# (soumission -> resultat , attente longue) par rapport a l'appel direct de la meme route.
+#
+#   python -m benchmarks.jobs_latency --requests 50 --workers 2
+
+SMALL = {"num": [1], "den": [1, 2, 1]}
+LONG = {
+    "num": [1],
+    "den": [1, 3, 3, 1],
+    "parameters": [
+        {"target": "gain", "start": 0.1, "stop": 20, "count": 200},
+        {"target": "den", "index": 1, "start": 1, "stop": 6, "count": 200},
+    ],
+}
+
+
+def latency(client, count: int) -> dict:
+    return summarize(measure(lambda: client.post("/tf/step/performance", json=SMALL), count, 1))
+
+
+def run_job(client, path: str, payload: dict):
+    job = client.post("/jobs", json={"model": "tf", "analysis": path, "payload": payload, "timeout": 600}).get_json()
+    while client.get(f"/jobs/{job['id']}?wait=30").get_json()["status"] in ("queued", "running"):
+        pass
+    return client.get(f"/jobs/{job['id']}/result")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    os.environ.setdefault("JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))
+    os.environ["JOBS_MAX_WORKERS"] = str(args.workers)
+
+    from server import Server
+    client = Server().app.test_client()
+    rows = [{"case": "idle", **latency(client, args.requests)}]
+
+    start = time.perf_counter()
+    client.post("/tf/sweep", json=LONG)
+    direct = time.perf_counter() - start
+
+    # analyse longue dans un thread du serveur : la requete courte partage le GIL avec elle
+    thread = threading.Thread(target=lambda: client.post("/tf/sweep", json=LONG))
+    thread.start()
+    rows.append({"case": "long analysis in server thread", **latency(client, args.requests)})
+    thread.join()
+
+    # premier job : demarrage des processus (import de control , matplotlib)
+    start = time.perf_counter()
+    run_job(client, "step/performance", SMALL)
+    startup = time.perf_counter() - start
+
+    jobs = threading.Thread(target=lambda: run_job(client, "sweep", LONG))
+    jobs.start()
+    time.sleep(0.2)
+    rows.append({"case": "long analysis in /jobs", **latency(client, args.requests)})
+    jobs.join()
+
+    start = time.perf_counter()
+    run_job(client, "sweep", LONG)
+    job = time.perf_counter() - start
+
+    print_table(rows, ["case", "p50_ms", "p95_ms", "p99_ms"])
+    print()
+    print_table([{"sweep direct ms": direct * 1e3, "sweep job ms": job * 1e3, "pool startup ms": startup * 1e3}],
+                ["sweep direct ms", "sweep job ms", "pool startup ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import http.client
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import print_table, summarize
+from benchmarks.reference_models import reference_models
+
+# Test de charge local : le serveur est demarre dans un sous-processus avec chaque configuration ,
+# des clients (threads , connexions keep-alive) repartis sur --processes processus envoient les requetes
+# d'un scenario pendant --duration secondes , pour chaque nombre de clients de --clients.
+# - dev : python main.py (serveur de Werkzeug , Procfile d'avant) sans chauffe
+# - gunicorn default : gunicorn main:app sans configuration (Dockerfile d'avant : un worker sync) sans chauffe
+# - gunicorn conf : gunicorn -c gunicorn.conf.py (workers gthread , preload , chauffe , voir config.py)
+# - asgi : SERVER_MODE=asgi gunicorn -c gunicorn.conf.py (seulement si uvicorn est installe)
+#
+# Scenarios (--scenario) :
+# - mixed : /step json , /bode svg native et matplotlib , /step/performance , /analyze , gain aleatoire
+#   (pas de reponse servie par le cache)
+# - cached : les memes requetes avec un petit nombre de gains (reponses servies par le cache apres le debut)
+# - models : les modeles de reference (benchmarks/reference_models.py) sur /ss et /tf , calculs en json
+# - heavy : /sweep et modeles d'etat d'ordre 100 (requetes longues qui occupent les workers)
+#
+#   python -m benchmarks.load_test --clients 8 --duration 20
+#   python -m benchmarks.load_test --configs gunicorn_conf --scenario models --clients 1 4 16 --processes 4
+#   python -m benchmarks.load_test --configs gunicorn_conf --env SERVER_WORKERS=4 SERVER_THREADS=8
+
+MODEL = {"den": [1, 3, 3, 1]}
+MIX = [
+    ("/tf/step", {**MODEL, "t_max": 10, "x_axis": [0, 10], "y_axis": [-1, 2], "format": "json"}),
+    ("/tf/bode", {**MODEL, "t_max": 10, "x_axis": [-2, 2], "format": "svg", "renderer": "native"}),
+    ("/tf/step/performance", MODEL),
+    ("/tf/analyze", {**MODEL, "analyses": ["step", "bode", "step_performance", "bode_performance"],
+                     "format": "json"}),
+    ("/tf/bode", {**MODEL, "t_max": 10, "x_axis": [-2, 2], "format": "svg", "renderer": "matplotlib"}),
+]
+
+
+def model_requests(names=None) -> list:
+    requests = []
+    for model_type, models in reference_models().items():
+        for name, model in models.items():
+            if names is not None and name not in names:
+                continue
+            requests += [
+                (f"/{model_type}/step", {**model, "t_max": 20, "x_axis": [0, 20], "y_axis": [-2, 2],
+                                         "format": "json"}),
+                (f"/{model_type}/bode", {**model, "t_max": 20, "x_axis": [-3, 3], "format": "json"}),
+                (f"/{model_type}/step/performance", model),
+                (f"/{model_type}/bode/performance", model),
+            ]
+    return requests
+
+
+# scenario -> (requetes , gains) : gains None = gain aleatoire a chaque requete
+def scenario_requests(name: str):
+    if name == "mixed":
+        return MIX, None
+    if name == "cached":
+        return MIX, [0.5, 1.0, 2.0]
+    if name == "models":
+        return model_requests(), None
+    if name == "heavy":
+        sweep = {**MODEL, "parameters": [{"target": "gain", "start": 0.1, "stop": 10, "count": 400, "scale": "log"}]}
+        return model_requests(["ss order 100"]) + [("/tf/sweep", sweep)], None
+    raise ValueError(f"unknown scenario {name}")
+
+
+SCENARIOS = ("mixed", "cached", "models", "heavy")
+
+CONFIGS = {
+    "dev": ([sys.executable, "main.py"], {"STARTUP_WARMUP": "0"}),
+    "gunicorn_default": ([sys.executable, "-m", "gunicorn", "--bind", "127.0.0.1:{port}", "main:app"],
+                         {"STARTUP_WARMUP": "0"}),
+    "gunicorn_conf": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], {}),
+    "asgi": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], {"SERVER_MODE": "asgi"}),
+}
+
+
+def start_server(name: str, port: int, extra_env: dict, timeout: float) -> subprocess.Popen:
+    command, env = CONFIGS[name]
+    env = dict(os.environ, SERVER_HOST="127.0.0.1", SERVER_PORT=str(port), **env, **extra_env)
+    process = subprocess.Popen([part.format(port=port) for part in command], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} did not start in {timeout} seconds")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# gain de la requete : numerateur multiplie (/tf) ou matrice C multipliee (/ss)
+def with_gain(payload: dict, gain: float) -> dict:
+    if "C" in payload:
+        return {**payload, "C": [[gain * value for value in row] for row in payload["C"]]}
+    return {**payload, "num": [gain * value for value in payload.get("num", [1])]}
+
+
+# un client : requetes du scenario , la connexion est gardee (keep-alive) et rouverte si le serveur la ferme
+def client(port: int, scenario: str, stop: float, durations: list, errors: list, seed: int):
+    requests, gains = scenario_requests(scenario)
+    generator = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    while time.monotonic() < stop:
+        path, payload = generator.choice(requests)
+        gain = generator.choice(gains) if gains else generator.uniform(0.5, 2)
+        body = json.dumps(with_gain(payload, gain))
+        start = time.perf_counter()
+        try:
+            connection.request("POST", path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            continue
+        durations.append(time.perf_counter() - start)
+
+
+# clients d'un processus generateur de charge (threads) , resultats envoyes au processus principal
+def generator_main(port: int, scenario: str, duration: float, seeds: list, results):
+    durations, errors = [], []
+    start = time.monotonic()
+    stop = start + duration
+    threads = [threading.Thread(target=client, args=(port, scenario, stop, durations, errors, seed))
+               for seed in seeds]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((durations, len(errors), time.monotonic() - start))
+
+
+# les clients sont repartis sur `processes` processus (le client http en python ne limite pas le debit mesure)
+def load(port: int, scenario: str, clients: int, duration: float, processes: int = 1) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = max(min(processes, clients), 1)
+    generators = [context.Process(target=generator_main,
+                                  args=(port, scenario, duration, list(range(i, clients, processes)), results))
+                  for i in range(processes)]
+    for generator in generators:
+        generator.start()
+    # debit sur la fenetre de mesure des generateurs (sans leur demarrage)
+    durations, errors, elapsed = [], 0, 0.0
+    for _ in generators:
+        chunk, failed, window = results.get()
+        durations += chunk
+        errors += failed
+        elapsed = max(elapsed, window)
+    for generator in generators:
+        generator.join()
+    return {"requests": len(durations), "errors": errors, "req_s": len(durations) / elapsed,
+            **summarize(durations or [0.0])}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--scenario", default="mixed", choices=SCENARIOS)
+    parser.add_argument("--clients", type=int, nargs="+", default=[8])
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--start-timeout", type=float, default=120)
+    parser.add_argument("--env", nargs="*", default=[], help="NAME=VALUE passes au serveur")
+    args = parser.parse_args()
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    rows = []
+    for name in args.configs:
+        if name == "asgi" and importlib.util.find_spec("uvicorn") is None:
+            print("asgi: uvicorn is not installed, skipped")
+            continue
+        start = time.perf_counter()
+        process = start_server(name, args.port, extra_env, args.start_timeout)
+        ready = time.perf_counter() - start
+        try:
+            # quelques requetes avant la mesure (pool de rendu demarre , connexions etablies)
+            load(args.port, args.scenario, 1, 2)
+            for clients in args.clients:
+                rows.append({"config": name, "ready_s": ready, "clients": clients,
+                             **load(args.port, args.scenario, clients, args.duration, args.processes)})
+        finally:
+            stop_server(process)
+
+    print_table(rows, ["config", "ready_s", "clients", "requests", "errors", "req_s", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+
+from benchmarks.common import measure, print_table, summarize
+from benchmarks.reference_models import random_state_space
+
+# Reduction d'ordre (services/reduction_service.py) sur les routes step , bode et bode/performance de ss_router :
+# modele complet , puis le meme modele avec l'option "reduction" (ordre choisi par la tolerance).
+# "first" : caches vides (equilibrage , reduction et analyse du modele reduit) , "cached" : cache des systemes garde
+# (realisation equilibree et modele reduit deja calcules , cache des reponses vide).
+# La lecture du JSON (modele complet dans les deux cas) domine la duree totale , les etapes de l'entete Server-Timing
+# (helpers/metrics.py) de l'appel "cached" separent la reduction et le calcul de la route (simulation , frequences ...).
+#
+#   python -m benchmarks.model_reduction --orders 50 100 200 --tolerance 1e-4
+
+ROUTES = [
+    ("step json", "/ss/step", {"t_max": 20, "x_axis": [0, 20], "y_axis": [-5, 5], "format": "json"}),
+    ("bode json", "/ss/bode", {"t_max": 1, "x_axis": [-2, 2], "format": "json"}),
+    ("bode/performance", "/ss/bode/performance", {}),
+]
+
+
+# duree (ms) de chaque etape de l'entete Server-Timing
+def stages(header: str) -> dict:
+    durations = {}
+    for item in header.split(","):
+        name, _, duration = item.strip().partition(";dur=")
+        durations[name] = float(duration or 0)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from helpers.response_cache import response_cache
+    from helpers.system_cache import system_cache
+    from server import create_app
+
+    client = create_app().test_client()
+    rows = []
+    for order in args.orders:
+        model = random_state_space(order)
+        for name, url, options in ROUTES:
+            for mode, reduction in (("full", None), ("reduced", {"tolerance": args.tolerance})):
+                body = {**model, **options}
+                if reduction is not None:
+                    body["reduction"] = reduction
+                headers = {}
+
+                def call(clear_systems):
+                    if clear_systems:
+                        system_cache.clear()
+                    response_cache.clear()
+                    response = client.post(url, json=body)
+                    response.get_data()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} {order}: {response.status_code} {response.get_data()[:200]}")
+                    headers.update(response.headers)
+
+                first = summarize(measure(lambda: call(True), args.repeat, warmup=0))["p50_ms"]
+                first_reduction = stages(headers.get("Server-Timing", "")).get("reduction", 0.0)
+                cached = summarize(measure(lambda: call(False), args.repeat))["p50_ms"]
+                timings = stages(headers.get("Server-Timing", ""))
+                compute = sum(duration for stage, duration in timings.items()
+                              if stage not in ("validation", "model", "reduction", "encode", "total"))
+                rows.append({"order": order, "route": name, "mode": mode,
+                             "reduced_order": headers.get("X-Reduced-Order", order),
+                             "error_bound": f"{float(headers.get('X-Reduction-Error-Bound', 0)):.1e}",
+                             "first_p50_ms": first, "reduction_ms": first_reduction, "cached_p50_ms": cached,
+                             "compute_ms": compute})
+
+    print_table(rows, ["order", "route", "mode", "reduced_order", "error_bound", "first_p50_ms", "reduction_ms",
+                       "cached_p50_ms", "compute_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+
+from benchmarks.common import measure, print_table, summarize
+from benchmarks.reference_models import random_state_space
+
+# Registre des modeles (helpers/model_registry.py) : routes step , bode et bode/performance de ss_router avec le modele
+# complet dans le JSON , puis avec son identifiant ("model_id" , modele enregistre une fois par POST /models).
+# Le cache des reponses est vide avant chaque appel (le calcul de la route est refait) , le cache des systemes est garde.
+#
+#   python -m benchmarks.model_registry --orders 100 300 600
+
+ROUTES = [
+    ("step json", "/ss/step", {"t_max": 20, "x_axis": [0, 20], "y_axis": [-5, 5], "format": "json"}),
+    ("bode json", "/ss/bode", {"t_max": 1, "x_axis": [-2, 2], "format": "json"}),
+    ("bode/performance", "/ss/bode/performance", {}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from helpers.response_cache import response_cache
+    from server import create_app
+
+    client = create_app().test_client()
+    rows = []
+    for order in args.orders:
+        model = random_state_space(order)
+        registration = {}
+
+        def register():
+            response = client.post("/models", json={"model": "ss", **model})
+            registration.update(response.get_json())
+
+        register_ms = summarize(measure(register, args.repeat, warmup=0))["p50_ms"]
+        for name, url, options in ROUTES:
+            for mode, body in (("json", {**model, **options}), ("model_id", {"model_id": registration["id"], **options})):
+                def call():
+                    response_cache.clear()
+                    response = client.post(url, json=body)
+                    response.get_data()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} {order}: {response.status_code} {response.get_data()[:200]}")
+
+                rows.append({"order": order, "route": name, "mode": mode, "register_p50_ms": register_ms,
+                             **summarize(measure(call, args.repeat))})
+
+    print_table(rows, ["order", "route", "mode", "register_p50_ms", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import base64
+import io
+import json
+
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from benchmarks.reference_models import random_state_space
+from helpers.data_encoder import encode_binary
+
+# Lecture d'un modele d'etat selon son format (voir helpers/matrix_codec.py) : taille du corps et duree de
+# request_payload + validation (StateSpaceInput) , comme dans un handler de ss_router , puis ecriture des memes
+# matrices dans le meme format (encode_matrices , reponse des conversions).
+#
+#   python -m benchmarks.model_upload --orders 100 300 1000
+
+
+def bodies(model: dict) -> dict:
+    matrices = {name: np.asarray(value, dtype=float) for name, value in model.items()}
+    npz = io.BytesIO()
+    np.savez(npz, **matrices)
+    npy = io.BytesIO()
+    for name in "ABCD":
+        np.save(npy, matrices[name])
+    encoded = {name: {"dtype": "float64", "shape": list(matrix.shape),
+                      "data": base64.b64encode(matrix.tobytes()).decode("ascii")} for name, matrix in matrices.items()}
+    return {
+        "json": (json.dumps(model).encode(), "application/json"),
+        "base64": (json.dumps(encoded).encode(), "application/json"),
+        "npz": (npz.getvalue(), "application/x-npz"),
+        "npy": (npy.getvalue(), "application/x-npy"),
+        "binary": (encode_binary(matrices, shaped=True).get_data(), "application/vnd.cs.arrays"),
+    }, matrices
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from helpers.matrix_codec import encode_matrices, request_payload
+    from validation.state_space_validation import StateSpaceInput
+
+    app = Flask(__name__)
+    schema = StateSpaceInput()
+    rows = []
+    for order in args.orders:
+        formats, matrices = bodies(random_state_space(order))
+        for name, (body, content_type) in formats.items():
+            def read():
+                with app.test_request_context("/ss/bode/performance", method="POST", data=body,
+                                              content_type=content_type):
+                    schema.load(request_payload())
+
+            def write():
+                with app.test_request_context("/ss/close_loop", method="POST"):
+                    response = encode_matrices(matrices, name)
+                    if not isinstance(response, dict):
+                        response.get_data()
+                    elif name in ("json", "base64"):
+                        json.dumps(response)
+
+            read_ms = summarize(measure(read, args.repeat))["p50_ms"]
+            write_ms = summarize(measure(write, args.repeat))["p50_ms"]
+            rows.append({"order": order, "format": name, "body_kb": len(body) / 1024, "read_p50_ms": read_ms,
+                         "write_p50_ms": write_ms})
+
+    print_table(rows, ["order", "format", "body_kb", "read_p50_ms", "write_p50_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import control as ctrl
+import numpy as np
+
+# Bibliotheque des modeles de reference des benchmarks (benchmarks/routes.py , benchmarks/load_test.py) ,
+# chaque modele est donne dans le format des requetes : {"num", "den"} pour /tf , {"A", "B", "C", "D"} pour /ss
+# - low order : premier et second ordre bien amortis
+# - resonant : second ordre tres peu amorti (zeta = 0.005) , pic etroit (grille de frequences , duree de simulation)
+# - stiff : constantes de temps de 1e-3 s et 100 s (pas de temps et horizon tres differents)
+# - ss order n : modeles d'etat stables aleatoires (graine fixe) d'ordre croissant
+# - heat equation : equation de la chaleur discretisee (1D ou 2D) , grand modele creux au format COO
+#   (benchmarks/sparse_models.py)
+#
+# Les modeles de transfert sont aussi donnes en representation d'etat (realisation de python-control)
+# pour comparer les deux routeurs sur le meme systeme.
+
+SS_ORDERS = (4, 20, 100)
+
+
+def transfer_functions() -> dict:
+    wn, zeta = 10.0, 0.005
+    return {
+        "tf first order": {"num": [2], "den": [1, 1]},
+        "tf second order": {"num": [4], "den": [1, 2, 4]},
+        "tf resonant": {"num": [wn ** 2], "den": [1, 2 * zeta * wn, wn ** 2]},
+        "tf stiff": {"num": [1, 1], "den": list(np.polymul([1, 1000], [1, 0.01]))},
+    }
+
+
+def random_state_space(order: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed + order)
+    A = rng.normal(size=(order, order)) / np.sqrt(order)
+    A -= (np.linalg.eigvals(A).real.max() + 0.2) * np.eye(order)
+    B = rng.normal(size=(order, 1))
+    C = rng.normal(size=(1, order))
+    return {"A": A.tolist(), "B": B.tolist(), "C": C.tolist(), "D": [[0.0]]}
+
+
+# equation de la chaleur sur [0 , 1]^dimensions (differences finies , `points` points par dimension ,
+# bords a 0) : chauffe sur un point pres du bord , temperature mesuree au centre
+def heat_equation(points: int, dimensions: int = 1) -> dict:
+    from scipy import sparse
+    step = 1.0 / (points + 1)
+    laplacian = sparse.diags([np.ones(points - 1), -2 * np.ones(points), np.ones(points - 1)], [-1, 0, 1]) / step ** 2
+    A = laplacian
+    for _ in range(dimensions - 1):
+        A = sparse.kronsum(A, laplacian)
+    A = sparse.coo_array(A * 0.1)
+    states = points ** dimensions
+    B = np.zeros((states, 1))
+    B[points // 4] = 0.1 / step ** 2
+    C = np.zeros((1, states))
+    C[0, (states - 1) // 2] = 1.0
+    return {"A": {"shape": list(A.shape), "row": A.row.tolist(), "col": A.col.tolist(), "data": A.data.tolist()},
+            "B": B.tolist(), "C": C.tolist(), "D": [[0.0]]}
+
+
+def state_spaces() -> dict:
+    models = {}
+    for name, tf in transfer_functions().items():
+        ss = ctrl.tf2ss(tf["num"], tf["den"])
+        models[name.replace("tf", "ss", 1)] = {"A": ss.A.tolist(), "B": ss.B.tolist(), "C": ss.C.tolist(),
+                                               "D": ss.D.tolist()}
+    for order in SS_ORDERS:
+        models[f"ss order {order}"] = random_state_space(order)
+    return models
+
+
+# {"tf": {nom: modele} , "ss": {nom: modele}}
+def reference_models() -> dict:
+    return {"tf": transfer_functions(), "ss": state_spaces()}
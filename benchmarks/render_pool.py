@@ -0,0 +1,72 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from helpers.figure_engine import figure_engine
+from helpers.render_pool import RenderPool
+
+# Debit et latence du rendu des graphiques dans les threads du serveur (figure_engine , le GIL est garde
+# pendant tout le rendu) et dans le pool de processus (helpers/render_pool.py) , avec T threads qui
+# rendent en parallele comme des requetes concurrentes. Le gain du pool depend du nombre de coeurs :
+# avec un seul coeur il n'y a que le surcout (memoire partagee + pipe).
+#
+#   python -m benchmarks.render_pool --renders 200 --threads 1 4 8 --workers 4
+
+
+def render(engine, i: int):
+    t = np.linspace(0, 10, 2000)
+    if i % 2 == 0:
+        engine.time_plot(t, 1 - np.exp(-t / (1 + i % 7)) * np.cos((1 + i % 5) * t), xlim=[0, 10], ylim=[-1, 2])
+    else:
+        omega = np.logspace(-1, 2, 1000)
+        response = 1 / (1j * omega + 1 + i % 3)
+        engine.bode_plot(omega, 20 * np.log10(np.abs(response)), np.degrees(np.angle(response)))
+
+
+def throughput(engine, renders: int, threads: int) -> float:
+    counter = iter(range(renders))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            render(engine, i)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return renders / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--workers", type=int, default=0, help="0 : un processus par coeur")
+    args = parser.parse_args()
+
+    pool = RenderPool(args.workers or None)
+    pool.start()
+    render(pool, 0)  # attend qu'un processus soit pret
+
+    rows = []
+    for name, engine in (("threads", figure_engine), ("process pool", pool)):
+        latency = summarize(measure(lambda: render(engine, 0), 20, 2))
+        for threads in args.threads:
+            rows.append({"renderer": name, "threads": threads, "p50_ms (1 thread)": latency["p50_ms"],
+                         "renders/s": throughput(engine, args.renders, threads)})
+    print_table(rows, ["renderer", "threads", "p50_ms (1 thread)", "renders/s"])
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, print_table, summarize
+from benchmarks.reference_models import reference_models
+
+# Suite de benchmark par route : chaque route de ss_router et tf_router (client de test de Flask) et les methodes
+# de Service appelees directement , pour chaque modele de reference (benchmarks/reference_models.py).
+# Par ligne : latence p50 / p95 / p99 , debit (requetes/s sur un thread) , pic des allocations d'un appel
+# (tracemalloc , numpy compris) et pic de memoire residente du processus.
+#
+# Les caches (systemes et reponses) sont vides avant chaque appel : la mesure est celle du calcul complet ,
+# --warm-cache garde les caches (requetes repetees). Le rendu matplotlib est fait dans le processus
+# (RENDER_POOL=0) sauf avec --render-pool.
+#
+# Reference et regressions : --save enregistre les resultats (JSON) , --compare les compare a une reference et
+# signale les lignes dont le p50 augmente de plus de --threshold (et de plus de --min-ms) , code de sortie 1 si
+# une regression est trouvee.
+#
+#   python -m benchmarks.routes --save benchmarks/baselines/routes.json
+#   python -m benchmarks.routes --compare benchmarks/baselines/routes.json --threshold 0.25
+#   python -m benchmarks.routes --routes "tf bode" "ss nyquist" --models "tf resonant" "ss resonant"
+
+BASELINE = os.path.join("benchmarks", "baselines", "routes.json")
+
+# (nom , chemin , axes , options) : axes "time" (t_max , x_axis et y_axis des graphiques temporels) ,
+# "frequency" (x_axis en decades du diagramme de bode) ou None
+ROUTES = [
+    ("step svg", "/step", "time", {"format": "svg"}),
+    ("step native", "/step", "time", {"format": "svg", "renderer": "native"}),
+    ("step json", "/step", "time", {"format": "json"}),
+    ("impulse json", "/impulse", "time", {"format": "json"}),
+    ("ramp json", "/ramp", "time", {"format": "json"}),
+    ("bode svg", "/bode", "frequency", {"format": "svg"}),
+    ("bode native", "/bode", "frequency", {"format": "svg", "renderer": "native"}),
+    ("bode json", "/bode", "frequency", {"format": "json"}),
+    ("nyquist", "/nyquist", "time", {"format": "svg"}),
+    ("poles_zeros_map", "/poles_zeros_map", None, {"format": "svg"}),
+    ("step/performance", "/step/performance", None, {}),
+    ("bode/performance", "/bode/performance", None, {}),
+    ("close_loop", "/close_loop", None, {}),
+    ("convert", None, None, {}),
+    ("analyze", "/analyze", None, {"format": "json", "analyses": ["poles_zeros", "step", "bode", "nyquist",
+                                                                  "step_performance", "bode_performance"]}),
+    ("sweep", "/sweep", None, {"parameters": [{"target": "gain", "start": 0.1, "stop": 10, "count": 50,
+                                               "scale": "log"}]}),
+]
+SS_ROUTES = [("bode/opt", "/bode/opt", "frequency", {})]
+CONVERT = {"tf": "/tf_to_ss", "ss": "/ss_to_tf"}
+FREQUENCY_AXIS = [-3, 3]
+
+
+def horizon(model: dict, model_type: str) -> float:
+    from helpers.time_grid import settling_horizon
+    poles = np.roots(model["den"]) if model_type == "tf" else np.linalg.eigvals(np.array(model["A"]))
+    return float(settling_horizon(poles))
+
+
+def payload(model: dict, t_max: float, axes: str, options: dict) -> dict:
+    body = dict(model)
+    if axes == "time":
+        body.update({"t_max": t_max, "x_axis": [0, t_max], "y_axis": [-2, 2]})
+    elif axes == "frequency":
+        body.update({"t_max": t_max, "x_axis": FREQUENCY_AXIS})
+    return {**body, **options}
+
+
+# methodes de Service sans Flask (donnees , images) : (nom , fonction(service , systeme , t_max))
+def service_methods(model_type: str) -> list:
+    return [
+        ("service step_data", lambda service, system, t_max: service.step_data(system, t_max)),
+        ("service impulse_data", lambda service, system, t_max: service.impulse_data(system, t_max)),
+        ("service ramp_data", lambda service, system, t_max: service.ramp_data(system, t_max)),
+        ("service bode_data", lambda service, system, t_max: service.bode_data(system, FREQUENCY_AXIS)),
+        ("service nyquist_data", lambda service, system, t_max: service.nyquist_data(system)),
+        ("service pole_zero_data", lambda service, system, t_max: service.pole_zero_data(system)),
+        ("service performance_data", lambda service, system, t_max: service.performance_data(system)),
+        ("service bode_performance", lambda service, system, t_max: service.bode_performance(system)),
+        ("service closed_loop", lambda service, system, t_max: service.closed_loop(system)),
+        ("service convert", lambda service, system, t_max: service.convert_tf_to_ss(system) if model_type == "tf"
+         else service.convert_ss_to_tf(system)),
+        ("service bode_image native", lambda service, system, t_max: service.bode_image(
+            service.bode_data(system, FREQUENCY_AXIS), renderer="native")),
+    ]
+
+
+class Runner:
+    def __init__(self, repeat: int, warmup: int, alloc_repeat: int, warm_cache: bool):
+        from helpers.response_cache import response_cache
+        from helpers.system_cache import system_cache
+        self.caches = (system_cache, response_cache)
+        self.repeat = repeat
+        self.warmup = warmup
+        self.alloc_repeat = alloc_repeat
+        self.warm_cache = warm_cache
+
+    def clear(self):
+        if not self.warm_cache:
+            for cache in self.caches:
+                cache.clear()
+
+    def run(self, call) -> dict:
+        for _ in range(self.warmup):
+            self.clear()
+            call()
+        durations = np.empty(self.repeat)
+        for i in range(self.repeat):
+            self.clear()
+            start = time.perf_counter()
+            call()
+            durations[i] = time.perf_counter() - start
+
+        # pic des allocations d'un appel (passe separee , tracemalloc ralentit les appels)
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(self.alloc_repeat):
+                self.clear()
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                call()
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+
+        return {**summarize(durations), "req_s": self.repeat / durations.sum(),
+                "alloc_peak_kb": float(np.median(peaks)) / 1024 if peaks else None, "peak_rss_mb": peak_rss_mb()}
+
+
+def selected(name: str, filters: list) -> bool:
+    return not filters or any(item in name for item in filters)
+
+
+def benchmark(args) -> list:
+    from helpers.system_cache import system_cache
+    from server import create_app
+    from services.service import service
+
+    app = create_app()
+    client = app.test_client()
+    runner = Runner(args.repeat, args.warmup, args.alloc_repeat, args.warm_cache)
+    rows = []
+    for model_type, models in reference_models().items():
+        routes = ROUTES + (SS_ROUTES if model_type == "ss" else [])
+        for model_name, model in models.items():
+            if not selected(model_name, args.models):
+                continue
+            t_max = horizon(model, model_type)
+            for name, path, axes, options in routes:
+                target = f"{model_type} {name}"
+                if not selected(target, args.routes):
+                    continue
+                url = f"/{model_type}{path or CONVERT[model_type]}"
+                body = payload(model, t_max, axes, options)
+
+                def call():
+                    response = client.post(url, json=body)
+                    response.get_data()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} {model_name}: {response.status_code} {response.get_data()[:200]}")
+
+                rows.append({"target": target, "model": model_name, **runner.run(call)})
+
+            system = system_cache.tf(model["num"], model["den"]) if model_type == "tf" else \
+                system_cache.ss(model["A"], model["B"], model["C"], model["D"])
+            for name, method in service_methods(model_type):
+                target = f"{model_type} {name}"
+                if not args.service or not selected(target, args.routes):
+                    continue
+                rows.append({"target": target, "model": model_name,
+                             **runner.run(lambda: method(service, system, t_max))})
+    return rows
+
+
+def metadata() -> dict:
+    import control
+    import scipy
+    return {"python": platform.python_version(), "numpy": np.__version__, "scipy": scipy.__version__,
+            "control": control.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%d")}
+
+
+def save(rows: list, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    results = {f"{row['target']}|{row['model']}": {key: row[key] for key in ("p50_ms", "p95_ms", "p99_ms", "req_s",
+                                                                              "alloc_peak_kb")} for row in rows}
+    with open(path, "w") as file:
+        json.dump({"meta": metadata(), "results": results}, file, indent=1, sort_keys=True)
+
+
+# ratio du p50 par rapport a la reference , "regression" au-dela du seuil relatif et absolu
+def compare(rows: list, path: str, threshold: float, min_ms: float) -> int:
+    with open(path) as file:
+        baseline = json.load(file)
+    if baseline["meta"].get("cpus") != os.cpu_count() or baseline["meta"].get("numpy") != np.__version__:
+        print(f"warning: baseline measured on {baseline['meta']}")
+    regressions = 0
+    for row in rows:
+        reference = baseline["results"].get(f"{row['target']}|{row['model']}")
+        if reference is None:
+            row["status"] = "new"
+            continue
+        row["vs_base"] = row["p50_ms"] / reference["p50_ms"]
+        delta = row["p50_ms"] - reference["p50_ms"]
+        if row["vs_base"] > 1 + threshold and delta > min_ms:
+            row["status"] = "REGRESSION"
+            regressions += 1
+        elif row["vs_base"] < 1 - threshold and -delta > min_ms:
+            row["status"] = "faster"
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--alloc-repeat", type=int, default=2)
+    parser.add_argument("--routes", nargs="*", default=[], help="filtre sur le nom (\"tf bode\" , \"ss service\" ...)")
+    parser.add_argument("--models", nargs="*", default=[], help="filtre sur le nom du modele")
+    parser.add_argument("--no-service", dest="service", action="store_false", help="sans les methodes de Service")
+    parser.add_argument("--warm-cache", action="store_true")
+    parser.add_argument("--render-pool", action="store_true")
+    parser.add_argument("--save", nargs="?", const=BASELINE)
+    parser.add_argument("--compare", nargs="?", const=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # avant l'import du serveur : les services choisissent leur moteur de rendu a la creation
+    os.environ["RENDER_POOL"] = "1" if args.render_pool else "0"
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rows = benchmark(args)
+
+    regressions = compare(rows, args.compare, args.threshold, args.min_ms) if args.compare else 0
+    print_table(rows, ["target", "model", "p50_ms", "p95_ms", "p99_ms", "req_s", "alloc_peak_kb", "peak_rss_mb"]
+                + (["vs_base", "status"] if args.compare else []))
+    if args.save:
+        save(rows, args.save)
+        print(f"baseline saved to {args.save}")
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
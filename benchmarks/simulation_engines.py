@@ -0,0 +1,75 @@
+import argparse
+import warnings
+
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from helpers.simulator import discretize, modal_form, simulate_exact, simulate_modal
+from helpers.system_cache import system_cache
+from helpers.time_grid import adaptive_time_grid, settling_horizon
+from services.service import Service
+
+# Vitesse et precision des moteurs de simulation (helpers/simulator.py) par rapport a python-control
+# (Service.simulate_control , ctrl.forced_response segment par segment) pour des modeles d'etat stables
+# aleatoires d'ordre n. Les temps "exact" et "modal" comprennent la discretisation (expm) ou la
+# decomposition modale (eig) , les temps "warm" les reutilisent (comme le cache des systemes pour un modele
+# deja vu). L'erreur est relative a l'amplitude de la reponse.
+#
+#   python -m benchmarks.simulation_engines --orders 2 10 50 200 --inputs 1 2
+
+
+def random_system(order: int, inputs: int, rng):
+    A = rng.normal(size=(order, order)) / np.sqrt(order)
+    A -= (np.linalg.eigvals(A).real.max() + 0.2) * np.eye(order)
+    B = rng.normal(size=(order, inputs))
+    C = rng.normal(size=(1, order))
+    return system_cache.ss(A, B, C, np.zeros((1, inputs)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[2, 10, 50, 200])
+    parser.add_argument("--inputs", type=int, nargs="+", default=[1])
+    parser.add_argument("--kinds", nargs="+", default=["step", "impulse", "ramp"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    service = Service()
+    rng = np.random.default_rng(0)
+    rows = []
+    for order in args.orders:
+        for inputs in args.inputs:
+            system = random_system(order, inputs, rng)
+            matrices = [np.asarray(m, dtype=float) for m in (system.A, system.B, system.C, system.D)]
+            poles = np.linalg.eigvals(matrices[0])
+            grid = adaptive_time_grid(poles, settling_horizon(poles))
+            for kind in args.kinds:
+                reference = service.simulate_control(system, grid, kind)
+                scale = max(np.max(np.abs(reference)), 1e-300)
+                row = {"order": order, "inputs": inputs, "kind": kind, "points": len(grid)}
+                row["control ms"] = summarize(measure(lambda: service.simulate_control(system, grid, kind),
+                                                      args.repeat, 1))["p50_ms"]
+                discretizations = {step: discretize(*matrices[:2], step) for step in
+                                   {segment[1] - segment[0] for segment in grid.segments if len(segment) > 1}}
+                warm = {
+                    "exact": lambda: simulate_exact(*matrices, grid, kind, discretizations.__getitem__),
+                    "modal": lambda modes=modal_form(*matrices[:3]): simulate_modal(*matrices, grid, kind, modes),
+                }
+                for name, engine in (("exact", simulate_exact), ("modal", simulate_modal)):
+                    response = engine(*matrices, grid, kind)
+                    if response is None:
+                        row[f"{name} ms"] = "fallback"
+                        continue
+                    row[f"{name} ms"] = summarize(measure(lambda: engine(*matrices, grid, kind),
+                                                          args.repeat, 1))["p50_ms"]
+                    row[f"{name} warm ms"] = summarize(measure(warm[name], args.repeat, 1))["p50_ms"]
+                    row[f"{name} error"] = f"{np.max(np.abs(response - reference)) / scale:.1e}"
+                rows.append(row)
+
+    print_table(rows, ["order", "inputs", "kind", "points", "control ms", "exact ms", "exact warm ms", "exact error",
+                       "modal ms", "modal warm ms", "modal error"])
+
+
+if __name__ == "__main__":
+    main()
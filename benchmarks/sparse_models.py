@@ -0,0 +1,67 @@
+import argparse
+
+from benchmarks.common import measure, peak_rss_mb, print_table, summarize
+from benchmarks.reference_models import heat_equation
+
+# Grands modeles creux (equation de la chaleur 1D et 2D , jusqu'a 10^4 etats) sur les routes step , bode et
+# bode/performance de ss_router : A envoyee au format COO (chemin creux , helpers/sparse_lti.py) et , jusqu'a
+# --dense-max etats , la meme matrice en listes de listes (chemin dense de python-control).
+# Les caches (systemes et reponses) sont vides avant chaque appel : modele recu pour la premiere fois.
+#
+#   python -m benchmarks.sparse_models --points 1000 3000 10000 --grid 32 64 100 --dense-max 1000
+
+ROUTES = [
+    ("step json", "/ss/step", {"t_max": 0.5, "x_axis": [0, 0.5], "y_axis": [0, 1], "format": "json"}),
+    ("bode json", "/ss/bode", {"t_max": 1, "x_axis": [-1, 4], "format": "json"}),
+    ("bode/performance", "/ss/bode/performance", {}),
+]
+
+
+def dense_model(model: dict) -> dict:
+    import numpy as np
+    coo = model["A"]
+    A = np.zeros(coo["shape"])
+    np.add.at(A, (coo["row"], coo["col"]), coo["data"])
+    return {**model, "A": A.tolist()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 3000, 10000], help="1D : nombre d'etats")
+    parser.add_argument("--grid", type=int, nargs="+", default=[32, 64, 100], help="2D : points par cote")
+    parser.add_argument("--dense-max", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from helpers.response_cache import response_cache
+    from helpers.system_cache import system_cache
+    from server import create_app
+
+    client = create_app().test_client()
+    models = [(1, points) for points in args.points] + [(2, points) for points in args.grid]
+    rows = []
+    for dimensions, points in models:
+        model = heat_equation(points, dimensions)
+        states = points ** dimensions
+        bodies = {"sparse": model}
+        if states <= args.dense_max:
+            bodies["dense"] = dense_model(model)
+        for mode, body in bodies.items():
+            for name, url, options in ROUTES:
+                def call():
+                    system_cache.clear()
+                    response_cache.clear()
+                    response = client.post(url, json={**body, **options})
+                    response.get_data()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} {states}: {response.status_code} {response.get_data()[:200]}")
+
+                durations = measure(call, args.repeat, warmup=0)
+                rows.append({"model": f"heat {dimensions}D", "states": states, "nnz": len(model["A"]["data"]),
+                             "mode": mode, "route": name, **summarize(durations), "peak_rss_mb": peak_rss_mb()})
+
+    print_table(rows, ["model", "states", "nnz", "mode", "route", "p50_ms", "p95_ms", "peak_rss_mb"])
+
+
+if __name__ == "__main__":
+    main()
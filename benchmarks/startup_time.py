@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import print_table
+
+# Demarrage d'un worker : duree de "import main" (import des modules + chauffe , voir helpers/warmup.py) ,
+# duree de warm_worker apres le fork , puis latence de la premiere requete de chaque route dans le processus fork
+# (comme un worker de gunicorn --preload) comparee au regime etabli (mediane des requetes suivantes).
+# Chaque configuration est mesuree dans un nouvel interpreteur , le rendu matplotlib est fait dans le processus
+# (RENDER_POOL=0) pour mesurer aussi les gabarits des figures.
+#
+#   python -m benchmarks.startup_time --repeat 10
+
+ROUTES = [
+    ("tf step json", "/tf/step", {"den": [1, 3, 3, 1], "t_max": 10, "x_axis": [0, 10], "y_axis": [-1, 2],
+                                  "format": "json"}),
+    ("tf bode native", "/tf/bode", {"den": [1, 3, 3, 1], "t_max": 10, "x_axis": [-2, 2], "format": "svg",
+                                    "renderer": "native"}),
+    ("tf bode matplotlib", "/tf/bode", {"den": [1, 3, 3, 1], "t_max": 10, "x_axis": [-2, 2], "format": "svg",
+                                        "renderer": "matplotlib"}),
+    ("ss analyze json", "/ss/analyze", {"A": [[0, 1], [-2, -3]], "B": [[0], [1]], "C": [[1, 0]], "D": [[0]],
+                                        "analyses": ["step", "bode", "step_performance", "bode_performance"],
+                                        "format": "json"}),
+]
+
+# gain different a chaque requete : pas de reponse servie par les caches
+CHILD = """
+import contextlib, io, json, os, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+imported = time.perf_counter() - start
+routes, repeat, worker_warmup = json.loads(sys.argv[1]), int(sys.argv[2]), sys.argv[3] == "1"
+
+def call(client, path, payload, gain):
+    body = dict(payload)
+    if "A" in body:
+        body["C"] = [[gain, 0]]
+    else:
+        body["num"] = [gain]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = client.post(path, json=body).status_code
+    assert status == 200, (path, status)
+    return (time.perf_counter() - start) * 1000
+
+read, write = os.pipe()
+if os.fork() == 0:
+    start = time.perf_counter()
+    if worker_warmup:
+        from helpers.warmup import warm_worker
+        with contextlib.redirect_stdout(io.StringIO()):
+            warm_worker(main.app)
+    worker = time.perf_counter() - start
+    client = main.app.test_client()
+    results = []
+    for name, path, payload in routes:
+        first = call(client, path, payload, 1.5)
+        steady = sorted(call(client, path, payload, 2 + i) for i in range(repeat))
+        results.append({"route": name, "first_ms": first, "steady_ms": steady[len(steady) // 2]})
+    os.write(write, json.dumps({"import_s": imported, "worker_s": worker, "routes": results}).encode())
+    os._exit(0)
+os.close(write)
+chunks = []
+while chunk := os.read(read, 65536):
+    chunks.append(chunk)
+os.wait()
+sys.stdout.write(b"".join(chunks).decode())
+"""
+
+
+# modes : "cold" sans chauffe , "preload" chauffe du maitre seulement , "preload+worker" avec warm_worker apres le fork
+MODES = {"cold": ("0", "0"), "preload": ("1", "0"), "preload+worker": ("1", "1")}
+
+
+def run(mode: str, repeat: int) -> dict:
+    warmup, worker_warmup = MODES[mode]
+    env = dict(os.environ, RENDER_POOL="0", STARTUP_WARMUP=warmup,
+               PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    routes = json.dumps(ROUTES)
+    output = subprocess.run([sys.executable, "-c", CHILD, routes, str(repeat), worker_warmup], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for mode in MODES:
+        result = run(mode, args.repeat)
+        for route in result["routes"]:
+            rows.append({"mode": mode, "import_s": result["import_s"], "worker_s": result["worker_s"], **route,
+                         "first/steady": route["first_ms"] / max(route["steady_ms"], 1e-9)})
+
+    print_table(rows, ["mode", "import_s", "worker_s", "route", "first_ms", "steady_ms", "first/steady"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from helpers.step_metrics import step_metrics
+
+# Vitesse du calcul des caracteristiques de la reponse indicielle (helpers/step_metrics.py)
+# par rapport aux anciennes methodes de Service (boucle python du temps de stabilisation ,
+# np.where pour le temps de montee) appelees une fois par reponse.
+# Les reponses sont celles de seconds ordres 1 / (s^2 + 2 zeta s + 1) , N reponses de K points.
+#
+#   python -m benchmarks.step_metrics_speed --responses 1 100 1000 --points 1000 10000
+
+
+def responses(count: int, points: int):
+    time = np.linspace(0, 30, points)
+    zeta = np.linspace(0.1, 0.9, count)[:, None]
+    wd = np.sqrt(1 - zeta ** 2)
+    decay = np.exp(-zeta * time)
+    response = 1 - decay * (np.cos(wd * time) + zeta / wd * np.sin(wd * time))
+    return time, response
+
+
+# copie des anciennes methodes de Service (settling , calculate_overshoot , calculate_peak , calculate_rise_time)
+def legacy(time, response, final_value: float):
+    tolerance = 0.05 * final_value
+    settling_time = None
+    for t, y in zip(time, response):
+        if np.abs(y - final_value) > tolerance:
+            settling_time = t
+    peak_value = np.max(response)
+    overshoot = (peak_value - final_value) / final_value * 100
+    peak_time = time[np.argmax(response)]
+    rise_time_start = np.where(response >= 0.1 * final_value)[0][0]
+    rise_time_end = np.where(response >= 0.9 * final_value)[0][0]
+    rise_time = time[rise_time_end] - time[rise_time_start]
+    return overshoot, peak_time, peak_value, rise_time, settling_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.responses:
+        for points in args.points:
+            time, response = responses(count, points)
+            final_value = np.ones(count)
+            old = summarize(measure(lambda: [legacy(time, row, 1.0) for row in response], args.repeat, 1))
+            new = summarize(measure(lambda: step_metrics(time, response, final_value), args.repeat, 1))
+
+            expected = np.array([legacy(time, row, 1.0)[-1] for row in response[:10]])
+            settling = step_metrics(time, response[:10], final_value[:10])["settling_time"]
+            rows.append({
+                "responses": count,
+                "points": points,
+                "loop ms": old["p50_ms"],
+                "vectorized ms": new["p50_ms"],
+                "speedup": old["p50_ms"] / new["p50_ms"],
+                # ecart du temps de stabilisation (interpole) avec l'ancien (echantillon) , au plus un pas
+                "settling diff": float(np.max(np.abs(settling - expected))),
+                "step": float(time[1] - time[0]),
+            })
+
+    print_table(rows, ["responses", "points", "loop ms", "vectorized ms", "speedup", "settling diff", "step"])
+
+
+if __name__ == "__main__":
+    main()
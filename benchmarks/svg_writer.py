@@ -0,0 +1,55 @@
+import argparse
+
+import numpy as np
+
+from benchmarks.common import measure, print_table, summarize
+from helpers.figure_engine import figure_engine
+from helpers.svg_writer import svg_writer
+
+# Latence et taille du svg des graphiques temporels et du diagramme de bode : matplotlib (helpers/figure_engine.py ,
+# figures deja construites) et ecriture directe (helpers/svg_writer.py) avec chaque simplification des courbes.
+#
+#   python -m benchmarks.svg_writer --points 1000 5000 50000
+
+
+def time_curves(points: int):
+    t = np.linspace(0, 20, points)
+    return t, 1 - np.exp(-0.3 * t) * np.cos(2 * t)
+
+
+def bode_curves(points: int):
+    omega = np.logspace(-2, 3, points)
+    response = 4 / ((1j * omega) ** 2 + 0.4j * omega + 4) / (0.01j * omega + 1)
+    return omega, 20 * np.log10(np.abs(response)), np.degrees(np.unwrap(np.angle(response)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 5000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for points in args.points:
+        t, y = time_curves(points)
+        omega, magnitude, phase = bode_curves(points)
+        charts = {
+            "time": (lambda: figure_engine.time_plot(t, y, xlim=[0, 20], ylim=[0, 2]),
+                     lambda simplify: svg_writer.time_plot(t, y, xlim=[0, 20], ylim=[0, 2], simplify=simplify)),
+            "bode": (lambda: figure_engine.bode_plot(omega, magnitude, phase),
+                     lambda simplify: svg_writer.bode_plot(omega, magnitude, phase, simplify=simplify)),
+        }
+        for chart, (matplotlib_render, native_render) in charts.items():
+            renders = [("matplotlib", matplotlib_render)]
+            renders += [(f"native {simplify}", lambda simplify=simplify: native_render(simplify))
+                        for simplify in ("none", "rdp", "lttb")]
+            for name, render in renders:
+                rows.append({"chart": chart, "points": points, "renderer": name,
+                             "p50_ms": summarize(measure(render, args.repeat, 2))["p50_ms"],
+                             "kB": len(render().getvalue()) / 1024})
+
+    print_table(rows, ["chart", "points", "renderer", "p50_ms", "kB"])
+
+
+if __name__ == "__main__":
+    main()
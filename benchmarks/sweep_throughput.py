@@ -0,0 +1,81 @@
+import argparse
+import contextlib
+import io
+import time
+import warnings
+
+import control as ctrl
+import numpy as np
+from flask import Flask
+
+from benchmarks.common import print_table
+from services.service import Service
+from services.sweep_service import SweepService
+
+# Debit de la route /sweep (services/sweep_service.py , calculs vectorises) compare a la methode
+# d'avant : un ctrl.tf , un Service.performance et un ctrl.stability_margins par candidat.
+# La famille est K / (s^3 + a s^2 + 3 s + 1) avec K et a sur une grille.
+#
+#   python -m benchmarks.sweep_throughput --candidates 100 1000 10000
+
+BASE = ([1], [1, 3, 3, 1])
+
+
+def sweep_payload(count: int) -> dict:
+    side = max(int(np.sqrt(count)), 1)
+    return {
+        "parameters": [
+            {"target": "gain", "start": 0.1, "stop": 20, "count": side, "scale": "log"},
+            {"target": "den", "index": 1, "start": 1, "stop": 6, "count": max(count // side, 1), "scale": "linear"},
+        ],
+        "mode": "grid",
+        "closed_loop": False,
+        "metrics": ["poles", "step", "margins"],
+        "dtype": "float64",
+    }
+
+
+def serial(service: Service, count: int) -> float:
+    gains = np.geomspace(0.1, 20, count)
+    start = time.perf_counter()
+    # Service.performance affiche ses resultats , la sortie est ignoree
+    with contextlib.redirect_stdout(io.StringIO()):
+        for gain in gains:
+            system = ctrl.tf([gain], [1, 3, 3, 1])
+            ctrl.poles(system)
+            service.performance_data(system)
+            ctrl.stability_margins(system)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--serial-sample", type=int, default=50,
+                        help="candidats evalues un par un , le temps est extrapole")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    sweeps = SweepService()
+    service = Service()
+    per_candidate = serial(service, args.serial_sample) / args.serial_sample
+    rows = []
+    with Flask(__name__).test_request_context():
+        for count in args.candidates:
+            payload = sweep_payload(count)
+            sweeps.sweep_tf(*BASE, payload, "binary")
+            start = time.perf_counter()
+            response = sweeps.sweep_tf(*BASE, payload, "binary")
+            elapsed = time.perf_counter() - start
+            rows.append({
+                "candidates": count,
+                "sweep s": elapsed,
+                "serial s (extrapolated)": per_candidate * count,
+                "speedup": per_candidate * count / elapsed,
+                "binary bytes": len(response.get_data()),
+            })
+    print_table(rows, ["candidates", "sweep s", "serial s (extrapolated)", "speedup", "binary bytes"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import time
+import warnings
+
+import control as ctrl
+import numpy as np
+
+from benchmarks.common import print_table
+from helpers.system_cache import system_cache
+from helpers.time_grid import fixed_time_grid
+from services.service import Service
+
+# Precision de la grille adaptative (helpers/time_grid.py) par rapport a l'ancienne grille fixe
+# np.arange(0, t_max, 0.01) : la reponse adaptative est interpolee sur la grille fixe et l'erreur
+# maximale est donnee en pourcentage de l'amplitude de la reponse de reference.
+#
+#   python -m benchmarks.time_grid_accuracy
+
+SYSTEMS = {
+    "first order": ([1], [1, 1]),
+    "second order (zeta=0.2)": ([1], [1, 0.4, 1]),
+    "lightly damped (zeta=0.02)": ([1], [1, 0.04, 1]),
+    "stiff (poles -1 , -1000)": ([1000], [1, 1001, 1000]),
+    "with zero": ([1, 2], [1, 3, 2, 1]),
+    "integrator": ([1], [1, 1, 0]),
+    "unstable": ([1], [1, -0.1, 1]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--t-max", type=float, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    service = Service()
+    rows = []
+    for t_max in args.t_max:
+        for name, (num, den) in SYSTEMS.items():
+            system = system_cache.tf(num, den)
+            for kind in ("step", "impulse", "ramp"):
+                start = time.perf_counter()
+                reference_time, reference = service.simulate(system, fixed_time_grid(t_max), kind)
+                fixed_ms = (time.perf_counter() - start) * 1e3
+                start = time.perf_counter()
+                adaptive_time, adaptive = service.simulate(system, service.time_grid(t_max, system), kind)
+                adaptive_ms = (time.perf_counter() - start) * 1e3
+
+                interpolated = np.interp(reference_time, adaptive_time, adaptive)
+                amplitude = max(np.ptp(reference), 1e-12)
+                rows.append({
+                    "t_max": t_max,
+                    "system": name,
+                    "kind": kind,
+                    "fixed points": len(reference_time),
+                    "adaptive points": len(adaptive_time),
+                    "max error %": float(np.max(np.abs(interpolated - reference)) / amplitude * 100),
+                    "fixed ms": fixed_ms,
+                    "adaptive ms": adaptive_ms,
+                })
+
+    # un systeme rapide (millisecondes) : la grille fixe de 10 ms ne voit pas la dynamique
+    fast = system_cache.tf([1e6], [1, 1.4e3, 1e6])
+    exact_time = np.linspace(0, 0.02, 20001)
+    _, exact = ctrl.step_response(fast, T=exact_time)
+    adaptive_time, adaptive = service.simulate(fast, service.time_grid(0.02, fast), "step")
+    fixed_time, fixed = service.simulate(fast, fixed_time_grid(0.02, 0.01), "step")
+    rows.append({
+        "t_max": 0.02,
+        "system": "fast (wn=1000 rad/s)",
+        "kind": "step",
+        "fixed points": len(fixed_time),
+        "adaptive points": len(adaptive_time),
+        "max error %": float(np.max(np.abs(np.interp(exact_time, adaptive_time, adaptive) - exact)) * 100),
+    })
+
+    print_table(rows, ["t_max", "system", "kind", "fixed points", "adaptive points", "max error %", "fixed ms",
+                       "adaptive ms"])
+
+
+if __name__ == "__main__":
+    main()
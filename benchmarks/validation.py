@@ -0,0 +1,48 @@
+import argparse
+import json
+
+from marshmallow import INCLUDE, Schema, fields
+
+from benchmarks.common import measure, print_table, summarize
+from benchmarks.reference_models import random_state_space
+from validation.state_space_validation import StateSpaceInput
+
+# Validation des matrices d'un modele d'etat selon l'ordre : schema d'avant (fields.List(fields.List(fields.Float)) ,
+# un appel python par element) et schema actuel (validation/matrix_validation.py , conversion numpy en une fois
+# et dimensions verifiees). Pour comparaison : lecture du JSON (json.loads) du meme corps.
+#
+#   python -m benchmarks.validation --orders 10 100 300 1000
+
+
+class ListStateSpaceInput(Schema):
+    A = fields.List(fields.List(fields.Float), required=True)
+    B = fields.List(fields.List(fields.Float), required=True)
+    C = fields.List(fields.List(fields.Float), required=True)
+    D = fields.List(fields.List(fields.Float), required=True)
+
+    class Meta:
+        unknown = INCLUDE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[10, 50, 100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    schemas = {"list (before)": ListStateSpaceInput(), "numpy": StateSpaceInput()}
+    rows = []
+    for order in args.orders:
+        body = json.dumps(random_state_space(order))
+        payload = json.loads(body)
+        rows.append({"order": order, "step": "json.loads", "body_kb": len(body) / 1024,
+                     **summarize(measure(lambda: json.loads(body), args.repeat))})
+        for name, schema in schemas.items():
+            rows.append({"order": order, "step": name, "body_kb": len(body) / 1024,
+                         **summarize(measure(lambda: schema.load(payload), args.repeat))})
+
+    print_table(rows, ["order", "step", "body_kb", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+
+# La classe Settings regroupe les parametres configurables du backend ,
+# chaque parametre peut etre modifie avec une variable d'environnement du meme nom
+# ( par exemple SYSTEM_CACHE_MAX_BYTES=33554432 python main.py )
+# Les attributs en majuscule sont aussi charges dans la configuration de Flask (voir server.py)
+
+class Settings:
+    def __init__(self):
+        # cache des systemes LTI (voir helpers/system_cache.py)
+        self.SYSTEM_CACHE_MAX_BYTES = self.env_int("SYSTEM_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        self.SYSTEM_CACHE_MAX_ENTRIES = self.env_int("SYSTEM_CACHE_MAX_ENTRIES", 1024)
+        # cache des reponses rendues avec ETag (voir helpers/response_cache.py)
+        self.RESPONSE_CACHE_MAX_BYTES = self.env_int("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+        self.RESPONSE_CACHE_MAX_ENTRY_BYTES = self.env_int("RESPONSE_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024)
+        # vecteur du temps adaptatif (voir helpers/time_grid.py)
+        self.TIME_GRID_MAX_POINTS = self.env_int("TIME_GRID_MAX_POINTS", 5000)
+        self.TIME_GRID_MIN_POINTS = self.env_int("TIME_GRID_MIN_POINTS", 1000)
+        # vecteur des frequences adapte aux poles et zeros (voir helpers/frequency_grid.py)
+        self.FREQUENCY_GRID_POINTS_PER_DECADE = self.env_int("FREQUENCY_GRID_POINTS_PER_DECADE", 50)
+        self.FREQUENCY_GRID_MAX_POINTS = self.env_int("FREQUENCY_GRID_MAX_POINTS", 2000)
+        # calcul de la reponse frequentielle : "native" (voir helpers/frequency_response.py) ou "control"
+        self.FREQUENCY_RESPONSE_ENGINE = self.env_str("FREQUENCY_RESPONSE_ENGINE", "native")
+        # bande de stabilisation (+/- 5% de la valeur finale) des performances indicielles (voir helpers/step_metrics.py)
+        self.STEP_SETTLING_BAND = self.env_float("STEP_SETTLING_BAND", 0.05)
+        # moteur de simulation des reponses temporelles : "exact" , "modal" ou "control" (voir helpers/simulator.py)
+        self.SIMULATION_ENGINE = self.env_str("SIMULATION_ENGINE", "exact")
+        self.SIMULATION_MODAL_MAX_CONDITION = self.env_float("SIMULATION_MODAL_MAX_CONDITION", 1e8)
+        # reponses temporelles en flux (format "ndjson") : instants par ligne et nombre maximal d'instants
+        self.STREAM_CHUNK_POINTS = self.env_int("STREAM_CHUNK_POINTS", 2000)
+        self.STREAM_MAX_POINTS = self.env_int("STREAM_MAX_POINTS", 10_000_000)
+        # modeles d'etat creux (voir helpers/sparse_lti.py) : nombre d'etats a partir duquel A reste creuse ,
+        # nombre maximal d'etats (lignes ou colonnes d'une matrice , 400 au-dela) ,
+        # poles dominants estimes , base de Krylov (taille max , tolerance du residu) et ancres gardees par modele
+        self.SPARSE_MIN_STATES = self.env_int("SPARSE_MIN_STATES", 200)
+        self.SPARSE_MAX_STATES = self.env_int("SPARSE_MAX_STATES", 50_000)
+        self.SPARSE_POLES = self.env_int("SPARSE_POLES", 6)
+        self.SPARSE_KRYLOV_MAX_BASIS = self.env_int("SPARSE_KRYLOV_MAX_BASIS", 60)
+        self.SPARSE_KRYLOV_TOL = self.env_float("SPARSE_KRYLOV_TOL", 1e-12)
+        self.SPARSE_KRYLOV_MAX_ANCHORS = self.env_int("SPARSE_KRYLOV_MAX_ANCHORS", 4)
+        # ecriture directe du svg (voir helpers/svg_writer.py) : renderer par defaut ("matplotlib" ou "native") ,
+        # decimales des coordonnees et simplification des courbes ("none" , "rdp" ou "lttb")
+        self.SVG_RENDERER = self.env_str("SVG_RENDERER", "matplotlib")
+        self.SVG_PRECISION = self.env_int("SVG_PRECISION", 1)
+        self.SVG_SIMPLIFY = self.env_str("SVG_SIMPLIFY", "rdp")
+        self.SVG_SIMPLIFY_TOLERANCE = self.env_float("SVG_SIMPLIFY_TOLERANCE", 0.2)
+        self.SVG_LTTB_POINTS = self.env_int("SVG_LTTB_POINTS", 500)
+        # route /sweep (voir services/sweep_service.py)
+        self.SWEEP_MAX_CANDIDATES = self.env_int("SWEEP_MAX_CANDIDATES", 100000)
+        self.SWEEP_BLOCK_SIZE = self.env_int("SWEEP_BLOCK_SIZE", 4096)
+        self.SWEEP_TIME_POINTS = self.env_int("SWEEP_TIME_POINTS", 400)
+        self.SWEEP_FREQUENCY_POINTS_PER_DECADE = self.env_int("SWEEP_FREQUENCY_POINTS_PER_DECADE", 40)
+        self.SWEEP_MAX_FREQUENCY_POINTS = self.env_int("SWEEP_MAX_FREQUENCY_POINTS", 1000)
+
+        # route /jobs : file SQLite et pool de processus (voir helpers/job_store.py et helpers/job_pool.py)
+        self.JOBS_DB_PATH = self.env_str("JOBS_DB_PATH", os.path.join(tempfile.gettempdir(), "control_jobs.sqlite3"))
+        self.JOBS_MAX_WORKERS = self.env_int("JOBS_MAX_WORKERS", 2)
+        self.JOBS_MAX_QUEUED = self.env_int("JOBS_MAX_QUEUED", 1000)
+        self.JOBS_DEFAULT_TIMEOUT = self.env_float("JOBS_DEFAULT_TIMEOUT", 60.0)
+        self.JOBS_MAX_TIMEOUT = self.env_float("JOBS_MAX_TIMEOUT", 600.0)
+        self.JOBS_RESULT_TTL = self.env_float("JOBS_RESULT_TTL", 3600.0)
+        self.JOBS_MAX_WAIT = self.env_float("JOBS_MAX_WAIT", 30.0)
+        self.JOBS_POLL_INTERVAL = self.env_float("JOBS_POLL_INTERVAL", 0.05)
+        self.JOBS_LONG_POLL_INTERVAL = self.env_float("JOBS_LONG_POLL_INTERVAL", 0.5)
+        self.JOBS_PURGE_INTERVAL = self.env_float("JOBS_PURGE_INTERVAL", 60.0)
+        self.JOBS_START_METHOD = self.env_str("JOBS_START_METHOD", "spawn")
+
+        # registre des modeles (route /models , voir helpers/model_registry.py) : memoire et nombre de modeles ,
+        # expiration apres MODEL_REGISTRY_TTL secondes sans utilisation , copie dans une base SQLite locale
+        # (partagee par les workers et les jobs) si MODEL_REGISTRY_PERSIST
+        self.MODEL_REGISTRY_MAX_BYTES = self.env_int("MODEL_REGISTRY_MAX_BYTES", 128 * 1024 * 1024)
+        self.MODEL_REGISTRY_MAX_ENTRIES = self.env_int("MODEL_REGISTRY_MAX_ENTRIES", 256)
+        self.MODEL_REGISTRY_TTL = self.env_float("MODEL_REGISTRY_TTL", 3600.0)
+        self.MODEL_REGISTRY_PERSIST = self.env_bool("MODEL_REGISTRY_PERSIST", True)
+        # delai (secondes) avant qu'un modele supprime par un autre worker ne soit plus servi par ce worker
+        self.MODEL_REGISTRY_SYNC_INTERVAL = self.env_float("MODEL_REGISTRY_SYNC_INTERVAL", 1.0)
+        self.MODEL_REGISTRY_DB_PATH = self.env_str("MODEL_REGISTRY_DB_PATH",
+                                                   os.path.join(tempfile.gettempdir(), "control_models.sqlite3"))
+
+        # rendu des graphiques dans un pool de processus (voir helpers/render_pool.py) , RENDER_WORKERS=0 : un par coeur
+        self.RENDER_POOL = self.env_bool("RENDER_POOL", True)
+        self.RENDER_WORKERS = self.env_int("RENDER_WORKERS", 0)
+        self.RENDER_TIMEOUT = self.env_float("RENDER_TIMEOUT", 10.0)
+        self.RENDER_MAX_TASKS = self.env_int("RENDER_MAX_TASKS", 500)
+        self.RENDER_START_TIMEOUT = self.env_float("RENDER_START_TIMEOUT", 60.0)
+        self.RENDER_START_METHOD = self.env_str("RENDER_START_METHOD", "spawn")
+
+        # demarrage : chauffe de toutes les routes avant la premiere requete et objets du demarrage
+        # sortis du ramasse-miettes (gc.freeze) avant le fork des workers (voir helpers/warmup.py)
+        self.STARTUP_WARMUP = self.env_bool("STARTUP_WARMUP", True)
+        self.STARTUP_GC_FREEZE = self.env_bool("STARTUP_GC_FREEZE", True)
+
+        # serveur de production (voir gunicorn.conf.py et asgi.py) : adresse (PORT est fourni par heroku) ,
+        # mode "wsgi" (workers gthread ou sync) ou "asgi" (workers uvicorn , calculs dans un pool de threads) ,
+        # SERVER_WORKERS=0 : un worker par coeur
+        self.SERVER_HOST = self.env_str("SERVER_HOST", "0.0.0.0")
+        self.SERVER_PORT = self.env_int("SERVER_PORT", self.env_int("PORT", 3000))
+        self.SERVER_MODE = self.env_str("SERVER_MODE", "wsgi")
+        self.SERVER_WORKERS = self.env_int("SERVER_WORKERS", 0)
+        self.SERVER_WORKER_CLASS = self.env_str("SERVER_WORKER_CLASS", "gthread")
+        self.SERVER_THREADS = self.env_int("SERVER_THREADS", 4)
+        self.SERVER_PRELOAD = self.env_bool("SERVER_PRELOAD", True)
+        # recyclage d'un worker apres SERVER_MAX_REQUESTS requetes (+ un nombre aleatoire jusqu'a la gigue)
+        self.SERVER_MAX_REQUESTS = self.env_int("SERVER_MAX_REQUESTS", 2000)
+        self.SERVER_MAX_REQUESTS_JITTER = self.env_int("SERVER_MAX_REQUESTS_JITTER", 200)
+        self.SERVER_KEEPALIVE = self.env_int("SERVER_KEEPALIVE", 5)
+        self.SERVER_TIMEOUT = self.env_int("SERVER_TIMEOUT", 120)
+        self.SERVER_GRACEFUL_TIMEOUT = self.env_int("SERVER_GRACEFUL_TIMEOUT", 30)
+        # limites des requetes : ligne de requete , entetes (gunicorn) et corps (MAX_CONTENT_LENGTH de Flask , 413)
+        self.SERVER_LIMIT_REQUEST_LINE = self.env_int("SERVER_LIMIT_REQUEST_LINE", 4094)
+        self.SERVER_LIMIT_REQUEST_FIELDS = self.env_int("SERVER_LIMIT_REQUEST_FIELDS", 100)
+        self.SERVER_LIMIT_REQUEST_FIELD_SIZE = self.env_int("SERVER_LIMIT_REQUEST_FIELD_SIZE", 8190)
+        self.MAX_CONTENT_LENGTH = self.env_int("MAX_CONTENT_LENGTH", 16 * 1024 * 1024)
+
+        # mesure des etapes des requetes : histogrammes de /metrics et entete Server-Timing (voir helpers/metrics.py)
+        self.METRICS_ENABLED = self.env_bool("METRICS_ENABLED", True)
+        self.METRICS_SERVER_TIMING = self.env_bool("METRICS_SERVER_TIMING", True)
+
+        # profil a la demande des requetes (entete X-Profile ou fraction des requetes) , anneau de profils sur disque
+        # liste par /admin/profiles (voir helpers/profiler.py) , PROFILE_MODE : "cprofile" ou "sample"
+        self.PROFILE_ENABLED = self.env_bool("PROFILE_ENABLED", False)
+        self.PROFILE_TOKEN = self.env_str("PROFILE_TOKEN", "")
+        self.PROFILE_SAMPLE_RATE = self.env_float("PROFILE_SAMPLE_RATE", 0.0)
+        self.PROFILE_MODE = self.env_str("PROFILE_MODE", "cprofile")
+        self.PROFILE_SAMPLE_INTERVAL = self.env_float("PROFILE_SAMPLE_INTERVAL", 0.005)
+        self.PROFILE_DIR = self.env_str("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "control_profiles"))
+        self.PROFILE_MAX_ENTRIES = self.env_int("PROFILE_MAX_ENTRIES", 50)
+        self.PROFILE_MAX_PAYLOAD_BYTES = self.env_int("PROFILE_MAX_PAYLOAD_BYTES", 1024 * 1024)
+
+    def env_int(self, name: str, default: int) -> int:
+        value = os.environ.get(name)
+        return default if value in (None, "") else int(value)
+
+    def env_float(self, name: str, default: float) -> float:
+        value = os.environ.get(name)
+        return default if value in (None, "") else float(value)
+
+    def env_bool(self, name: str, default: bool) -> bool:
+        value = os.environ.get(name)
+        if value in (None, ""):
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def env_str(self, name: str, default: str) -> str:
+        value = os.environ.get(name)
+        return default if value in (None, "") else value
+
+
+settings = Settings()
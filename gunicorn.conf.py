@@ -0,0 +1,58 @@
+import os
+
+from config import settings
+from helpers.render_pool import pool_size
+
+# Configuration de gunicorn (serveur de production) , tous les parametres viennent de config.py :
+#   gunicorn -c gunicorn.conf.py
+# Une description est faite dans /docs/performance.md (section 17)
+
+# mode "wsgi" : main:app avec des workers gthread (ou sync) ,
+# mode "asgi" : asgi:app avec des workers uvicorn (calculs dans un pool de threads , voir helpers/asgi_adapter.py)
+if settings.SERVER_MODE == "asgi":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "main:app"
+    worker_class = settings.SERVER_WORKER_CLASS
+
+
+# coeurs utilisables par le processus (affinite cpu , conteneur limite ...)
+def cpu_count() -> int:
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+# un worker par coeur , independant de RENDER_WORKERS (pool_size sert seulement au pool de rendu)
+workers = settings.SERVER_WORKERS or cpu_count()
+threads = settings.SERVER_THREADS
+
+# application importee (et chauffee , voir helpers/warmup.py) une seule fois dans le maitre avant le fork
+preload_app = settings.SERVER_PRELOAD
+
+# recyclage des workers (memoire des bibliotheques numeriques) , la gigue evite qu'ils redemarrent tous ensemble
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+keepalive = settings.SERVER_KEEPALIVE
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+
+limit_request_line = settings.SERVER_LIMIT_REQUEST_LINE
+limit_request_fields = settings.SERVER_LIMIT_REQUEST_FIELDS
+limit_request_field_size = settings.SERVER_LIMIT_REQUEST_FIELD_SIZE
+
+# pool de rendu de chaque worker : les coeurs sont partages entre les workers au lieu d'un processus
+# de rendu par coeur dans chaque worker
+if settings.RENDER_WORKERS <= 0:
+    settings.RENDER_WORKERS = max(pool_size() // workers, 1)
+
+
+# dans chaque worker , apres le chargement de l'application : pool de rendu et pages partagees (voir helpers/warmup.py)
+def post_worker_init(worker):
+    from helpers.warmup import warm_worker
+    from main import app
+    warm_worker(app)
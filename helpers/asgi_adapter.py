@@ -0,0 +1,156 @@
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+
+# Adaptateur ASGI -> WSGI pour le mode asgi (voir asgi.py) : la boucle d'evenements de uvicorn garde les connexions
+# (keep-alive , clients lents , flux ndjson) sans bloquer un thread par client , l'application Flask (calculs numpy ,
+# rendus) est executee dans un pool de SERVER_THREADS threads.
+#
+# Une requete : le corps est lu en entier (413 au-dela de MAX_CONTENT_LENGTH) , l'application et l'iteration
+# de sa reponse sont faites dans un seul thread du pool , chaque morceau est envoye par la boucle
+# (file bornee : un client lent ralentit la production du flux au lieu de la garder en memoire).
+
+QUEUE_CHUNKS = 8
+
+
+class AsgiAdapter:
+    def __init__(self, wsgi_app, threads: int = None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads or settings.SERVER_THREADS,
+                                           thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            await self.send_error(send, 413, b"Request body too large.")
+            return
+
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(QUEUE_CHUNKS)
+        stopped = threading.Event()
+        future = loop.run_in_executor(self.executor, self.run, wsgi_environ(scope, body), loop, messages, stopped)
+        started = False
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                started = started or message["type"] == "http.response.start"
+                await send(message)
+        finally:
+            # client deconnecte : l'iteration de la reponse s'arrete au prochain morceau ,
+            # la file est videe pour que le thread ne reste pas bloque
+            stopped.set()
+            while not future.done():
+                try:
+                    messages.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.001)
+        try:
+            future.result()
+        except Exception as err:
+            print(err)
+            if not started:
+                await self.send_error(send, 500, b"Internal Server Error")
+                return
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    # corps de la requete , None s'il depasse MAX_CONTENT_LENGTH
+    async def read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if settings.MAX_CONTENT_LENGTH and size > settings.MAX_CONTENT_LENGTH:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    # execute dans un thread du pool : l'application WSGI , puis chaque morceau de sa reponse
+    def run(self, environ: dict, loop, messages, stopped):
+        def put(message):
+            asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put({"type": "http.response.start", "status": int(status.split(" ", 1)[0]),
+                 "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+
+        try:
+            iterable = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if stopped.is_set():
+                        break
+                    if chunk:
+                        put({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+        finally:
+            put(None)
+
+    async def send_error(self, send, status: int, body: bytes):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+# environnement WSGI (PEP 3333) d'une requete ASGI
+def wsgi_environ(scope: dict, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    result = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            result["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            continue
+        else:
+            key = "HTTP_" + name
+            result[key] = f"{result[key]},{value}" if key in result else value
+    return result
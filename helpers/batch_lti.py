@@ -0,0 +1,209 @@
+import numpy as np
+from scipy import linalg
+
+from helpers.time_grid import SETTLING_TIME_CONSTANTS
+
+# Calculs vectorises sur une famille de N systemes SISO de meme ordre (utilises par la route /sweep).
+# Chaque systeme est une fonction de transfert num(s) / den(s) , les coefficients de toute la famille
+# sont dans deux tableaux (N , n + 1) , les calculs sont faits pour tous les systemes en meme temps :
+# - poles : valeurs propres des matrices compagnons empilees (N , n , n) avec un seul appel a eigvals
+# - reponse indicielle : discretisation exacte (expm empile) de la forme canonique commandable ,
+#   puis recurrence x[k + 1] = Ad x[k] + Bd sur les N systemes
+# - reponse frequentielle : Horner sur le tableau (N , F) des s = jw
+# Les lignes invalides (coefficient dominant du denominateur nul) donnent des NaN.
+
+
+# polynomes (listes de coefficients) -> tableau (N , length) , completes par des zeros a gauche
+def pad_polynomial(coefficients, length: int) -> np.ndarray:
+    coefficients = np.atleast_1d(np.asarray(coefficients, dtype=float))
+    return np.concatenate([np.zeros(length - len(coefficients)), coefficients])
+
+
+# evaluation des polynomes de chaque ligne en s : coefficients (N , L) , s (N , F) ou (F ,) -> (N , F)
+def polyval_batch(coefficients: np.ndarray, s) -> np.ndarray:
+    s = np.asarray(s)
+    result = np.zeros(np.broadcast_shapes((coefficients.shape[0], 1), s.shape), dtype=np.result_type(s, float))
+    for column in coefficients.T:
+        result = result * s + column[:, None]
+    return result
+
+
+# coefficients (N , n + 1) des polynomes unitaires de racines roots (N , n)
+def poly_from_roots(roots: np.ndarray) -> np.ndarray:
+    count, order = roots.shape
+    coefficients = np.zeros((count, order + 1), dtype=complex)
+    coefficients[:, 0] = 1
+    for k in range(order):
+        coefficients[:, 1:k + 2] -= roots[:, k:k + 1] * coefficients[:, :k + 1]
+    return coefficients.real
+
+
+# racines des polynomes de chaque ligne , (N , L) -> (N , L - 1) , NaN si le coefficient dominant est nul
+def roots_batch(coefficients: np.ndarray) -> np.ndarray:
+    count, length = coefficients.shape
+    order = length - 1
+    if order == 0:
+        return np.empty((count, 0), dtype=complex)
+    lead = coefficients[:, 0]
+    valid = (lead != 0) & np.isfinite(coefficients).all(axis=1)
+    companion = np.zeros((count, order, order))
+    companion[:, 0, :] = -coefficients[:, 1:] / np.where(valid, lead, 1.0)[:, None]
+    companion[:, 1:, :-1] = np.eye(order - 1)
+    companion[~valid] = 0.0
+    roots = np.linalg.eigvals(companion).astype(complex)
+    roots[~valid] = np.nan
+    return roots
+
+
+# duree de simulation de chaque systeme : environ 7 constantes de temps du mode le plus lent
+# (meme regle que helpers/time_grid.settling_horizon , pour N systemes)
+def settling_horizons(poles: np.ndarray, default: float = 10.0) -> np.ndarray:
+    magnitude = np.abs(poles)
+    usable = np.isfinite(poles) & (magnitude > 0)
+    decay = np.where(usable, -poles.real, np.nan)
+    stable = usable & (decay > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stable_horizon = SETTLING_TIME_CONSTANTS / np.min(np.where(stable, decay, np.inf), axis=1)
+        unstable_horizon = SETTLING_TIME_CONSTANTS / np.min(np.where(usable & ~stable, magnitude, np.inf), axis=1)
+    horizon = np.fmax(np.where(np.isfinite(stable_horizon), stable_horizon, 0.0),
+                      np.where(np.isfinite(unstable_horizon), unstable_horizon, 0.0))
+    return np.where(horizon > 0, horizon, default)
+
+
+# reponse indicielle de N fonctions de transfert sur `points` instants , chaque systeme a son propre pas
+# horizon[i] / (points - 1) ; retourne temps (N , points) et reponse (N , points)
+def step_response_batch(num: np.ndarray, den: np.ndarray, horizon: np.ndarray, points: int):
+    count, length = den.shape
+    order = length - 1
+    lead = np.where(den[:, 0] != 0, den[:, 0], np.nan)
+    a = den / lead[:, None]
+    b = num / lead[:, None]
+    step = horizon / (points - 1)
+    time = step[:, None] * np.arange(points)
+    if order == 0:
+        return time, np.repeat((b[:, 0])[:, None], points, axis=1)
+
+    # forme canonique commandable (comme ctrl.tf2ss) : x' = A x + B u , y = C x + D u
+    direct = b[:, 0]
+    output = b[:, 1:] - direct[:, None] * a[:, 1:]
+
+    # discretisation exacte (bloqueur d'ordre zero) : expm([[A h , B h] , [0 , 0]])
+    augmented = np.zeros((count, order + 1, order + 1))
+    augmented[:, 0, :order] = -a[:, 1:]
+    augmented[:, 1:order, :order - 1] = np.eye(order - 1)
+    augmented[:, 0, order] = 1.0
+    augmented *= step[:, None, None]
+    augmented[~np.isfinite(augmented).all(axis=(1, 2))] = 0.0
+    with np.errstate(over="ignore", invalid="ignore"):
+        discrete = linalg.expm(augmented)
+    transition = discrete[:, :order, :order]
+    forced = discrete[:, :order, order]
+
+    response = np.empty((count, points))
+    state = np.zeros((count, order))
+    with np.errstate(over="ignore", invalid="ignore"):
+        for k in range(points):
+            response[:, k] = np.einsum("ni,ni->n", output, state) + direct
+            state = np.einsum("nij,nj->ni", transition, state) + forced
+    response[np.isnan(lead)] = np.nan
+    return time, response
+
+
+# recherche de racine par dichotomie (en log w) pour M fonctions en meme temps ,
+# function(w) retourne un tableau (M ,) , f(low) et f(high) sont de signes opposes
+def bisect_batch(function, low: np.ndarray, high: np.ndarray, iterations: int = 48) -> np.ndarray:
+    low, high = np.log(low), np.log(high)
+    low_sign = np.sign(function(np.exp(low)))
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        same = np.sign(function(np.exp(middle))) == low_sign
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+    return np.exp((low + high) / 2)
+
+
+# minimum de M fonctions unimodales sur [low , high] (section doree en log w)
+def golden_batch(function, low: np.ndarray, high: np.ndarray, iterations: int = 48) -> np.ndarray:
+    ratio = (np.sqrt(5) - 1) / 2
+    low, high = np.log(low), np.log(high)
+    for _ in range(iterations):
+        left = high - ratio * (high - low)
+        right = low + ratio * (high - low)
+        keep_left = function(np.exp(left)) < function(np.exp(right))
+        high = np.where(keep_left, right, high)
+        low = np.where(keep_left, low, left)
+    return np.exp((low + high) / 2)
+
+
+# pour chaque ligne , l'element de `candidates` (ligne rows[i]) dont `score` est minimal , NaN si aucun
+def select_per_row(count: int, rows: np.ndarray, score: np.ndarray, *values):
+    selected = [np.full(count, np.nan) for _ in values]
+    if rows.size == 0:
+        return selected
+    order = np.lexsort((score, rows))
+    unique_rows, first = np.unique(rows[order], return_index=True)
+    for output, value in zip(selected, values):
+        output[unique_rows] = value[order][first]
+    return selected
+
+
+# marges de stabilite de N boucles ouvertes L(s) = num(s) / den(s) , memes definitions et meme choix
+# que ctrl.stability_margins : les croisements sont encadres sur la grille omega puis calcules par dichotomie
+# sur L(jw) exact (Horner)
+def stability_margins_batch(num: np.ndarray, den: np.ndarray, omega: np.ndarray) -> dict:
+    count = num.shape[0]
+
+    # L(jw) des lignes `rows` , une frequence par ligne
+    def loop_at(rows):
+        num_rows, den_rows = num[rows], den[rows]
+        return lambda w: (polyval_batch(num_rows, 1j * w[:, None]) / polyval_batch(den_rows, 1j * w[:, None]))[:, 0]
+
+    with np.errstate(all="ignore"):
+        response = polyval_batch(num, 1j * omega) / polyval_batch(den, 1j * omega)
+
+        # croisements de gain : |L| = 1
+        gain = np.sign(np.log(np.abs(response)))
+        rows, columns = np.nonzero(gain[:, :-1] * gain[:, 1:] < 0)
+        loop = loop_at(rows)
+        wc = bisect_batch(lambda w: np.log(np.abs(loop(w))), omega[columns], omega[columns + 1])
+        phase_margin = np.remainder(np.angle(loop(wc), deg=True), 360.0) - 180.0
+        pm, wgc = select_per_row(count, rows, np.abs(phase_margin), phase_margin, wc)
+        pm = np.where(np.isnan(pm), np.inf, pm)
+
+        # croisements de phase : L(jw) traverse l'axe reel negatif
+        imag = np.sign(response.imag)
+        crossing = (imag[:, :-1] * imag[:, 1:] < 0) & (response.real[:, :-1] + response.real[:, 1:] < 0)
+        rows, columns = np.nonzero(crossing)
+        loop = loop_at(rows)
+        w180 = bisect_batch(lambda w: loop(w).imag, omega[columns], omega[columns + 1])
+        value = loop(w180)
+        # w = 0 : L(0) (gain statique) est reel , un gain statique negatif est un croisement de phase comme dans
+        # ctrl.stability_margins et helpers/frequency_grid.stability_margins (un pole en 0 donne L(0) infini , ecarte)
+        rows = np.concatenate([np.arange(count), rows])
+        w180 = np.concatenate([np.zeros(count), w180])
+        value = np.concatenate([(num[:, -1] / den[:, -1]).astype(complex), value])
+        # L = 0 (zero en 0) : marge infinie , comme aucun croisement (wpc NaN)
+        keep = np.isfinite(value) & (value.real <= 0) & (value != 0)
+        rows, w180, gain_margin = rows[keep], w180[keep], 1.0 / np.abs(value[keep])
+        gm, wpc = select_per_row(count, rows, np.abs(np.log(gain_margin)), gain_margin, w180)
+        gm = np.where(np.isnan(gm), np.inf, gm)
+
+        # marge de stabilite : minimum local de |1 + L| le plus petit
+        distance = np.abs(response + 1)
+        minima = (distance[:, 1:-1] <= distance[:, :-2]) & (distance[:, 1:-1] < distance[:, 2:])
+        rows, columns = np.nonzero(minima)
+        columns = columns + 1
+        loop = loop_at(rows)
+        wstab = golden_batch(lambda w: np.abs(loop(w) + 1), omega[columns - 1], omega[columns + 1])
+        stability = np.abs(loop(wstab) + 1)
+        sm, wms = select_per_row(count, rows, stability, stability, wstab)
+        sm = np.where(np.isnan(sm), np.inf, sm)
+
+    return {
+        "gain_margin": gm,
+        "phase_margin": pm,
+        "stability_margin": sm,
+        "phase_crossover": wpc,
+        "gain_crossover": wgc,
+        "stability_frequency": wms,
+    }
@@ -0,0 +1,163 @@
+import json
+import struct
+
+import numpy as np
+from flask import Response, request
+
+from helpers.metrics import timed
+from helpers.sanitize_data import sanitize_data
+
+# Mode "donnees" des routes de visualisation : au lieu d'une image svg (matplotlib) ,
+# la reponse contient les tableaux calcules (temps/reponse , omega/amplitude/phase , ...)
+# et le frontend dessine lui-meme les graphiques.
+#
+# Le format est choisi avec l'attribut "format" du payload , sinon avec l'entete Accept :
+#   - "svg"    : image svg (par defaut)
+#   - "json"   : {"time": [...], "response": [...]} compact
+#   - "binary" : tableaux bruts little-endian float32 ou float64 (attribut "dtype") precedes d'un entete :
+#
+#       magic "CSAR" | version (uint8) | taille d'un element en octets (uint8 : 4 ou 8) | nombre de tableaux (uint16)
+#       pour chaque tableau : longueur du nom (uint8) | nom (ascii) | nombre d'elements (uint32)
+#       des octets nuls pour aligner sur 8 octets , puis les tableaux les uns apres les autres
+#
+#     les tableaux sont envoyes directement depuis les buffers NumPy (sans conversion en listes python)
+#     version 2 (matrices des modeles d'etat , voir helpers/matrix_codec.py) : apres le nom , nombre de dimensions (uint8)
+#     et taille de chaque dimension (uint32) au lieu du nombre d'elements
+#   - "ndjson" : une ligne JSON par morceau , envoyee des qu'elle est calculee (reponse en flux , sans Content-Length) ;
+#     /step , /impulse et /ramp simulent la reponse morceau par morceau (voir Service.stream) , les autres routes
+#     envoient leurs tableaux sur une seule ligne
+
+FORMATS = ("svg", "json", "binary", "ndjson")
+DTYPES = {"float32": np.dtype("<f4"), "float64": np.dtype("<f8")}
+
+# types acceptes dans l'entete Accept pour choisir le mode donnees ,
+# application/json seul n'est pas utilise car beaucoup de clients http l'envoient par defaut
+ARRAYS_JSON_MIMETYPE = "application/vnd.cs.arrays+json"
+ARRAYS_BINARY_MIMETYPE = "application/vnd.cs.arrays"
+NDJSON_MIMETYPE = "application/x-ndjson"
+ACCEPT_FORMATS = {
+    "image/svg+xml": "svg",
+    ARRAYS_JSON_MIMETYPE: "json",
+    ARRAYS_BINARY_MIMETYPE: "binary",
+    "application/octet-stream": "binary",
+    NDJSON_MIMETYPE: "ndjson",
+}
+
+BINARY_MAGIC = b"CSAR"
+BINARY_VERSION = 1
+BINARY_SHAPED_VERSION = 2
+
+
+# format demande par le client : attribut "format" , sinon entete Accept , sinon svg
+def requested_format(output_format: str = None) -> str:
+    if output_format:
+        return output_format
+    best = request.accept_mimetypes.best_match(list(ACCEPT_FORMATS), default="image/svg+xml")
+    # "*/*" (navigateurs) correspond au premier type , donc au svg
+    return ACCEPT_FORMATS[best]
+
+
+# separer les tableaux complexes en deux tableaux reels : poles -> poles_real , poles_imag
+def split_complex(arrays: dict) -> dict:
+    result = {}
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if np.iscomplexobj(array):
+            result[f"{name}_real"] = array.real
+            result[f"{name}_imag"] = array.imag
+        else:
+            result[name] = array
+    return result
+
+
+# tableaux -> listes python (serialisables en JSON)
+def arrays_to_json(arrays: dict) -> dict:
+    body = {}
+    for name, array in split_complex(arrays).items():
+        values = np.asarray(array, dtype=float).tolist()
+        # JSON n'accepte pas NaN / Infinity , ces valeurs sont remplacees par des chaines
+        body[name] = values if np.isfinite(array).all() else sanitize_data(values)
+    return body
+
+
+def encode_json(arrays: dict) -> Response:
+    return Response(json.dumps(arrays_to_json(arrays), separators=(",", ":")), mimetype="application/json")
+
+
+# shaped : version 2 du format , la forme de chaque tableau est gardee (matrices)
+def encode_binary(arrays: dict, dtype: str = "float64", shaped: bool = False) -> Response:
+    element = DTYPES[dtype]
+    arrays = split_complex(arrays)
+    buffers = []
+    version = BINARY_SHAPED_VERSION if shaped else BINARY_VERSION
+    header = bytearray(struct.pack("<4sBBH", BINARY_MAGIC, version, element.itemsize, len(arrays)))
+    for name, array in arrays.items():
+        encoded_name = name.encode("ascii")
+        header += struct.pack("<B", len(encoded_name)) + encoded_name
+        if shaped:
+            array = np.asarray(array)
+            header += struct.pack(f"<B{array.ndim}I", array.ndim, *array.shape)
+        # pas de copie si le tableau est deja contigu et du bon type
+        array = np.ascontiguousarray(np.ravel(array), dtype=element)
+        if not shaped:
+            header += struct.pack("<I", array.size)
+        buffers.append(memoryview(array).cast("B"))
+    header += b"\0" * (-len(header) % 8)
+
+    response = Response([bytes(header), *buffers], mimetype="application/octet-stream")
+    response.headers["Content-Length"] = str(len(header) + sum(buffer.nbytes for buffer in buffers))
+    return response
+
+
+# reponse en flux : `lines` produit des dictionnaires serialisables (voir arrays_to_json) ,
+# chaque ligne est envoyee des qu'elle est produite
+def encode_ndjson(lines) -> Response:
+    def generate():
+        for line in lines:
+            yield json.dumps(line, separators=(",", ":")) + "\n"
+
+    response = Response(generate(), mimetype=NDJSON_MIMETYPE)
+    # pas de mise en tampon par un proxy (nginx) , le client recoit chaque ligne tout de suite
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@timed("encode")
+def encode_arrays(arrays: dict, output_format: str, dtype: str = "float64") -> Response:
+    if output_format == "binary":
+        return encode_binary(arrays, dtype)
+    if output_format == "ndjson":
+        return encode_ndjson([arrays_to_json(arrays)])
+    return encode_json(arrays)
+
+
+# lecture d'une reponse binaire (utilise par les benchmarks et les clients python)
+# les tableaux sont des vues sur `payload` (np.frombuffer , sans copie) , en lecture seule
+def decode_binary(payload: bytes) -> dict:
+    magic, version, itemsize, count = struct.unpack_from("<4sBBH", payload, 0)
+    if magic != BINARY_MAGIC or version not in (BINARY_VERSION, BINARY_SHAPED_VERSION) or itemsize not in (4, 8):
+        raise ValueError("Not a control-system arrays payload.")
+    dtype = DTYPES["float32"] if itemsize == 4 else DTYPES["float64"]
+    offset = 8
+    layout = []
+    for _ in range(count):
+        (name_length,) = struct.unpack_from("<B", payload, offset)
+        name = payload[offset + 1:offset + 1 + name_length].decode("ascii")
+        offset += 1 + name_length
+        if version == BINARY_SHAPED_VERSION:
+            (ndim,) = struct.unpack_from("<B", payload, offset)
+            shape = struct.unpack_from(f"<{ndim}I", payload, offset + 1)
+            offset += 1 + 4 * ndim
+        else:
+            shape = struct.unpack_from("<I", payload, offset)
+            offset += 4
+        layout.append((name, shape))
+    offset += -offset % 8
+    arrays = {}
+    for name, shape in layout:
+        size = int(np.prod(shape, dtype=np.int64))
+        if offset + size * dtype.itemsize > len(payload):
+            raise ValueError("Truncated control-system arrays payload.")
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=size, offset=offset).reshape(shape)
+        offset += size * dtype.itemsize
+    return arrays
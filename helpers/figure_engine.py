@@ -0,0 +1,194 @@
+import io
+import threading
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
+
+# Moteur de rendu des graphiques base sur l'API objet de matplotlib (Figure + FigureCanvasSVG)
+# au lieu de la machine a etats de pyplot (plt.figure , plt.plot ...) :
+# - pyplot garde toutes les figures creees dans un registre global , sans plt.close() la memoire
+#   du worker augmente a chaque requete , et ce registre n'est pas thread-safe
+# - ici chaque thread possede ses propres modeles de figures (templates) , crees une seule fois
+#   avec leurs axes , titres , grilles et echelles ; pour chaque requete on remplace seulement
+#   les donnees des courbes (set_data) et les limites des axes
+
+# sans ce sel , matplotlib genere des identifiants aleatoires dans le svg ,
+# avec un sel fixe le meme graphique donne toujours le meme fichier (et le meme ETag)
+matplotlib.rcParams["svg.hashsalt"] = "control-system-software"
+
+
+def save_figure(figure: Figure, img_format: str = "svg") -> io.BytesIO:
+    img_stream = io.BytesIO()
+    # la date est retiree des metadonnees svg pour que le fichier soit reproductible
+    figure.savefig(img_stream, format=img_format, metadata={"Date": None} if img_format == "svg" else None)
+    img_stream.seek(0)
+    return img_stream
+
+
+# mettre a jour le nombre de courbes d'un axe , une courbe par ligne de `curves`
+def update_lines(axes, lines: list, x: np.ndarray, curves: np.ndarray, **style):
+    while len(lines) < len(curves):
+        (line,) = axes.plot([], [], **style)
+        lines.append(line)
+    while len(lines) > len(curves):
+        lines.pop().remove()
+    for line, curve in zip(lines, curves):
+        line.set_data(x, curve)
+
+
+# transformer une reponse (1 courbe ou plusieurs canaux) en tableau 2-D : une courbe par ligne
+def as_curves(y, length: int) -> np.ndarray:
+    return np.asarray(y, dtype=float).reshape(-1, length)
+
+
+class TimeFigure:
+    # graphique temporel a un seul axe (reponse indicielle , impulsionnelle , rampe)
+    def __init__(self):
+        self.figure = Figure(figsize=(8, 6))
+        FigureCanvasSVG(self.figure)
+        self.axes = self.figure.add_subplot(1, 1, 1)
+        self.lines = []
+        update_lines(self.axes, self.lines, [], np.empty((1, 0)))
+        self.legend = self.axes.legend(self.lines, ["Response"])
+
+    def render(self, t, y, title, xlabel, ylabel, grid, legend, xlim, ylim) -> io.BytesIO:
+        t = np.asarray(t, dtype=float)
+        update_lines(self.axes, self.lines, t, as_curves(y, len(t)))
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.set_xlim(xlim)
+        self.axes.set_ylim(ylim)
+        self.axes.grid(grid)
+        self.legend.set_visible(bool(legend) and len(self.lines) == 1)
+        if legend:
+            self.legend.get_texts()[0].set_text(legend)
+        return save_figure(self.figure)
+
+
+class BodeFigure:
+    # diagramme de bode a deux axes (amplitude en dB et phase en degres) , frequence en echelle log
+    # avec tight=True la mise en page est recalculee a chaque rendu (plt.tight_layout)
+    def __init__(self, tight: bool = False):
+        self.tight = tight
+        self.figure = Figure(figsize=(8, 6))
+        FigureCanvasSVG(self.figure)
+        self.magnitude_axes, self.phase_axes = self.figure.subplots(2, 1)
+
+        # diagramme d'amplitude
+        self.magnitude_axes.set_title('Bode Plot')
+        self.magnitude_axes.set_ylabel('Magnitude (dB)')
+
+        # diagramme de phase
+        self.phase_axes.set_xlabel('Frequency (rad/s)')
+        self.phase_axes.set_ylabel('Phase (degrees)')
+
+        for axes in (self.magnitude_axes, self.phase_axes):
+            axes.set_xscale('log')  # pour avoir un plan logarithmic
+            axes.set_yscale('linear')
+            axes.grid(True, which='both', axis='both')
+            axes.minorticks_on()
+
+        self.magnitude_lines = []
+        self.phase_lines = []
+
+    def render(self, omega, magnitude_db, phase_deg, img_format="svg") -> io.BytesIO:
+        omega = np.asarray(omega, dtype=float)
+        update_lines(self.magnitude_axes, self.magnitude_lines, omega, as_curves(magnitude_db, len(omega)))
+        update_lines(self.phase_axes, self.phase_lines, omega, as_curves(phase_deg, len(omega)))
+        for axes in (self.magnitude_axes, self.phase_axes):
+            axes.relim()
+            axes.autoscale_view()
+        if self.tight:
+            self.figure.tight_layout()
+        return save_figure(self.figure, img_format)
+
+
+class PoleZeroFigure:
+    # carte des poles (x) et des zeros (o) dans le plan complexe
+    def __init__(self):
+        self.figure = Figure(figsize=(8, 6))
+        FigureCanvasSVG(self.figure)
+        self.axes = self.figure.add_subplot(1, 1, 1)
+        self.axes.axhline(0, color="black", linewidth=0.5, linestyle=":")
+        self.axes.axvline(0, color="black", linewidth=0.5, linestyle=":")
+        (self.poles_line,) = self.axes.plot([], [], linestyle="none", marker="x", markersize=8, label="Poles")
+        (self.zeros_line,) = self.axes.plot([], [], linestyle="none", marker="o", markersize=8,
+                                            fillstyle="none", label="Zeros")
+        self.axes.set_title("Pole-Zero Map")
+        self.axes.set_xlabel("Real")
+        self.axes.set_ylabel("Imaginary")
+        self.axes.grid(True)
+
+    def render(self, poles, zeros) -> io.BytesIO:
+        poles = np.asarray(poles, dtype=complex).ravel()
+        zeros = np.asarray(zeros, dtype=complex).ravel()
+        self.poles_line.set_data(poles.real, poles.imag)
+        self.zeros_line.set_data(zeros.real, zeros.imag)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.axes.margins(0.1)
+        return save_figure(self.figure)
+
+
+class NyquistFigure:
+    # diagramme de nyquist : H(jw) pour w > 0 (trait plein) , son symetrique pour w < 0 (pointilles)
+    # et le point critique -1
+    def __init__(self):
+        self.figure = Figure(figsize=(8, 6))
+        FigureCanvasSVG(self.figure)
+        self.axes = self.figure.add_subplot(1, 1, 1)
+        (self.positive_line,) = self.axes.plot([], [], color="tab:blue")
+        (self.negative_line,) = self.axes.plot([], [], color="tab:blue", linestyle="--")
+        self.axes.plot([-1], [0], marker="+", color="red", markersize=10)
+        self.axes.set_title("Nyquist plot")
+        self.axes.set_xlabel("Real axis")
+        self.axes.set_ylabel("Imaginary axis")
+        self.axes.grid(True)
+
+    def render(self, real, imag) -> io.BytesIO:
+        real = np.asarray(real, dtype=float)
+        imag = np.asarray(imag, dtype=float)
+        self.positive_line.set_data(real, imag)
+        self.negative_line.set_data(real, -imag)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        return save_figure(self.figure)
+
+
+class FigureEngine:
+    templates = {
+        "time": TimeFigure,
+        "bode": BodeFigure,
+        "bode_tight": lambda: BodeFigure(tight=True),
+        "pole_zero": PoleZeroFigure,
+        "nyquist": NyquistFigure,
+    }
+
+    def __init__(self):
+        # un modele de chaque type par thread , les figures ne sont jamais partagees entre threads
+        self.local = threading.local()
+
+    def template(self, kind: str):
+        pool = self.local.__dict__.setdefault("pool", {})
+        if kind not in pool:
+            pool[kind] = self.templates[kind]()
+        return pool[kind]
+
+    def time_plot(self, t, y, title="State-Space Step Response", xlabel="Time (seconds)", ylabel="Response",
+                  grid=True, legend="Response", xlim=(0, 10), ylim=(-5, 5)) -> io.BytesIO:
+        return self.template("time").render(t, y, title, xlabel, ylabel, grid, legend, xlim, ylim)
+
+    def bode_plot(self, omega, magnitude_db, phase_deg, img_format="svg", tight=False) -> io.BytesIO:
+        return self.template("bode_tight" if tight else "bode").render(omega, magnitude_db, phase_deg, img_format)
+
+    def pole_zero_plot(self, poles, zeros) -> io.BytesIO:
+        return self.template("pole_zero").render(poles, zeros)
+
+    def nyquist_plot(self, real, imag) -> io.BytesIO:
+        return self.template("nyquist").render(real, imag)
+
+
+figure_engine = FigureEngine()
@@ -0,0 +1,194 @@
+import numpy as np
+from scipy import optimize
+
+from config import settings
+
+# Generation du vecteur des frequences (rad/s) a partir des poles et des zeros du systeme.
+#
+# Chaque pole / zero r_i donne une frequence de cassure w_i = |r_i| et un amortissement z_i = -Re(r_i) / |r_i| :
+# - loin des cassures H(jw) varie lentement (droites en echelle log) , une grille log peu dense suffit
+#   (FREQUENCY_GRID_POINTS_PER_DECADE points par decade)
+# - pres d'une paire peu amortie (z_i < RESONANCE_DAMPING) la reponse a un pic (ou un creux) de largeur ~ z_i * w_i ,
+#   on ajoute des points de part et d'autre de w_i a des distances w_i * z_i / 4 ... w_i / 2 (echelle log)
+# - pres des frequences de croisement (|H| = 1 et phase = -180) on ajoute aussi des points ,
+#   ce sont les zones qui donnent les marges de stabilite
+# Le nombre total de points est limite par FREQUENCY_GRID_MAX_POINTS.
+
+RESONANCE_DAMPING = 0.5
+RESONANCE_POINTS = 20  # de chaque cote de la resonance
+CROSSOVER_POINTS = 16
+CROSSOVER_DECADES = 0.1
+DEFAULT_RANGE = (-2.0, 2.0)
+
+
+# frequences de cassure et amortissements des poles et des zeros (les racines nulles ou infinies sont ignorees)
+def break_frequencies(poles, zeros):
+    roots = np.concatenate([np.ravel(np.asarray(poles, dtype=complex)), np.ravel(np.asarray(zeros, dtype=complex))])
+    roots = roots[np.isfinite(roots) & (np.abs(roots) > 0)]
+    # une seule racine par paire conjuguee
+    roots = roots[roots.imag >= 0]
+    natural = np.abs(roots)
+    damping = np.clip(-roots.real / natural, -1.0, 1.0)
+    return natural, damping
+
+
+# intervalle [10^a , 10^b] qui couvre toutes les cassures avec `decades` decades de marge de chaque cote
+def frequency_range(poles, zeros, decades: float = 2.0) -> tuple:
+    natural, _ = break_frequencies(poles, zeros)
+    if natural.size == 0:
+        return DEFAULT_RANGE
+    return float(np.floor(np.log10(natural.min()) - decades)), float(np.ceil(np.log10(natural.max()) + decades))
+
+
+# garder au plus max_points points en conservant la densite relative (un point sur k)
+def limit_points(omega: np.ndarray, max_points: int) -> np.ndarray:
+    if len(omega) <= max_points:
+        return omega
+    return omega[np.unique(np.round(np.linspace(0, len(omega) - 1, max_points)).astype(int))]
+
+
+def frequency_grid(poles, zeros, x_axis=None, decades: float = 2.0, points_per_decade: int = None,
+                   max_points: int = None) -> np.ndarray:
+    points_per_decade = settings.FREQUENCY_GRID_POINTS_PER_DECADE if points_per_decade is None else points_per_decade
+    max_points = settings.FREQUENCY_GRID_MAX_POINTS if max_points is None else max_points
+    start, stop = frequency_range(poles, zeros, decades) if x_axis is None else (x_axis[0], x_axis[1])
+    w_min, w_max = 10.0 ** start, 10.0 ** stop
+
+    parts = [np.logspace(start, stop, max(int(np.ceil((stop - start) * points_per_decade)) + 1, 2))]
+
+    natural, damping = break_frequencies(poles, zeros)
+    lightly_damped = (np.abs(damping) < RESONANCE_DAMPING) & (natural >= w_min) & (natural <= w_max)
+    for w, z in zip(natural[lightly_damped], np.abs(damping[lightly_damped])):
+        offsets = np.geomspace(max(z, 1e-9) / 4, 0.5, RESONANCE_POINTS)
+        parts.append(w * (1 - offsets))
+        parts.append(w * (1 + offsets))
+        if z > 1e-9:
+            # pour un pole sur l'axe imaginaire H(jw) est infini en w
+            parts.append([w])
+
+    omega = np.unique(np.concatenate(parts))
+    omega = omega[(omega >= w_min) & (omega <= w_max)]
+    return limit_points(omega, max_points)
+
+
+# indices i tels que la courbe traverse |H| = 1 ou l'axe reel negatif entre omega[i] et omega[i + 1]
+def crossover_intervals(response: np.ndarray):
+    with np.errstate(divide="ignore"):
+        gain = np.sign(np.log(np.abs(response)))
+    phase = np.sign(response.imag)
+    gain_crossings = np.flatnonzero(sign_changes(gain))
+    phase_crossings = np.flatnonzero(sign_changes(phase) & (response.real[:-1] + response.real[1:] < 0))
+    return gain_crossings, phase_crossings
+
+
+# changement de signe entre deux points , ou valeur nulle exactement sur le premier point de l'intervalle
+# (entre deux points de signes opposes , un zero au bord de la grille n'est pas un croisement)
+def sign_changes(signs: np.ndarray) -> np.ndarray:
+    changes = signs[:-1] * signs[1:] < 0
+    changes[1:] |= (signs[1:-1] == 0) & (signs[:-2] * signs[2:] < 0)
+    return changes
+
+
+# ajoute des points autour des croisements , `evaluate(omega)` retourne H(j omega) ,
+# seules les nouvelles frequences sont evaluees
+def refine_crossovers(omega: np.ndarray, response: np.ndarray, evaluate, max_points: int = None):
+    max_points = settings.FREQUENCY_GRID_MAX_POINTS if max_points is None else max_points
+    gain_crossings, phase_crossings = crossover_intervals(response)
+    indices = np.union1d(gain_crossings, phase_crossings)
+    if indices.size == 0 or len(omega) >= max_points:
+        return omega, response
+
+    center = np.sqrt(omega[indices] * omega[indices + 1])
+    offsets = np.linspace(-CROSSOVER_DECADES, CROSSOVER_DECADES, CROSSOVER_POINTS)
+    extra = np.unique((center[:, None] * 10.0 ** offsets).ravel())
+    extra = extra[(extra > omega[0]) & (extra < omega[-1])]
+    extra = np.setdiff1d(extra, omega)
+    extra = limit_points(extra, max_points - len(omega))
+    if extra.size == 0:
+        return omega, response
+
+    merged = np.concatenate([omega, extra])
+    order = np.argsort(merged, kind="stable")
+    return merged[order], np.concatenate([response, evaluate(extra)])[order]
+
+
+# H(0) , nan si le systeme ne peut pas etre evalue en 0 (pole a l'origine : matrice singuliere)
+def dc_response(evaluate) -> complex:
+    try:
+        with np.errstate(all="ignore"):
+            return complex(evaluate(np.array([0.0]))[0])
+    except (ArithmeticError, ValueError, RuntimeError):
+        return complex("nan")
+
+
+# marges de stabilite (meme resultat que ctrl.stability_margins(system)) calculees sur la grille :
+# les croisements sont encadres par la grille puis calcules exactement (brentq sur H(jw)) ,
+# sans passer par les polynomes de la fonction de transfert (mal conditionnes pour un grand modele d'etat)
+# retourne gm , pm , sm , wpc , wgc , wms
+def stability_margins(omega: np.ndarray, response: np.ndarray, evaluate):
+    # le croisement de gain peut etre au bord ou hors de la grille (gain tres grand ou tres petit) ,
+    # on prolonge la grille d'une decade tant que |H| reste proche de 1 (ou au dessus) et varie vers l'exterieur
+    for _ in range(10):
+        low, high = np.abs(response[0]), np.abs(response[-1])
+        if high > 0.5 and high < np.abs(response[-2]):
+            extra = omega[-1] * np.logspace(0, 1, 11)[1:]
+            omega, response = np.concatenate([omega, extra]), np.concatenate([response, evaluate(extra)])
+        elif low < 2 and low > np.abs(response[1]):
+            extra = omega[0] * np.logspace(-1, 0, 11)[:-1]
+            omega, response = np.concatenate([extra, omega]), np.concatenate([evaluate(extra), response])
+        else:
+            break
+
+    def scalar(w):
+        return evaluate(np.array([w]))[0]
+
+    # un intervalle sans changement de signe a la reevaluation (bruit numerique la ou |H| est infime ,
+    # reponse d'un modele creux calculee par Krylov , voir helpers/sparse_lti.py) n'est pas un croisement
+    def crossing(function, low: float, high: float):
+        try:
+            return optimize.brentq(function, low, high)
+        except ValueError:
+            return None
+
+    gain_crossings, phase_crossings = crossover_intervals(response)
+    wc = [crossing(lambda w: np.log(np.abs(scalar(w))), omega[i], omega[i + 1]) for i in gain_crossings]
+    wc = np.array([w for w in wc if w is not None])
+    w_180 = [crossing(lambda w: scalar(w).imag, omega[i], omega[i + 1]) for i in phase_crossings]
+    w_180 = np.array([w for w in w_180 if w is not None])
+
+    # minimums locaux de la distance au point critique -1
+    distance = np.abs(response + 1)
+    minima = np.flatnonzero((distance[1:-1] <= distance[:-2]) & (distance[1:-1] < distance[2:])) + 1
+    wstab = np.array([optimize.minimize_scalar(lambda w: np.abs(scalar(w) + 1), method="bounded",
+                                               bounds=(omega[i - 1], omega[i + 1])).x for i in minima])
+
+    w180_resp = evaluate(w_180) if w_180.size else np.array([], dtype=complex)
+    # w = 0 : H(0) (gain statique) est reel , un gain statique negatif est un croisement de phase comme dans
+    # ctrl.stability_margins (3 / (s - 1) : GM = 1/3 a wpc = 0) , un pole en 0 (H(0) infini) est ecarte plus bas
+    w_180, w180_resp = np.append(0.0, w_180), np.append(dc_response(evaluate), w180_resp)
+    # les changements de signe a travers un pole de l'axe imaginaire ne sont pas des croisements
+    w180_keep = np.isfinite(w180_resp) & (w180_resp.real <= 0)
+    w_180, w180_resp = w_180[w180_keep], w180_resp[w180_keep]
+    wc_resp = evaluate(wc) if wc.size else np.array([], dtype=complex)
+    ws_resp = evaluate(wstab) if wstab.size else np.array([], dtype=complex)
+
+    with np.errstate(all="ignore"):
+        GM = 1.0 / np.abs(w180_resp)
+    PM = np.remainder(np.angle(wc_resp, deg=True), 360.0) - 180.0
+    SM = np.abs(ws_resp + 1.0)
+
+    # meme choix que ctrl.stability_margins(returnall=False) : la marge la plus critique
+    gm, wpc = float("inf"), float("nan")
+    if GM.size and not np.isinf(GM).all():
+        with np.errstate(all="ignore"):
+            index = np.argmin(np.abs(np.log(GM)))
+        gm, wpc = GM[index], w_180[index]
+    pm, wgc = float("inf"), float("nan")
+    if PM.size:
+        index = np.argmin(np.abs(PM))
+        pm, wgc = PM[index], wc[index]
+    sm, wms = float("inf"), float("nan")
+    if SM.size:
+        index = np.argmin(SM)
+        sm, wms = SM[index], wstab[index]
+    return float(gm), float(pm), float(sm), float(wpc), float(wgc), float(wms)
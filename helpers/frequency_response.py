@@ -0,0 +1,74 @@
+import numpy as np
+from scipy import linalg
+
+# Reponse frequentielle H(jw) sur toute une grille de frequences , sans python-control :
+#
+# - fonction de transfert : Horner vectorise sur le tableau des s = jw. Pour |s| > 1 les polynomes sont
+#   evalues en 1 / s (coefficients inverses) : num(s) / den(s) = s^(dn - dd) numr(1 / s) / denr(1 / s) ,
+#   pas de depassement de capacite pour un ordre eleve aux hautes frequences.
+# - modele d'etat : H(s) = C (sI - A)^-1 B + D , la forme de A est calculee une seule fois par modele
+#   (et gardee dans le cache des systemes) , puis chaque frequence coute O(n) ou O(n^2) au lieu d'une
+#   resolution dense O(n^3) :
+#     "modal" : A = V diag(l) V^-1 bien conditionnee , H(s) = sum_i (C V)_i (V^-1 B)_i / (s - l_i) + D
+#               (meme decomposition que le moteur de simulation modal , voir helpers/simulator.modal_form)
+#     "schur" : A = Z T Z^H (T triangulaire superieure , Z unitaire) , (sI - T) x = Z^H B est resolu par
+#               remontee , une ligne de T a la fois pour toutes les frequences (toujours applicable)
+
+
+# num(s) / den(s) pour un tableau de s complexes
+def polynomial_response(num, den, s: np.ndarray) -> np.ndarray:
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=float)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=float)), "f")
+    if num.size == 0:
+        return np.zeros(s.shape, dtype=complex)
+    s = np.asarray(s, dtype=complex)
+    response = np.empty(s.shape, dtype=complex)
+    large = np.abs(s) > 1
+    small, inverse = s[~large], 1 / s[large]
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        response[~large] = np.polyval(num, small) / np.polyval(den, small)
+        response[large] = (np.polyval(num[::-1], inverse) / np.polyval(den[::-1], inverse)
+                           * s[large] ** (len(num) - len(den)))
+    return response
+
+
+# forme de Schur complexe (T , C Z , Z^H B)
+def schur_form(A: np.ndarray, B: np.ndarray, C: np.ndarray):
+    T, Z = linalg.schur(A, output="complex")
+    return T, C @ Z, Z.conj().T @ B
+
+
+# H(s) (sorties , entrees , frequences) avec la forme modale (valeurs propres , C V , V^-1 B)
+def modal_response(modes, D: np.ndarray, s: np.ndarray) -> np.ndarray:
+    eigenvalues, output_modes, input_modes = modes
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        resolvent = 1 / (s[:, None] - eigenvalues[None, :])  # (frequences , modes)
+        weights = output_modes[:, None, :] * input_modes.T[None, :, :]  # (sorties , entrees , modes)
+        return weights @ resolvent.T + D[:, :, None]
+
+
+# H(s) (sorties , entrees , frequences) avec la forme de Schur (T , C Z , Z^H B)
+def schur_response(schur, D: np.ndarray, s: np.ndarray) -> np.ndarray:
+    T, output_schur, input_schur = schur
+    states, inputs = input_schur.shape
+    # x[i] : (frequences * entrees) , (sI - T) x = Z^H B ligne par ligne en partant de la derniere
+    solution = np.zeros((states, s.size * inputs), dtype=complex)
+    shifted = np.repeat(s, inputs)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for i in range(states - 1, -1, -1):
+            rhs = np.tile(input_schur[i], s.size) + T[i, i + 1:] @ solution[i + 1:]
+            solution[i] = rhs / (shifted - T[i, i])
+        response = (output_schur @ solution).reshape(-1, s.size, inputs)
+    return response.transpose(0, 2, 1) + D[:, :, None]
+
+
+# H(jw) (sorties , entrees , frequences) d'un modele d'etat , modes / schur peuvent venir d'un cache
+# (modes = None : A n'est pas diagonalisable de facon fiable , la forme de Schur est utilisee)
+def state_space_response(A, B, C, D, omega: np.ndarray, modes=None, schur=None) -> np.ndarray:
+    s = 1j * np.atleast_1d(np.asarray(omega, dtype=float))
+    if A.size == 0:
+        return np.repeat(D[:, :, None].astype(complex), s.size, axis=2)
+    if modes is not None:
+        return modal_response(modes, D, s)
+    return schur_response(schur_form(A, B, C) if schur is None else schur, D, s)
+
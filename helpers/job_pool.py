@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import wait
+
+from config import settings
+from helpers.job_store import job_store, JobStore, DONE, FAILED, TIMEOUT, CANCELLED, FINISHED
+
+# Pool local de processus qui executent les jobs de la route /jobs (voir services/job_service.py).
+#
+# JOBS_MAX_WORKERS processus de calcul sont demarres a la premiere soumission d'un job ; chaque processus
+# cree sa propre application Flask et execute le job en appelant la route demandee (/tf/step , /ss/bode ...)
+# avec le client de test : memes validations , memes services et meme format de reponse que l'appel direct.
+# Un thread de distribution (dans le processus du serveur) prend les jobs de la file SQLite quand un processus
+# est libre , recoit les resultats , et arrete (terminate) le processus d'un job qui depasse son timeout
+# ou qui est annule ; un nouveau processus le remplace.
+
+READY = "ready"
+
+
+# boucle d'un processus de calcul : (id , route , payload) -> (id , code HTTP , mimetype , corps , erreur)
+# le message READY est envoye quand le processus est pret (le timeout d'un job ne compte pas le demarrage)
+def worker_main(connection):
+    # le processus du job fait lui-meme ses rendus (pas de pool de rendu dans chaque processus de calcul)
+    settings.RENDER_POOL = False
+    from server import Server  # import lourd (matplotlib , control) fait une seule fois par processus
+    app = Server().app
+    if settings.STARTUP_WARMUP:
+        from helpers.warmup import replay
+        replay(app)
+    client = app.test_client()
+    connection.send(READY)
+    while True:
+        try:
+            job_id, path, payload = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            response = client.post(path, json=payload)
+            connection.send((job_id, response.status_code, response.mimetype, response.get_data(), None))
+        except Exception as err:
+            connection.send((job_id, 500, "application/json", None, str(err)))
+
+
+class Worker:
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.job = None  # id du job en cours
+        self.deadline = None
+
+    def start(self, job: dict):
+        self.job = job["id"]
+        self.deadline = time.monotonic() + job["timeout"]
+        self.connection.send((job["id"], f"/{job['model']}/{job['analysis']}", job["payload"]))
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(5)
+        self.connection.close()
+
+
+class JobPool:
+    def __init__(self, store: JobStore, max_workers: int = None):
+        self.store = store
+        self.max_workers = settings.JOBS_MAX_WORKERS if max_workers is None else max_workers
+        self.workers = []
+        self.context = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()  # nouveau job soumis
+        self.finished = threading.Condition()  # un job de ce processus est termine (attente longue)
+        self.last_purge = 0.0
+
+    # demarrage du thread de distribution (et des processus) a la premiere soumission
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.store.requeue_orphans()
+            self.context = multiprocessing.get_context(settings.JOBS_START_METHOD)
+            self.workers = [Worker(self.context) for _ in range(self.max_workers)]
+            self.thread = threading.Thread(target=self.run, name="job-pool", daemon=True)
+            self.thread.start()
+
+    def submit(self):
+        self.start()
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                self.step()
+            except Exception as err:
+                print(err)
+                time.sleep(settings.JOBS_POLL_INTERVAL)
+
+    def step(self):
+        for worker in self.workers:
+            if worker.ready and worker.job is None:
+                job = self.store.claim(os.getpid())
+                if job is None:
+                    break
+                worker.start(job)
+
+        # processus en demarrage ou en calcul : on attend leurs messages , sinon une nouvelle soumission
+        waiting = [worker for worker in self.workers if not worker.ready or worker.job is not None]
+        if not waiting:
+            self.wakeup.wait(settings.JOBS_POLL_INTERVAL)
+            self.wakeup.clear()
+        else:
+            ready = wait([worker.connection for worker in waiting], timeout=settings.JOBS_POLL_INTERVAL)
+            for worker in waiting:
+                if worker.connection in ready:
+                    self.receive(worker)
+        self.supervise()
+
+        if time.monotonic() - self.last_purge > settings.JOBS_PURGE_INTERVAL:
+            self.store.purge()
+            self.last_purge = time.monotonic()
+
+    def receive(self, worker: Worker):
+        try:
+            message = worker.connection.recv()
+        except (EOFError, OSError):
+            self.replace(worker, FAILED, 500, "The job process exited unexpectedly.")
+            return
+        if message == READY:
+            worker.ready = True
+            return
+        job_id, status_code, mimetype, body, error = message
+        status = DONE if error is None and status_code < 400 else FAILED
+        self.store.finish(job_id, status, status_code, mimetype, body, error)
+        worker.job = None
+        self.notify()
+
+    # timeouts , annulations et processus arretes
+    def supervise(self):
+        cancelled = self.store.cancel_requested([worker.job for worker in self.workers if worker.job is not None])
+        now = time.monotonic()
+        for worker in list(self.workers):
+            if worker.job is not None and worker.job in cancelled:
+                self.replace(worker, CANCELLED, None, "Job cancelled.")
+            elif worker.job is not None and now > worker.deadline:
+                self.replace(worker, TIMEOUT, 504, "Job exceeded its timeout.")
+            elif not worker.process.is_alive():
+                self.replace(worker, FAILED, 500, "The job process exited unexpectedly.")
+
+    # arrete le processus du job en cours , enregistre l'etat du job et demarre un nouveau processus
+    def replace(self, worker: Worker, status: str, status_code, error: str):
+        if worker.job is not None:
+            self.store.finish(worker.job, status, status_code, "application/json", None, error)
+        worker.stop()
+        self.workers[self.workers.index(worker)] = Worker(self.context)
+        self.notify()
+
+    def notify(self):
+        with self.finished:
+            self.finished.notify_all()
+
+    # attente longue : retourne l'etat du job des qu'il est termine , ou apres `timeout` secondes
+    def wait(self, job_id: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        job = self.store.get(job_id)
+        while job is not None and job["status"] not in FINISHED:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # le job peut etre termine par un autre processus : la base est relue regulierement
+            with self.finished:
+                self.finished.wait(min(remaining, settings.JOBS_LONG_POLL_INTERVAL))
+            job = self.store.get(job_id)
+        return job
+
+
+job_pool = JobPool(job_store)
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import settings
+
+# File d'attente et resultats des jobs (route /jobs , voir services/job_service.py) dans une base SQLite locale :
+# pas de broker externe , les jobs en attente survivent a un redemarrage du serveur , et plusieurs processus
+# (workers gunicorn) peuvent partager la meme file (la prise d'un job est une transaction BEGIN IMMEDIATE).
+#
+# Etats d'un job : queued -> running -> done | failed | timeout , ou cancelled (annule par le client)
+# Un job termine garde son resultat (corps , mimetype , code HTTP de la route) pendant JOBS_RESULT_TTL secondes.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, TIMEOUT, CANCELLED)
+
+# colonnes retournees par get (le corps du resultat est lu seulement par result)
+STATUS_COLUMNS = ("id", "model", "analysis", "status", "timeout", "created", "started", "finished", "expires",
+                  "status_code", "error")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timeout REAL NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    expires REAL,
+    owner INTEGER,
+    cancel INTEGER NOT NULL DEFAULT 0,
+    status_code INTEGER,
+    mimetype TEXT,
+    body BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = None):
+        self.path = settings.JOBS_DB_PATH if path is None else path
+        self.lock = threading.Lock()
+        self.connection = None
+
+    # la connexion est ouverte a la premiere utilisation (pas de fichier cree si /jobs n'est jamais utilise)
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+        return self.connection
+
+    def create(self, model: str, analysis: str, payload: dict, timeout: float) -> dict:
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.connect().execute(
+                "INSERT INTO jobs (id, model, analysis, payload, status, timeout, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, model, analysis, json.dumps(payload), QUEUED, timeout, time.time()),
+            )
+        return self.get(job_id)
+
+    # etat d'un job , None s'il n'existe pas ou si son resultat a expire
+    def get(self, job_id: str):
+        with self.lock:
+            row = self.connect().execute(
+                f"SELECT {', '.join(STATUS_COLUMNS)} FROM jobs WHERE id = ? AND (expires IS NULL OR expires > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+        return None if row is None else dict(zip(STATUS_COLUMNS, row))
+
+    # (code HTTP , mimetype , corps) du resultat d'un job termine
+    def result(self, job_id: str):
+        with self.lock:
+            return self.connect().execute(
+                "SELECT status_code, mimetype, body FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+    def count(self, status: str) -> int:
+        with self.lock:
+            return self.connect().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    # prend le plus ancien job en attente pour le processus `owner` , None si la file est vide
+    def claim(self, owner: int):
+        with self.lock:
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT id, model, analysis, payload, timeout FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE jobs SET status = ?, started = ?, owner = ? WHERE id = ?",
+                                       (RUNNING, time.time(), owner, row[0]))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "model": row[1], "analysis": row[2], "payload": json.loads(row[3]), "timeout": row[4]}
+
+    def finish(self, job_id: str, status: str, status_code: int = None, mimetype: str = None, body: bytes = None,
+               error: str = None):
+        now = time.time()
+        with self.lock:
+            self.connect().execute(
+                "UPDATE jobs SET status = ?, finished = ?, expires = ?, status_code = ?, mimetype = ?, body = ?, "
+                "error = ? WHERE id = ? AND status IN (?, ?)",
+                (status, now, now + settings.JOBS_RESULT_TTL, status_code, mimetype, body, error, job_id,
+                 QUEUED, RUNNING),
+            )
+
+    # un job en attente est annule tout de suite , un job en cours est marque (le pool arrete son processus)
+    def cancel(self, job_id: str):
+        now = time.time()
+        with self.lock:
+            connection = self.connect()
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished = ?, expires = ?, error = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, now + settings.JOBS_RESULT_TTL, "Job cancelled.", job_id, QUEUED),
+            )
+            connection.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    # parmi les jobs `job_ids` (en cours) , ceux dont l'annulation est demandee
+    def cancel_requested(self, job_ids: list) -> set:
+        if not job_ids:
+            return set()
+        with self.lock:
+            rows = self.connect().execute(
+                f"SELECT id FROM jobs WHERE cancel = 1 AND id IN ({', '.join('?' * len(job_ids))})", job_ids
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    # jobs "running" d'un processus qui n'existe plus (arret brutal du serveur) : remis dans la file
+    def requeue_orphans(self):
+        with self.lock:
+            connection = self.connect()
+            rows = connection.execute("SELECT id, owner FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            for job_id, owner in rows:
+                if owner is None or not process_alive(owner):
+                    connection.execute("UPDATE jobs SET status = ?, started = NULL, owner = NULL WHERE id = ?",
+                                       (QUEUED, job_id))
+
+    # suppression des jobs termines dont le resultat a expire
+    def purge(self) -> int:
+        with self.lock:
+            cursor = self.connect().execute("DELETE FROM jobs WHERE expires IS NOT NULL AND expires <= ?",
+                                            (time.time(),))
+        return cursor.rowcount
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+job_store = JobStore()
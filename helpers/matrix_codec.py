@@ -0,0 +1,174 @@
+import base64
+import io
+import json
+import struct
+
+import numpy as np
+from flask import Response, g, request
+from scipy import sparse
+
+from config import settings
+from helpers.data_encoder import ARRAYS_BINARY_MIMETYPE, BINARY_MAGIC, DTYPES, decode_binary, encode_binary
+
+# Modeles d'etat en format compact : au lieu des listes de listes du JSON (plusieurs Mo a lire pour un modele
+# de 1000 etats) les matrices A , B , C et D peuvent etre envoyees a ss_router :
+# - "npz" : archive numpy (np.savez , sans pickle) avec les tableaux A , B , C et D
+# - "npy" : quatre fichiers .npy a la suite (np.save de A , B , C puis D dans le meme fichier)
+# - "binary" : format binaire des reponses (voir helpers/data_encoder.py) en version 2 , avec la forme des tableaux
+# - "base64" : dans le JSON , {"A": {"dtype": "float64", "shape": [n, n], "data": "<base64>"} , ...}
+#   (octets little-endian , ligne par ligne) , les autres attributs restent en JSON
+#
+# Les trois formats binaires sont envoyes avec Content-Type application/x-npz , application/vnd.cs.arrays
+# ou application/octet-stream (le format est reconnu par les premiers octets) , les autres attributs de la requete
+# (t_max , x_axis , format ...) sont passes dans la query string en JSON : /ss/step?t_max=10&x_axis=[0,10]&y_axis=[-1,2]
+# Les tableaux sont lus avec np.frombuffer , sans listes python intermediaires.
+#
+# Les conversions qui retournent un modele d'etat (/tf/tf_to_ss , /ss/close_loop) repondent dans le format de
+# l'attribut "matrix_format" , sinon de l'entete Accept , sinon dans le format du modele recu (json par defaut).
+#
+# Matrices creuses (voir helpers/sparse_lti.py) : format COO , {"shape": [lignes , colonnes], "row": [...],
+# "col": [...], "data": [...]} dans le JSON , ou les tableaux A_shape , A_row , A_col et A_data (memes noms pour
+# B , C et D) dans une archive npz ou un corps binaire.
+
+NPZ_MIMETYPE = "application/x-npz"
+NPY_MIMETYPE = "application/x-npy"
+BINARY_MIMETYPES = (NPZ_MIMETYPE, NPY_MIMETYPE, ARRAYS_BINARY_MIMETYPE, "application/octet-stream")
+MATRIX_FORMATS = ("json", "base64", "binary", "npz", "npy")
+MATRIX_NAMES = ("A", "B", "C", "D")
+ACCEPT_MATRIX_FORMATS = {
+    NPZ_MIMETYPE: "npz",
+    NPY_MIMETYPE: "npy",
+    ARRAYS_BINARY_MIMETYPE: "binary",
+    "application/octet-stream": "binary",
+}
+NPY_MAGIC = b"\x93NUMPY"
+NPZ_MAGIC = b"PK"
+
+
+def is_binary_request() -> bool:
+    return request.mimetype in BINARY_MIMETYPES
+
+
+# corps de la requete : JSON , ou matrices binaires et attributs de la query string
+def request_payload():
+    if not is_binary_request():
+        payload = request.get_json()
+        if isinstance(payload, dict) and any(isinstance(payload.get(name), dict) and "row" not in payload[name]
+                                             for name in MATRIX_NAMES):
+            g.matrix_format = "base64"
+        return payload
+    arrays, g.matrix_format = decode_matrices(request.get_data(cache=True))
+    return {**query_options(), **arrays}
+
+
+# attributs de la query string , chaque valeur est lue en JSON si possible (t_max=10 , x_axis=[0,10]) , sinon texte
+def query_options() -> dict:
+    options = {}
+    for name, value in request.args.items():
+        try:
+            options[name] = json.loads(value)
+        except ValueError:
+            options[name] = value
+    return options
+
+
+# matrices d'un corps binaire : ({"A": ... , "D": ...} , format)
+def decode_matrices(body: bytes):
+    try:
+        if body.startswith(NPZ_MAGIC):
+            with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+                arrays, matrix_format = {name: archive[name] for name in archive.files}, "npz"
+        elif body.startswith(NPY_MAGIC):
+            stream = io.BytesIO(body)
+            arrays = {name: np.lib.format.read_array(stream, allow_pickle=False) for name in MATRIX_NAMES}
+            matrix_format = "npy"
+        elif body.startswith(BINARY_MAGIC):
+            arrays, matrix_format = decode_binary(body), "binary"
+        else:
+            raise ValueError("Unknown binary model format: expected a .npz archive, .npy arrays or a CSAR payload.")
+    except (struct.error, EOFError, OSError) as err:
+        raise ValueError(f"Invalid binary model: {err}")
+    for name in MATRIX_NAMES:
+        if f"{name}_row" in arrays:
+            arrays[name] = {part: arrays[f"{name}_{part}"] for part in ("shape", "row", "col", "data")
+                            if f"{name}_{part}" in arrays}
+    return {name: array for name, array in arrays.items() if name in MATRIX_NAMES}, matrix_format
+
+
+# matrice envoyee en base64 : {"dtype": "float64" , "shape": [lignes , colonnes] , "data": "..."}
+def decode_base64_matrix(value: dict) -> np.ndarray:
+    dtype = DTYPES.get(str(value.get("dtype", "float64")))
+    shape = value.get("shape")
+    if dtype is None:
+        raise ValueError("dtype must be float32 or float64.")
+    if not isinstance(shape, list) or len(shape) != 2 or not all(isinstance(size, int) and size >= 0 for size in shape):
+        raise ValueError("shape must be [rows, columns].")
+    try:
+        data = base64.b64decode(value.get("data", ""), validate=True)
+    except (ValueError, TypeError):
+        raise ValueError("data is not valid base64.")
+    if len(data) != shape[0] * shape[1] * dtype.itemsize:
+        raise ValueError(f"data has {len(data)} bytes, expected {shape[0] * shape[1] * dtype.itemsize} for shape {shape}.")
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+# matrice creuse au format COO : {"shape": [lignes , colonnes] , "row": [...] , "col": [...] , "data": [...]}
+# (les doublons sont additionnes) , la forme declaree est limitee a SPARSE_MAX_STATES lignes et colonnes
+def decode_coo_matrix(value: dict) -> sparse.csr_array:
+    shape = np.asarray(value.get("shape", ()))
+    if shape.shape != (2,) or shape.dtype.kind not in "iu" or (shape < 0).any():
+        raise ValueError("shape must be [rows, columns].")
+    check_shape(shape)
+    try:
+        row, col = (np.asarray(value.get(name, ()), dtype=np.int64) for name in ("row", "col"))
+        data = np.asarray(value.get("data", ()), dtype=np.float64)
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError("row and col must be integers and data must be numbers.")
+    if row.ndim != 1 or row.shape != col.shape or row.shape != data.shape:
+        raise ValueError("row, col and data must be lists of the same length.")
+    rows, columns = int(shape[0]), int(shape[1])
+    if row.size and (row.min() < 0 or row.max() >= rows or col.min() < 0 or col.max() >= columns):
+        raise ValueError(f"row and col must be inside the shape {[rows, columns]}.")
+    if not np.isfinite(data).all():
+        raise ValueError("data must be finite.")
+    return sparse.csr_array((data, (row, col)), shape=(rows, columns))
+
+
+# une matrice (creuse ou non) a au plus SPARSE_MAX_STATES lignes et colonnes : une forme declaree de 10^7 etats
+# dans un petit corps bloquerait un worker (simulation) ou epuiserait la memoire
+def check_shape(shape):
+    if max(shape, default=0) > settings.SPARSE_MAX_STATES:
+        raise ValueError(f"Matrices are limited to {settings.SPARSE_MAX_STATES} rows and columns, got shape "
+                         f"{[int(size) for size in shape]}.")
+
+
+# format de reponse d'une conversion : attribut matrix_format , entete Accept , format du modele recu , json
+def response_matrix_format(data: dict) -> str:
+    if data.get("matrix_format"):
+        return data["matrix_format"]
+    best = request.accept_mimetypes.best_match(list(ACCEPT_MATRIX_FORMATS))
+    if best is not None and request.accept_mimetypes[best] > request.accept_mimetypes["application/json"]:
+        return ACCEPT_MATRIX_FORMATS[best]
+    return g.get("matrix_format", "json")
+
+
+# reponse avec les matrices d'un modele d'etat dans le format demande (json : comme avant , listes de listes)
+def encode_matrices(matrices: dict, matrix_format: str = "json", dtype: str = "float64"):
+    matrices = {name: np.atleast_2d(np.asarray(matrix, dtype=float)) for name, matrix in matrices.items()}
+    if matrix_format == "base64":
+        element = DTYPES[dtype]
+        return {name: {"dtype": dtype, "shape": list(matrix.shape),
+                       "data": base64.b64encode(np.ascontiguousarray(matrix, dtype=element)).decode("ascii")}
+                for name, matrix in matrices.items()}
+    if matrix_format == "binary":
+        return encode_binary(matrices, dtype, shaped=True)
+    if matrix_format == "npz":
+        stream = io.BytesIO()
+        np.savez(stream, **{name: matrix.astype(DTYPES[dtype]) for name, matrix in matrices.items()})
+        return Response(stream.getvalue(), mimetype=NPZ_MIMETYPE)
+    if matrix_format == "npy":
+        stream = io.BytesIO()
+        for name in MATRIX_NAMES:
+            np.save(stream, matrices[name].astype(DTYPES[dtype]), allow_pickle=False)
+        return Response(stream.getvalue(), mimetype=NPY_MIMETYPE)
+    return {name: matrix.tolist() for name, matrix in matrices.items()}
@@ -0,0 +1,176 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import ContextDecorator
+
+from flask import Response, g, request
+
+from config import settings
+
+# Mesure des etapes d'une requete (validation , construction du modele , simulation , rendu ...) :
+# - timed("stage") est un gestionnaire de contexte ou un decorateur , la duree est ajoutee aux etapes
+#   de la requete courante (rien n'est mesure hors d'une requete : benchmarks , scripts)
+# - a la fin de la requete les etapes sont envoyees dans l'entete Server-Timing et ajoutees aux histogrammes
+#   (par route et par etape) , servis avec les compteurs des caches par /metrics (format texte de Prometheus)
+#
+# Le cout est de quelques microsecondes par etape : les durees de la requete sont gardees dans un dict
+# propre au thread (contextvars) , les histogrammes sont mis a jour une seule fois par requete.
+# Les metriques sont celles du processus : avec gunicorn chaque worker a les siennes (voir docs/performance.md).
+
+# bornes des histogrammes (secondes)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+current_stages = contextvars.ContextVar("current_stages", default=None)
+
+
+class timed(ContextDecorator):
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.starts = threading.local()
+
+    def __enter__(self):
+        # une pile par thread : le meme objet peut etre utilise par plusieurs threads et de maniere imbriquee
+        stack = getattr(self.starts, "stack", None)
+        if stack is None:
+            stack = self.starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.starts.stack.pop()
+        stages = current_stages.get()
+        if stages is not None:
+            stages[self.stage] = stages.get(self.stage, 0.0) + elapsed
+        return False
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # le dernier compteur : au-dela de la derniere borne (+Inf)
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (route , methode) -> Histogram
+        self.stages = {}  # (route , etape) -> Histogram
+        self.responses = {}  # (route , code) -> nombre
+        self.in_flight = 0
+
+    # remise a zero (apres la chauffe du demarrage , voir helpers/warmup.py)
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.stages.clear()
+            self.responses.clear()
+
+    # enregistre les hooks de mesure et la route /metrics sur l'application Flask (voir server.py)
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.export, methods=["GET"])
+
+    def before_request(self):
+        g.metrics_start = time.perf_counter()
+        current_stages.set({})
+        with self.lock:
+            self.in_flight += 1
+
+    def after_request(self, response):
+        start = g.get("metrics_start")
+        stages = current_stages.get()
+        if start is None or stages is None:
+            return response
+        total = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        with self.lock:
+            self.requests.setdefault((route, request.method), Histogram()).observe(total)
+            for stage, elapsed in stages.items():
+                self.stages.setdefault((route, stage), Histogram()).observe(elapsed)
+            key = (route, response.status_code)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+        if settings.METRICS_SERVER_TIMING:
+            timings = [f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in stages.items()]
+            timings.append(f"total;dur={total * 1000:.2f}")
+            response.headers["Server-Timing"] = ", ".join(timings)
+            response.headers["Timing-Allow-Origin"] = "*"
+        return response
+
+    def teardown_request(self, error=None):
+        if g.pop("metrics_start", None) is not None:
+            with self.lock:
+                self.in_flight -= 1
+        current_stages.set(None)
+
+    def export(self):
+        return Response(self.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    # format texte de Prometheus (https://prometheus.io/docs/instrumenting/exposition_formats/)
+    def render(self) -> str:
+        from helpers.render_pool import render_pool
+        from helpers.response_cache import response_cache
+        from helpers.system_cache import system_cache
+
+        lines = []
+        with self.lock:
+            histogram(lines, "control_request_duration_seconds", "Request duration by route.",
+                      ("route", "method"), self.requests)
+            histogram(lines, "control_stage_duration_seconds", "Time spent in each stage of a request.",
+                      ("route", "stage"), self.stages)
+            lines += ["# HELP control_responses_total Responses by route and status code.",
+                      "# TYPE control_responses_total counter"]
+            for (route, status), count in sorted(self.responses.items()):
+                lines.append(f"control_responses_total{labels(route=route, status=status)} {count}")
+            gauge(lines, "control_requests_in_flight", "Requests being processed.", self.in_flight)
+
+        for name, stats in (("system_cache", system_cache.stats()), ("response_cache", response_cache.stats())):
+            for key in ("hits", "misses", "evictions", "not_modified"):
+                if key in stats:
+                    counter(lines, f"control_{name}_{key}_total", f"{name} {key}.", stats[key])
+            gauge(lines, f"control_{name}_entries", f"{name} entries.", stats["entries"])
+            gauge(lines, f"control_{name}_bytes", f"{name} size in bytes.", stats["bytes"])
+
+        if settings.RENDER_POOL:
+            gauge(lines, "control_render_workers", "Render processes started.", len(render_pool.workers))
+            gauge(lines, "control_render_workers_idle", "Render processes ready and idle.", render_pool.idle.qsize())
+        return "\n".join(lines) + "\n"
+
+
+def labels(**values) -> str:
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in values.items()) + "}"
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# histograms : (valeurs des labels) -> Histogram
+def histogram(lines: list, name: str, description: str, label_names: tuple, histograms: dict):
+    lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for key, values in sorted(histograms.items()):
+        base = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), values.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{labels(**base, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{labels(**base)} {values.total}")
+        lines.append(f"{name}_count{labels(**base)} {cumulative}")
+
+
+def gauge(lines: list, name: str, description: str, value):
+    lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"]
+
+
+def counter(lines: list, name: str, description: str, value):
+    lines += [f"# HELP {name} {description}", f"# TYPE {name} counter", f"{name} {value}"]
+
+
+metrics = Metrics()
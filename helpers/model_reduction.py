@@ -0,0 +1,119 @@
+import numpy as np
+from scipy import linalg
+
+# Reduction d'ordre des modeles d'etat par troncature equilibree (balanced truncation) , sans slycot :
+#
+# - la partie instable (et marginalement stable) est separee (forme de Schur ordonnee puis equation de Sylvester)
+#   et gardee telle quelle , seule la partie stable est reduite
+# - gramiens de la partie stable : A P + P A^T + B B^T = 0 et A^T Q + Q A + C^T C = 0 (Lyapunov) ,
+#   methode "square root" : P = Lp Lp^T , Q = Lq Lq^T , Lq^T Lp = U S V^T ,
+#   S : valeurs singulieres de Hankel (energie de chaque etat equilibre en entree et en sortie)
+#   T = Lp V S^-1/2 et T^-1 = S^-1/2 U^T Lq^T donnent la realisation equilibree (les etats de valeur singuliere
+#   negligeable , non commandables ou non observables , sont retires)
+# - l'ordre reduit garde les r premiers etats equilibres :
+#     "truncate" : A11 , B1 , C1 , D (exacte en haute frequence)
+#     "matchdc"  : perturbation singuliere , les etats retires sont a l'equilibre (meme gain statique)
+#   dans les deux cas ||H - Hr||inf <= 2 (s_r+1 + ... + s_n) (borne a priori)
+#
+# La realisation equilibree est calculee une fois par modele (cache des systemes) , chaque ordre ou tolerance
+# demande ensuite seulement des extractions de blocs.
+
+METHODS = ("truncate", "matchdc")
+
+# valeur singuliere de Hankel negligeable (relative a la plus grande)
+NEGLIGIBLE_HSV = 1e-12
+# pole considere instable (garde) si Re(p) >= -STABILITY_MARGIN * max(1 , |A|)
+STABILITY_MARGIN = 1e-9
+
+
+class BalancedRealization:
+    def __init__(self, stable: tuple, unstable: tuple, D: np.ndarray, hsv: np.ndarray):
+        self.stable = stable  # (A , B , C) equilibree , etats par valeur singuliere decroissante
+        self.unstable = unstable  # (A , B , C) gardee
+        self.D = D
+        self.hsv = hsv  # valeurs singulieres de Hankel de toute la partie stable
+
+    @property
+    def order(self) -> int:
+        return self.stable[0].shape[0] + self.unstable[0].shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(matrix.nbytes for matrix in (*self.stable, *self.unstable, self.D, self.hsv))
+
+
+# facteur L tel que M = L L^T pour une matrice symetrique semi-definie (valeurs propres negatives d'arrondi a 0)
+def psd_factor(matrix: np.ndarray) -> np.ndarray:
+    values, vectors = linalg.eigh((matrix + matrix.T) / 2)
+    return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def balanced_realization(A, B, C, D) -> BalancedRealization:
+    A, B, C, D = (np.atleast_2d(np.asarray(matrix, dtype=float)) for matrix in (A, B, C, D))
+    states = A.shape[0] if A.size else 0
+    if states == 0:
+        empty = (np.zeros((0, 0)), np.zeros((0, D.shape[1])), np.zeros((D.shape[0], 0)))
+        return BalancedRealization(empty, empty, D, np.zeros(0))
+
+    margin = STABILITY_MARGIN * max(1.0, linalg.norm(A, 1))
+    T, Z, count = linalg.schur(A, output="real", sort=lambda real, imag: real < -margin)
+    Bz, Cz = Z.T @ B, C @ Z
+    A11, A12, A22 = T[:count, :count], T[:count, count:], T[count:, count:]
+    # decouplage : [[I , X] , [0 , I]] avec A11 X - X A22 + A12 = 0
+    X = linalg.solve_sylvester(A11, -A22, -A12) if 0 < count < states else np.zeros((count, states - count))
+    Bs, Cs = Bz[:count] - X @ Bz[count:], Cz[:, :count]
+    unstable = (A22, Bz[count:], Cz[:, :count] @ X + Cz[:, count:])
+    if count == 0:
+        return BalancedRealization((np.zeros((0, 0)), Bs, Cs), unstable, D, np.zeros(0))
+
+    Lp = psd_factor(linalg.solve_continuous_lyapunov(A11, -Bs @ Bs.T))
+    Lq = psd_factor(linalg.solve_continuous_lyapunov(A11.T, -Cs.T @ Cs))
+    U, hsv, Vt = linalg.svd(Lq.T @ Lp)
+    kept = int(np.count_nonzero(hsv > NEGLIGIBLE_HSV * hsv[0])) if hsv.size and hsv[0] > 0 else 0
+    scale = 1 / np.sqrt(hsv[:kept])
+    right = Lp @ Vt[:kept].T * scale
+    left = (U[:, :kept] * scale).T @ Lq.T
+    return BalancedRealization((left @ A11 @ right, left @ Bs, Cs @ right), unstable, D, hsv)
+
+
+# borne a priori 2 (s_r+1 + ... + s_n) pour chaque nombre r d'etats stables gardes (r = 0 ... n)
+def error_bounds(hsv: np.ndarray) -> np.ndarray:
+    return np.append(2 * np.cumsum(hsv[::-1])[::-1], 0.0)
+
+
+# modele reduit (A , B , C , D) et description : ordre demande (`order`) ou plus petit ordre dont la borne
+# d'erreur est sous `tolerance` , ValueError si l'ordre est plus petit que le nombre de poles instables
+def reduce_realization(realization: BalancedRealization, order: int = None, tolerance: float = None,
+                       method: str = "truncate"):
+    (A, B, C), (Au, Bu, Cu) = realization.stable, realization.unstable
+    minimal, unstable = A.shape[0], Au.shape[0]
+    bounds = error_bounds(realization.hsv)
+    if order is not None:
+        if order < unstable:
+            raise ValueError(f"order must be at least {unstable} (number of unstable poles, kept by the reduction).")
+        kept = min(order - unstable, minimal)
+    else:
+        kept = int(np.argmax(bounds[:minimal + 1] <= tolerance)) if (bounds[:minimal + 1] <= tolerance).any() \
+            else minimal
+
+    Ar, Br, Cr, Dr = A[:kept, :kept], B[:kept], C[:, :kept], realization.D
+    if method == "matchdc" and kept < minimal:
+        A12, A21, A22 = A[:kept, kept:], A[kept:, :kept], A[kept:, kept:]
+        B2, C2 = B[kept:], C[:, kept:]
+        # etats retires a l'equilibre : x2 = -A22^-1 (A21 x1 + B2 u)
+        solved = linalg.solve(A22, np.hstack([A21, B2]))
+        Ar = Ar - A12 @ solved[:, :kept]
+        Br = Br - A12 @ solved[:, kept:]
+        Cr = Cr - C2 @ solved[:, :kept]
+        Dr = Dr - C2 @ solved[:, kept:]
+
+    reduced = (linalg.block_diag(Ar, Au), np.vstack([Br, Bu]), np.hstack([Cr, Cu]), np.array(Dr))
+    info = {
+        "method": method,
+        "order": kept + unstable,
+        "original_order": len(realization.hsv) + unstable,
+        "unstable_order": unstable,
+        "error_bound": float(bounds[kept]),
+        "hankel_singular_values": realization.hsv,
+    }
+    return reduced, info
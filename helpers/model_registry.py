@@ -0,0 +1,309 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from flask import g, has_request_context
+from scipy import sparse
+
+from config import settings
+from helpers.matrix_codec import decode_coo_matrix
+from helpers.system_cache import CachedSystem, system_cache
+
+# Registre des modeles (route /models , voir routers/model_router.py) : un modele tf ou ss est envoye une seule fois ,
+# les routes de ss_router et tf_router le recoivent ensuite par son identifiant ("model_id" a la place de num , den
+# ou A , B , C , D , voir validation/model_validation.py).
+#
+# - l'identifiant est la cle du modele dans le cache des systemes (sha256 des coefficients normalises) :
+#   le meme modele enregistre deux fois a le meme identifiant , et les reponses gardees par le cache des reponses
+#   pour un model_id restent valides (le contenu d'un identifiant ne change jamais)
+# - l'entree du cache des systemes (systeme , poles , realisations , reponses frequentielles ... deja calcules)
+#   est gardee par le registre : elle est remise dans le cache des systemes si elle en a ete evincee
+# - en memoire : LRU borne par MODEL_REGISTRY_MAX_BYTES (modeles et donnees derivees) et MODEL_REGISTRY_MAX_ENTRIES ,
+#   un modele non utilise pendant MODEL_REGISTRY_TTL secondes expire
+# - avec MODEL_REGISTRY_PERSIST , les coefficients sont aussi ecrits dans une base SQLite locale
+#   (MODEL_REGISTRY_DB_PATH) : les workers gunicorn et les processus des jobs partagent les identifiants ,
+#   un modele evince de la memoire ou enregistre avant un redemarrage est relu (ses donnees derivees sont
+#   recalculees a la demande)
+# - DELETE /models/<id> supprime la ligne de la base et ajoute une ligne a la table deletions (numero croissant) :
+#   chaque processus lit les suppressions des autres au plus une fois par MODEL_REGISTRY_SYNC_INTERVAL secondes
+#   (une requete pour tout le registre , pas une par modele) et oublie ces modeles , une utilisation ne fait
+#   qu'allonger l'expiration d'une ligne existante (UPDATE) , seul un nouvel enregistrement recree la ligne
+# - le modele d'une requete est cherche une seule fois (resolve , garde dans flask.g) : verification avant le cache
+#   des reponses (voir base/base_router.py) puis validation (voir validation/model_validation.py)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    arrays BLOB NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_expires ON models (expires);
+CREATE TABLE IF NOT EXISTS deletions (
+    generation INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    deleted REAL NOT NULL
+);
+"""
+
+# intervalle (secondes) entre deux suppressions des modeles expires , faites pendant un enregistrement
+PURGE_INTERVAL = 60.0
+
+
+class RegisteredModel:
+    def __init__(self, model_id: str, kind: str, arrays: dict, entry: CachedSystem, created: float):
+        self.id = model_id
+        self.kind = kind  # "tf" ou "ss"
+        self.arrays = arrays  # coefficients valides , passes tels quels a la validation des routes
+        self.entry = entry
+        self.created = created
+        self.expires = created + settings.MODEL_REGISTRY_TTL
+        self.persisted_expires = 0.0  # expiration ecrite dans la base
+
+    def describe(self) -> dict:
+        system = self.entry.system
+        data = {"id": self.id, "model": self.kind, "inputs": system.ninputs, "outputs": system.noutputs,
+                "created": self.created, "expires": self.expires, "derived": sorted(self.entry.derived)}
+        if self.kind == "ss":
+            data["states"] = system.nstates
+            data["sparse"] = self.entry.is_sparse()
+        else:
+            data["order"] = len(self.arrays["den"]) - 1
+        return data
+
+
+class ModelRegistry:
+    def __init__(self, max_bytes: int = None, max_entries: int = None, path: str = None, persist: bool = None):
+        self.max_bytes = settings.MODEL_REGISTRY_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entries = settings.MODEL_REGISTRY_MAX_ENTRIES if max_entries is None else max_entries
+        self.path = settings.MODEL_REGISTRY_DB_PATH if path is None else path
+        self.persist = settings.MODEL_REGISTRY_PERSIST if persist is None else persist
+        self.models = OrderedDict()  # id -> RegisteredModel , du moins recent au plus recent
+        self.lock = threading.RLock()
+        self.connection = None
+        self.connection_pid = None
+        self.purged = 0.0
+        self.synced = 0.0  # derniere lecture de la table deletions
+        self.generation = 0  # numero de la derniere suppression lue
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # la connexion est ouverte a la premiere utilisation (pas de fichier cree si /models n'est jamais utilise) ,
+    # une par processus : une connexion SQLite ne doit pas etre utilisee apres un fork (workers gunicorn
+    # crees apres le chargement de l'application)
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None or self.connection_pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+            self.connection_pid = os.getpid()
+            # les suppressions deja faites ne concernent pas les modeles de ce processus (pas encore en memoire)
+            self.generation = connection.execute("SELECT COALESCE(MAX(generation), 0) FROM deletions").fetchone()[0]
+        return self.connection
+
+    # enregistre un modele valide ({"num", "den"} ou {"A", "B", "C", "D"}) , retourne son entree
+    def register(self, kind: str, arrays: dict) -> RegisteredModel:
+        if time.time() - self.purged > PURGE_INTERVAL:
+            self.purge()
+        entry = self.build(kind, arrays)
+        with self.lock:
+            model = self.models.get(entry.key)
+            if model is None:
+                if kind == "ss" and not entry.is_sparse():
+                    # les tableaux normalises du cache : la validation les garde tels quels et le cache des systemes
+                    # retrouve l'entree par leur identite , sans hasher les matrices a chaque requete
+                    arrays = dict(zip("ABCD", entry.inputs))
+                model = RegisteredModel(entry.key, kind, arrays, entry, time.time())
+                self.models[model.id] = model
+            if self.persist:
+                # la ligne est (re)creee meme si le modele est deja en memoire :
+                # il a pu etre supprime par un autre worker
+                model.expires = time.time() + settings.MODEL_REGISTRY_TTL
+                self.save(model)
+                model.persisted_expires = model.expires
+            self.touch(model)
+            self.evict()
+        return model
+
+    # modele de la requete courante : le registre n'est consulte qu'une fois par requete
+    def resolve(self, model_id: str):
+        if not has_request_context():
+            return self.get(model_id)
+        resolved = g.setdefault("registered_models", {})
+        if model_id not in resolved:
+            resolved[model_id] = self.get(model_id)
+        return resolved[model_id]
+
+    # modele enregistre (memoire , puis base SQLite) , None s'il n'existe pas ou s'il a expire
+    def get(self, model_id: str):
+        now = time.time()
+        with self.lock:
+            if self.persist and now - self.synced > settings.MODEL_REGISTRY_SYNC_INTERVAL:
+                self.sync(now)
+            model = self.models.get(model_id)
+            if model is not None and model.expires <= now:
+                self.remove(model_id)
+                model = None
+            if model is not None:
+                self.hits += 1
+                self.touch(model)
+                return model
+        model = self.load(model_id)
+        if model is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.loads += 1
+            model = self.models.setdefault(model_id, model)
+            self.touch(model)
+            self.evict()
+        return model
+
+    def delete(self, model_id: str) -> bool:
+        with self.lock:
+            found = self.remove(model_id) is not None
+            if self.persist:
+                connection = self.connect()
+                cursor = connection.execute("DELETE FROM models WHERE id = ?", (model_id,))
+                found = found or cursor.rowcount > 0
+                if found:
+                    connection.execute("INSERT INTO deletions (id, deleted) VALUES (?, ?)", (model_id, time.time()))
+        return found
+
+    # modeles supprimes par les autres processus depuis la derniere lecture : retires de la memoire
+    # (un modele enregistre a nouveau apres sa suppression est relu de la base a la prochaine utilisation)
+    def sync(self, now: float):
+        self.synced = now
+        rows = self.connect().execute("SELECT generation, id FROM deletions WHERE generation > ? ORDER BY generation",
+                                      (self.generation,)).fetchall()
+        for generation, model_id in rows:
+            self.remove(model_id)
+            self.generation = generation
+
+    # systeme du cache (construit ou retrouve) pour des coefficients valides
+    def build(self, kind: str, arrays: dict) -> CachedSystem:
+        if kind == "tf":
+            return system_cache.tf_entry(arrays["num"], arrays["den"])
+        return system_cache.ss_entry(arrays["A"], arrays["B"], arrays["C"], arrays["D"])
+
+    # utilisation d'un modele : expiration repoussee , entree remise dans le cache des systemes si besoin
+    def touch(self, model: RegisteredModel):
+        model.expires = time.time() + settings.MODEL_REGISTRY_TTL
+        self.models.move_to_end(model.id)
+        system_cache.adopt(model.entry)
+        # la base est mise a jour au plus une fois par demi-TTL , une ligne supprimee n'est pas recreee
+        if self.persist and model.expires - model.persisted_expires > settings.MODEL_REGISTRY_TTL / 2:
+            self.connect().execute("UPDATE models SET expires = ? WHERE id = ?", (model.expires, model.id))
+            model.persisted_expires = model.expires
+
+    def remove(self, model_id: str):
+        return self.models.pop(model_id, None)
+
+    # LRU : la taille d'un modele grandit avec ses donnees derivees , elle est relue a chaque eviction
+    def evict(self):
+        while len(self.models) > self.max_entries or (
+                len(self.models) > 1 and sum(model.entry.nbytes for model in self.models.values()) > self.max_bytes):
+            self.models.popitem(last=False)
+            self.evictions += 1
+
+    def save(self, model: RegisteredModel):
+        stream = io.BytesIO()
+        np.savez(stream, **encode_arrays(model.arrays))
+        self.connect().execute(
+            "INSERT INTO models (id, kind, arrays, created, expires) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET expires = excluded.expires",
+            (model.id, model.kind, stream.getvalue(), model.created, model.expires),
+        )
+
+    def load(self, model_id: str):
+        if not self.persist:
+            return None
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT kind, arrays, created FROM models WHERE id = ? AND expires > ?", (model_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        kind, blob, created = row
+        with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+            arrays = decode_arrays({name: archive[name] for name in archive.files})
+        entry = self.build(kind, arrays)
+        if kind == "ss" and not entry.is_sparse():
+            arrays = dict(zip("ABCD", entry.inputs))
+        model = RegisteredModel(model_id, kind, arrays, entry, created)
+        model.persisted_expires = model.expires
+        return model
+
+    # suppression des modeles expires (memoire et base)
+    def purge(self) -> int:
+        now = time.time()
+        with self.lock:
+            self.purged = now
+            expired = [model_id for model_id, model in self.models.items() if model.expires <= now]
+            for model_id in expired:
+                self.remove(model_id)
+            if self.persist:
+                connection = self.connect()
+                connection.execute("DELETE FROM models WHERE expires <= ?", (now,))
+                # un processus qui n'a pas lu une suppression depuis MODEL_REGISTRY_TTL n'a plus le modele en memoire
+                connection.execute("DELETE FROM deletions WHERE deleted <= ?",
+                                   (now - settings.MODEL_REGISTRY_TTL - settings.MODEL_REGISTRY_SYNC_INTERVAL,))
+        return len(expired)
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.models),
+                "bytes": sum(model.entry.nbytes for model in self.models.values()),
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": settings.MODEL_REGISTRY_TTL,
+                "persist": self.persist,
+                "hits": self.hits,
+                "loads": self.loads,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# coefficients -> tableaux d'une archive npz (matrice creuse : A_shape , A_row , A_col et A_data comme en upload)
+def encode_arrays(arrays: dict) -> dict:
+    encoded = {}
+    for name, value in arrays.items():
+        if sparse.issparse(value):
+            coo = value.tocoo()
+            encoded.update({f"{name}_shape": np.array(coo.shape, dtype=np.int64), f"{name}_row": coo.row,
+                            f"{name}_col": coo.col, f"{name}_data": coo.data})
+        else:
+            encoded[name] = np.asarray(value, dtype=np.float64)
+    return encoded
+
+
+def decode_arrays(archive: dict) -> dict:
+    arrays = {}
+    for name, value in archive.items():
+        if name.endswith("_row"):
+            prefix = name[:-4]
+            arrays[prefix] = decode_coo_matrix({part: archive[f"{prefix}_{part}"] for part in ("shape", "row", "col",
+                                                                                                "data")})
+        elif "_" not in name:
+            arrays[name] = value.tolist() if name in ("num", "den") else value
+    return arrays
+
+
+model_registry = ModelRegistry()
@@ -1,14 +1,14 @@
-from io import BytesIO
-import matplotlib.pyplot as plt
 import numpy as np
-from flask import render_template
-import matplotlib
 
-matplotlib.use("SVG")
+from helpers.render_pool import renderer
+
+# Le Plotter utilise le moteur de figures (helpers/figure_engine.py) : la figure du thread courant
+# est reutilisee , on remplace seulement les donnees et les limites , rien n'est garde dans pyplot
+# (avec RENDER_POOL le rendu est fait par un processus du pool , voir helpers/render_pool.py)
 
 class Plotter:
     def __init__(self):
-        pass
+        self.engine = renderer()
 
     def plot(self,
              t:np.ndarray,
@@ -21,22 +21,15 @@ class Plotter:
              xlim=[0,10],
              ylim=[-5,5]
              ):
-        plt.figure(figsize=(8,6))
-        plt.plot(t, y)
-        plt.title(title)
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-        plt.xlim(xlim)
-        plt.ylim(ylim)
-        plt.grid(grid)
-        if legend: plt.legend([legend])
-
-        img_stream = BytesIO()
-        plt.savefig(img_stream, format='svg')
-        img_stream.seek(0)
+        img_stream = self.engine.time_plot(
+            t, y,
+            title=title,
+            xlabel=xlabel,
+            ylabel=ylabel,
+            grid=grid,
+            legend=legend,
+            xlim=xlim,
+            ylim=ylim
+        )
 
         return img_stream
-
-    # def save_svg(self):
-    #       # Rewind to the start of the stream
-    #     return img_stream
@@ -0,0 +1,238 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+from config import settings
+
+# Profil a la demande d'une requete (PROFILE_ENABLED) , pour les modeles lents qu'on ne reproduit pas en local :
+# - declenchement par l'entete X-Profile (valeur "cprofile" , "sample" ou "1" pour PROFILE_MODE) avec X-Profile-Token
+#   egal a PROFILE_TOKEN , ou par tirage d'une fraction PROFILE_SAMPLE_RATE des requetes
+#   (sans PROFILE_TOKEN , seulement par tirage : l'entete est ignore et les routes /admin ne sont pas enregistrees)
+# - "cprofile" : profil deterministe du thread de la requete (fichier .prof de pstats , snakeviz ...)
+# - "sample" : echantillonnage de la pile du thread toutes les PROFILE_SAMPLE_INTERVAL secondes
+#   (piles agregees au format "collapsed" des flamegraphs , speedscope ...) , cout faible sur les requetes longues
+#
+# Les profils sont gardes dans un anneau sur disque (PROFILE_DIR , au plus PROFILE_MAX_ENTRIES , les plus anciens sont
+# supprimes) avec leurs informations (route , duree , code , sha256 du corps) et le corps de la requete pour rejouer
+# le modele hors ligne , listes et telecharges par /admin/profiles (voir routers/admin_router.py).
+# Seul le thread de la requete est profile : le rendu dans le pool de processus n'apparait que comme une attente ,
+# et pour une reponse en flux (ndjson) seul le debut (avant l'envoi) est mesure.
+
+PROFILE_ID = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+EXCLUDED = ("/admin", "/metrics")
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    # une ligne par pile : "f1;f2;f3 nombre"
+    def collapsed(self) -> bytes:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, profile_id + suffix)
+
+    # enregistre un profil : <id>.json (informations) , <id>.prof ou <id>.txt (profil) , <id>.body (corps)
+    def save(self, info: dict, profile: bytes, body: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = info["id"]
+        with open(self.path(profile_id, info["extension"]), "wb") as file:
+            file.write(profile)
+        if body is not None:
+            with open(self.path(profile_id, ".body"), "wb") as file:
+                file.write(body)
+        # les informations en dernier : un profil liste est complet
+        with open(self.path(profile_id, ".json"), "w") as file:
+            json.dump(info, file)
+        self.trim()
+
+    def ids(self) -> list:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and PROFILE_ID.match(name[:-5]))
+
+    # anneau : les plus anciens profils au-dela de max_entries sont supprimes (les ids commencent par l'heure)
+    def trim(self):
+        with self.lock:
+            ids = self.ids()
+            for profile_id in ids[:max(len(ids) - self.max_entries, 0)]:
+                for suffix in (".json", ".prof", ".txt", ".body"):
+                    try:
+                        os.remove(self.path(profile_id, suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def entries(self) -> list:
+        profiles = []
+        for profile_id in reversed(self.ids()):
+            info = self.info(profile_id)
+            if info is not None:
+                profiles.append(info)
+        return profiles
+
+    def info(self, profile_id: str):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self.path(profile_id, ".json")) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def file(self, profile_id: str, suffix: str):
+        path = self.path(profile_id, suffix)
+        return path if PROFILE_ID.match(profile_id) and os.path.exists(path) else None
+
+    # resume texte d'un profil cprofile (fonctions les plus couteuses)
+    def stats(self, profile_id: str, sort: str = "cumulative", limit: int = 40):
+        path = self.file(profile_id, ".prof")
+        if path is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+class Profiler:
+    def __init__(self):
+        self.store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_ENTRIES)
+
+    # enregistre les hooks de profil sur l'application Flask (voir server.py)
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    # mode du profil de la requete courante , None si la requete n'est pas profilee
+    def requested_mode(self):
+        if request.path.startswith(EXCLUDED):
+            return None
+        header = request.headers.get("X-Profile")
+        if header and self.authorized():
+            return (header if header in ("cprofile", "sample") else settings.PROFILE_MODE), "header"
+        if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return settings.PROFILE_MODE, "sampled"
+        return None
+
+    # jeton de X-Profile et de /admin/profiles , PROFILE_TOKEN vide : personne n'est autorise
+    # (les profils et les corps des requetes ne sont pas exposes , seul le tirage PROFILE_SAMPLE_RATE reste actif)
+    def authorized(self) -> bool:
+        token = request.headers.get("X-Profile-Token", "")
+        return bool(settings.PROFILE_TOKEN) and hmac.compare_digest(token, settings.PROFILE_TOKEN)
+
+    def before_request(self):
+        requested = self.requested_mode()
+        if requested is None:
+            return
+        mode, trigger = requested
+        if mode == "sample":
+            collector = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+            collector.start()
+        else:
+            collector = cProfile.Profile()
+            collector.enable()
+        g.profile = {"mode": mode, "trigger": trigger, "collector": collector, "start": time.perf_counter()}
+
+    def after_request(self, response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        duration = time.perf_counter() - profile["start"]
+        collector = profile["collector"]
+        if profile["mode"] == "sample":
+            collector.stop()
+            data, extension = collector.collapsed(), ".txt"
+        else:
+            collector.disable()
+            data, extension = marshal_stats(collector), ".prof"
+
+        body = request.get_data(cache=True)
+        profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        info = {
+            "id": profile_id,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "status": response.status_code,
+            "duration_ms": duration * 1000,
+            "mode": profile["mode"],
+            "trigger": profile["trigger"],
+            "extension": extension,
+            "payload_sha256": hashlib.sha256(body).hexdigest(),
+            "payload_bytes": len(body),
+            "payload_saved": len(body) <= settings.PROFILE_MAX_PAYLOAD_BYTES,
+            "pid": os.getpid(),
+        }
+        try:
+            self.store.save(info, data, body if info["payload_saved"] else None)
+            response.headers["X-Profile-Id"] = profile_id
+        except OSError as err:
+            print(err)
+        return response
+
+    # requete terminee par une exception : le profil en cours est arrete sans etre enregistre
+    def teardown_request(self, error=None):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        if profile["mode"] == "sample":
+            profile["collector"].stop()
+        else:
+            profile["collector"].disable()
+
+
+# contenu du fichier .prof (format de pstats.dump_stats)
+def marshal_stats(collector: cProfile.Profile) -> bytes:
+    collector.create_stats()
+    return marshal.dumps(collector.stats)
+
+
+profiler = Profiler()
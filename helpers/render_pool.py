@@ -0,0 +1,236 @@
+import atexit
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import settings
+
+# Rendu des graphiques (svg , png , jpeg) dans un pool de processus au lieu du thread de la requete.
+#
+# matplotlib garde le GIL pendant tout le rendu : avec des threads , deux rendus ne sont jamais paralleles
+# et un graphique tres lourd bloque tout le worker Flask. Ici RENDER_WORKERS processus (un par coeur par defaut)
+# sont demarres a la premiere requete avec un graphique ; chacun cree ses modeles de figures
+# (helpers/figure_engine.py) une seule fois , puis recoit les rendus a faire.
+# - les tableaux (temps , reponses , frequences ...) sont copies dans un bloc de memoire partagee propre
+#   au processus (agrandi si necessaire) , seuls les noms , formes et types passent par le pipe
+# - chaque requete a une echeance (RENDER_TIMEOUT secondes) : pas de processus libre avant l'echeance -> 503 ,
+#   rendu trop long -> 504 (le processus est arrete et remplace)
+# - un processus est remplace apres RENDER_MAX_TASKS rendus pour borner la memoire
+#
+# RenderPool a la meme interface que FigureEngine (time_plot , bode_plot , pole_zero_plot , nyquist_plot) ,
+# Service et Plotter utilisent l'un ou l'autre (voir renderer()).
+
+READY = "ready"
+MIN_BUFFER_BYTES = 1024 * 1024
+
+
+class RenderError(Exception):
+    status_code = 500
+
+
+# pas de processus libre avant l'echeance de la requete
+class RenderUnavailable(RenderError):
+    status_code = 503
+
+
+# le rendu a depasse l'echeance de la requete
+class RenderTimeout(RenderError):
+    status_code = 504
+
+
+# boucle d'un processus de rendu : (methode , bloc partage , tableaux , options) -> (ok , image ou erreur)
+def worker_main(connection):
+    from helpers.figure_engine import figure_engine
+    # processus chaud : les modeles de figures (et les polices) sont prets avant le premier rendu
+    for kind in figure_engine.templates:
+        figure_engine.template(kind)
+    figure_engine.time_plot([0, 1], [0, 1])
+    connection.send(READY)
+
+    buffer = None
+    while True:
+        try:
+            method, name, layout, options = connection.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            if buffer is None or buffer.name != name:
+                if buffer is not None:
+                    buffer.close()
+                buffer = shared_memory.SharedMemory(name=name)
+            arrays = {key: np.ndarray(shape, dtype=dtype, buffer=buffer.buf, offset=offset)
+                      for key, dtype, shape, offset in layout}
+            image = getattr(figure_engine, method)(**arrays, **options)
+            del arrays  # les vues doivent etre liberees avant buffer.close()
+            connection.send((True, image.getvalue()))
+        except Exception as err:
+            connection.send((False, f"{type(err).__name__}: {err}"))
+    if buffer is not None:
+        buffer.close()
+
+
+class RenderWorker:
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.buffer = None
+        self.tasks = 0
+
+    # copie des tableaux dans le bloc partage du processus , retourne la description (cle , type , forme , position)
+    def share(self, arrays: dict) -> list:
+        arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+        size = sum(array.nbytes for array in arrays.values())
+        if self.buffer is None or self.buffer.size < size:
+            self.release()
+            self.buffer = shared_memory.SharedMemory(create=True, size=max(MIN_BUFFER_BYTES, 2 * size))
+        layout = []
+        offset = 0
+        for key, array in arrays.items():
+            np.ndarray(array.shape, dtype=array.dtype, buffer=self.buffer.buf, offset=offset)[...] = array
+            layout.append((key, array.dtype.str, array.shape, offset))
+            offset += array.nbytes
+        return layout
+
+    def release(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer.unlink()
+            self.buffer = None
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(5)
+        self.connection.close()
+        self.release()
+
+
+class RenderPool:
+    def __init__(self, workers: int = None):
+        self.size = workers
+        self.context = None
+        self.idle = queue.Queue()  # processus prets et libres
+        self.workers = set()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.context = multiprocessing.get_context(settings.RENDER_START_METHOD)
+            for _ in range(self.size or pool_size()):
+                self.spawn()
+            self.started = True
+            atexit.register(self.shutdown)
+
+    # nouveau processus , ajoute aux processus libres (par un thread) quand il est pret
+    def spawn(self):
+        worker = RenderWorker(self.context)
+        self.workers.add(worker)
+        threading.Thread(target=self.warm_up, args=(worker,), name="render-pool", daemon=True).start()
+
+    def warm_up(self, worker: RenderWorker):
+        try:
+            ready = worker.connection.poll(settings.RENDER_START_TIMEOUT) and worker.connection.recv() == READY
+        except (EOFError, OSError):
+            ready = False
+        if ready:
+            self.idle.put(worker)
+        else:
+            # pas de remplacant : un processus qui ne demarre pas ne demarrera pas mieux la fois suivante
+            print("render worker failed to start")
+            self.retire(worker, replace=False)
+
+    # arret d'un processus (timeout , recyclage , erreur) et demarrage d'un remplacant
+    def retire(self, worker: RenderWorker, replace: bool = True):
+        with self.lock:
+            self.workers.discard(worker)
+            worker.stop()
+            if replace and self.started:
+                self.spawn()
+
+    def render(self, method: str, arrays: dict, options: dict) -> io.BytesIO:
+        self.start()
+        deadline = time.monotonic() + settings.RENDER_TIMEOUT
+        try:
+            worker = self.idle.get(timeout=settings.RENDER_TIMEOUT)
+        except queue.Empty:
+            raise RenderUnavailable("All render workers are busy, retry later.")
+
+        try:
+            layout = worker.share(arrays)
+            worker.connection.send((method, worker.buffer.name, layout, options))
+            if not worker.connection.poll(max(deadline - time.monotonic(), 0)):
+                self.retire(worker)
+                raise RenderTimeout(f"Rendering exceeded {settings.RENDER_TIMEOUT} seconds.")
+            ok, result = worker.connection.recv()
+        except (EOFError, OSError):
+            self.retire(worker)
+            raise RenderError("The render process exited unexpectedly.")
+
+        worker.tasks += 1
+        if settings.RENDER_MAX_TASKS and worker.tasks >= settings.RENDER_MAX_TASKS:
+            threading.Thread(target=self.retire, args=(worker,), daemon=True).start()
+        else:
+            self.idle.put(worker)
+        if not ok:
+            raise RenderError(result)
+        return io.BytesIO(result)
+
+    def shutdown(self):
+        with self.lock:
+            self.started = False
+            for worker in self.workers:
+                worker.stop()
+            self.workers.clear()
+
+    def time_plot(self, t, y, title="State-Space Step Response", xlabel="Time (seconds)", ylabel="Response",
+                  grid=True, legend="Response", xlim=(0, 10), ylim=(-5, 5)) -> io.BytesIO:
+        return self.render("time_plot", {"t": as_array(t), "y": as_array(y)},
+                           {"title": title, "xlabel": xlabel, "ylabel": ylabel, "grid": grid, "legend": legend,
+                            "xlim": xlim, "ylim": ylim})
+
+    def bode_plot(self, omega, magnitude_db, phase_deg, img_format="svg", tight=False) -> io.BytesIO:
+        return self.render("bode_plot",
+                           {"omega": as_array(omega), "magnitude_db": as_array(magnitude_db),
+                            "phase_deg": as_array(phase_deg)},
+                           {"img_format": img_format, "tight": tight})
+
+    def pole_zero_plot(self, poles, zeros) -> io.BytesIO:
+        return self.render("pole_zero_plot", {"poles": as_array(poles, complex), "zeros": as_array(zeros, complex)}, {})
+
+    def nyquist_plot(self, real, imag) -> io.BytesIO:
+        return self.render("nyquist_plot", {"real": as_array(real), "imag": as_array(imag)}, {})
+
+
+def as_array(values, dtype=float) -> np.ndarray:
+    return np.asarray(values, dtype=dtype)
+
+
+# RENDER_WORKERS , ou un processus par coeur disponible
+def pool_size() -> int:
+    if settings.RENDER_WORKERS > 0:
+        return settings.RENDER_WORKERS
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# moteur de rendu utilise par Service et Plotter : le pool de processus , ou les figures du thread courant
+def renderer():
+    if settings.RENDER_POOL:
+        return render_pool
+    from helpers.figure_engine import figure_engine
+    return figure_engine
+
+
+render_pool = RenderPool()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response, Response
+
+from config import settings
+from helpers.data_encoder import requested_format
+from helpers.matrix_codec import is_binary_request, query_options
+
+# Cache des reponses rendues (images svg , jpeg ...) des routes de visualisation.
+# La cle est (route , payload normalise , format demande) : une requete identique a une requete deja traitee
+# ne refait ni la simulation ni le rendu matplotlib.
+# Chaque reponse porte un ETag fort (hash du contenu) , si le client envoie If-None-Match
+# avec le meme ETag , on repond 304 sans corps.
+# Les entrees sont evictees (LRU) quand la taille totale depasse RESPONSE_CACHE_MAX_BYTES.
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, mimetype: str, headers: dict):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers
+        self.etag = hashlib.sha256(body).hexdigest()[:40]
+
+
+# normaliser le payload pour que {"num":[1]} et {"num":[1.0]} donnent la meme cle
+def normalize_payload(data):
+    if isinstance(data, dict):
+        return {str(key): normalize_payload(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [normalize_payload(item) for item in data]
+    if isinstance(data, int) and not isinstance(data, bool):
+        return float(data)
+    return data
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = None, max_entry_bytes: int = None):
+        self.max_bytes = settings.RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entry_bytes = settings.RESPONSE_CACHE_MAX_ENTRY_BYTES if max_entry_bytes is None else max_entry_bytes
+        self.entries = OrderedDict()  # key -> CachedResponse , du moins recent au plus recent
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def make_key(self, route: str, payload, output_format: str = "svg") -> str:
+        canonical = json.dumps(normalize_payload(payload), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{route}\n{output_format}\n{canonical}".encode()).hexdigest()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        size = len(entry.body)
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous.body)
+            self.entries[key] = entry
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    # remise a zero des compteurs (apres la chauffe du demarrage , voir helpers/warmup.py)
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.not_modified = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+    # decorateur pour les handlers des routeurs : la reponse est prise du cache si elle existe ,
+    # sinon le handler est execute et sa reponse (si 200) est ajoutee au cache
+    def cached(self, command):
+        @wraps(command)
+        def wrapper(*args, **kwargs):
+            if is_binary_request():
+                # modele binaire (voir helpers/matrix_codec.py) : cle sur le hash du corps et les attributs de la query
+                payload = {**query_options(), "body_sha256": hashlib.sha256(request.get_data(cache=True)).hexdigest()}
+            else:
+                payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                # le handler retourne l'erreur de validation
+                return command(*args, **kwargs)
+
+            # le format peut venir de l'entete Accept , il fait partie de la cle
+            output_format = requested_format(payload.get("format") if isinstance(payload.get("format"), str) else None)
+            if output_format == "ndjson":
+                # reponse en flux : elle n'est jamais construite en entier , donc pas gardee dans le cache
+                response = make_response(command(*args, **kwargs))
+                response.vary.add("Accept")
+                return response
+            key = self.make_key(request.path, payload, output_format)
+            entry = self.get(key)
+            cache_status = "HIT"
+            if entry is None:
+                cache_status = "MISS"
+                response = make_response(command(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.direct_passthrough = False
+                entry = CachedResponse(response.get_data(), response.mimetype, self.extra_headers(response))
+                self.put(key, entry)
+            return self.respond(entry, cache_status)
+        return wrapper
+
+    def respond(self, entry: CachedResponse, cache_status: str) -> Response:
+        if entry.etag in request.if_none_match:
+            with self.lock:
+                self.not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(entry.body, mimetype=entry.mimetype)
+            response.headers.update(entry.headers)
+        response.set_etag(entry.etag)
+        # le meme corps de requete donne svg , png , json ... selon l'entete Accept (voir helpers/data_encoder.py) :
+        # un cache partage ou le navigateur ne doit pas servir une representation (ou un 304) pour une autre
+        response.vary.add("Accept")
+        response.headers["X-Cache"] = cache_status
+        return response
+
+    # les entetes a garder avec le corps (les entetes generes par Flask sont recalcules)
+    def extra_headers(self, response: Response) -> dict:
+        return {key: value for key, value in response.headers.items() if key.startswith("X-")}
+
+
+response_cache = ResponseCache()
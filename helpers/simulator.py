@@ -0,0 +1,163 @@
+import numpy as np
+from scipy import linalg
+
+from config import settings
+from helpers.time_grid import TimeGrid
+
+# Moteurs de simulation des reponses temporelles (step , impulse , ramp) d'un modele d'etat x' = A x + B u ,
+# y = C x + D u , toutes les entrees sont simulees en meme temps (une colonne de l'etat par entree) :
+#
+# - "exact" : discretisation exacte sur chaque segment uniforme de la grille (voir helpers/time_grid.py).
+#   L'entree est lineaire entre deux instants (echelon et rampe le sont exactement) , avec l'etat augmente
+#   z = [x ; u ; du] (du = u[k + 1] - u[k] , constant sur un segment) la simulation est la recurrence homogene
+#       z[k + 1] = E z[k] , E = expm([[A h , B h , 0] , [0 , 0 , I] , [0 , 0 , 0]])
+#   E est calculee une fois par pas h (et gardee dans le cache des systemes) , la recurrence est faite
+#   par doublement : z[m : 2m] = E^m z[0 : m] , un produit matriciel pour m points , log2(K) produits au total.
+# - "modal" : si A = V diag(l) V^-1 est bien conditionnee , chaque mode a une forme fermee
+#   evaluee pour tous les instants a la fois (sans recurrence , grille quelconque) :
+#       impulse : exp(l t) , step : (exp(l t) - 1) / l , ramp : (exp(l t) - 1 - l t) / l^2
+# - "control" : ctrl.forced_response segment par segment (voir Service.simulate).
+#
+# Un moteur qui ne peut pas traiter un modele retourne None : "modal" se replie sur "exact"
+# (A non diagonalisable ou mal conditionnee) , "exact" sur "control" (exponentielle non finie).
+
+ENGINES = ("exact", "modal", "control")
+
+# en dessous de |l t| < SERIES_LIMIT la rampe modale utilise le developpement limite (pas de compensation)
+SERIES_LIMIT = 1e-4
+
+
+# entree u(t) de chaque type de reponse ( l'impulsion est l'etat initial x(0) = B , entree nulle )
+def input_signal(time: np.ndarray, kind: str) -> np.ndarray:
+    if kind == "step":
+        return np.ones_like(time)
+    if kind == "ramp":
+        return np.asarray(time, dtype=float)
+    return np.zeros_like(time)
+
+
+# matrice E de la discretisation exacte pour un pas h , etat augmente z = [x ; u ; du]
+def discretize(A: np.ndarray, B: np.ndarray, step: float) -> np.ndarray:
+    states, inputs = B.shape
+    augmented = np.zeros((states + 2 * inputs, states + 2 * inputs))
+    augmented[:states, :states] = A * step
+    augmented[:states, states:states + inputs] = B * step
+    augmented[states:states + inputs, states + inputs:] = np.eye(inputs)
+    with np.errstate(over="ignore", invalid="ignore"):
+        return linalg.expm(augmented)
+
+
+# z[k] = E^k z[0] pour k < count , z0 (N , colonnes) -> (N , count * colonnes) , l'instant k dans les colonnes
+# k * colonnes ... (k + 1) * colonnes - 1
+def propagate(transition: np.ndarray, initial: np.ndarray, count: int) -> np.ndarray:
+    columns = initial.shape[1]
+    trajectory = np.empty((initial.shape[0], count * columns))
+    trajectory[:, :columns] = initial
+    power = transition  # E^filled
+    filled = 1
+    with np.errstate(over="ignore", invalid="ignore"):
+        while filled < count:
+            take = min(filled, count - filled)
+            trajectory[:, filled * columns:(filled + take) * columns] = power @ trajectory[:, :take * columns]
+            filled += take
+            if filled < count:
+                power = power @ power
+    return trajectory
+
+
+# decomposition modale (valeurs propres , C V , V^-1 B) , None si A n'est pas diagonalisable de facon fiable
+def modal_form(A: np.ndarray, B: np.ndarray, C: np.ndarray, max_condition: float = None):
+    max_condition = settings.SIMULATION_MODAL_MAX_CONDITION if max_condition is None else max_condition
+    if A.size == 0:
+        return np.empty(0, dtype=complex), C.astype(complex), B.astype(complex)
+    eigenvalues, vectors = np.linalg.eig(A)
+    if not np.isfinite(vectors).all() or np.linalg.cond(vectors) > max_condition:
+        return None
+    return eigenvalues, C @ vectors, np.linalg.solve(vectors, B)
+
+
+# reponses (sorties , entrees , temps) sur la grille , discretization(step) -> E peut venir d'un cache
+def simulate_exact(A, B, C, D, grid: TimeGrid, kind: str, discretization=None):
+    if discretization is None:
+        discretization = lambda step: discretize(A, B, step)
+    states, inputs = B.shape
+    time = grid.time
+    responses = np.empty((C.shape[0], inputs, len(time)))
+    state = B.copy() if kind == "impulse" else np.zeros((states, inputs))
+    start = 0
+    for segment in grid.segments:
+        if len(segment) < 2 and start > 0:
+            continue
+        step = segment[1] - segment[0] if len(segment) > 1 else 0.0
+        transition = discretization(step)
+        if not np.isfinite(transition).all():
+            return None
+        # une colonne de l'etat augmente par entree : [x_j ; u e_j ; du e_j]
+        u = input_signal(segment[:2], kind)
+        initial = np.concatenate([state, np.eye(inputs) * u[0], np.eye(inputs) * (u[-1] - u[0])])
+        trajectory = propagate(transition, initial, len(segment)).reshape(-1, len(segment), inputs)
+        outputs = np.einsum("pn,nkm->pmk", C, trajectory[:states]) + D[:, :, None] * input_signal(segment, kind)
+        # le premier point d'un segment est deja le dernier point du segment precedent
+        skip = 0 if start == 0 else 1
+        responses[:, :, start:start + len(segment) - skip] = outputs[:, :, skip:]
+        start += len(segment) - skip
+        state = trajectory[:states, -1, :]
+    return responses
+
+
+# simulation "exact" en flux : produit (temps , reponses (sorties , entrees , temps)) par morceaux d'au plus
+# `chunk` instants , l'etat augmente est garde d'un morceau au suivant , la trajectoire complete n'est jamais
+# en memoire. segments : [(debut , fin , nombre d'intervalles)] (voir helpers/time_grid.adaptive_segments)
+# ValueError si l'exponentielle n'est pas finie (pas de repli possible au milieu d'un flux)
+def stream_exact(A, B, C, D, segments: list, kind: str, chunk: int, discretization=None):
+    if discretization is None:
+        discretization = lambda step: discretize(A, B, step)
+    states, inputs = B.shape
+    state = B.copy() if kind == "impulse" else np.zeros((states, inputs))
+    for index, (start, end, count) in enumerate(segments):
+        step = (end - start) / count
+        transition = discretization(step)
+        if not np.isfinite(transition).all():
+            raise ValueError("The state transition matrix is not finite, use a shorter t_max.")
+        u = input_signal(np.array([start, start + step]), kind)
+        z = np.concatenate([state, np.eye(inputs) * u[0], np.eye(inputs) * (u[1] - u[0])])
+        # le premier point d'un segment est deja le dernier point du segment precedent
+        k = 0 if index == 0 else 1
+        if k:
+            z = transition @ z
+        while k <= count:
+            size = min(chunk, count + 1 - k)
+            # size + 1 etats : le dernier est le premier etat du morceau suivant
+            trajectory = propagate(transition, z, size + 1).reshape(-1, size + 1, inputs)
+            time = start + step * np.arange(k, k + size)
+            if k + size > count:
+                time[-1] = end
+            yield time, (np.einsum("pn,nkm->pmk", C, trajectory[:states, :size])
+                         + D[:, :, None] * input_signal(time, kind))
+            z = trajectory[:, size, :]
+            k += size
+        # etat au dernier point du segment (le morceau suivant commence un pas apres)
+        state = trajectory[:states, size - 1, :]
+
+
+# reponses (sorties , entrees , temps) en forme fermee , modes = modal_form(A , B , C) peut venir d'un cache
+def simulate_modal(A, B, C, D, grid: TimeGrid, kind: str, modes=None):
+    modes = modal_form(A, B, C) if modes is None else modes
+    if modes is None:
+        return None
+    eigenvalues, output_modes, input_modes = modes
+    time = grid.time
+    l = eigenvalues[:, None]
+    x = l * time[None, :]
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        if kind == "impulse":
+            evolution = np.exp(x)
+        elif kind == "step":
+            evolution = np.where(l == 0, time[None, :], np.expm1(x) / np.where(l == 0, 1, l))
+        else:
+            series = time[None, :] ** 2 / 2 * (1 + x / 3 + x ** 2 / 12)
+            exact = (np.expm1(x) - x) / np.where(l == 0, 1, l) ** 2
+            evolution = np.where(np.abs(x) < SERIES_LIMIT, series, exact)
+        weights = output_modes[:, None, :] * input_modes.T[None, :, :]  # (sorties , entrees , modes)
+        response = (weights @ evolution).real
+        return response + D[:, :, None] * input_signal(time, kind)
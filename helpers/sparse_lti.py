@@ -0,0 +1,335 @@
+import threading
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+
+from config import settings
+from helpers.simulator import input_signal
+from helpers.time_grid import TimeGrid
+
+# Modeles d'etat creux de grande taille (EDP discretisees , reseaux : des milliers d'etats , A presque vide).
+# ctrl.ss rend les matrices denses : memoire en n^2 et calculs en n^3 (valeurs propres , expm , schur ...).
+# A partir de SPARSE_MIN_STATES etats , une matrice A creuse (format COO , voir helpers/matrix_codec.py)
+# est gardee creuse (SparseStateSpace , B , C et D restent denses) et les calculs utilisent des factorisations LU
+# creuses (scipy.sparse.linalg.splu) :
+#
+# - reponses temporelles : schema des trapezes (Crank-Nicolson) sur chaque segment uniforme de la grille ,
+#       (I - h/2 A) x[k + 1] = (I + h/2 A) x[k] + h/2 B (u[k] + u[k + 1])
+#   une factorisation LU par pas h (au plus MAX_SEGMENTS , voir helpers/time_grid.py) puis une resolution par instant ,
+#   toutes les entrees en meme temps (une colonne de l'etat par entree , comme helpers/simulator.py)
+# - reponse frequentielle : H(s) = C (s I - A)^-1 B + D par Krylov decale , une LU (complexe) a une frequence
+#   d'ancrage s0 sert aux frequences voisines : avec K = (s0 I - A)^-1 ,
+#       (s I - A)^-1 b = (I + (s - s0) K)^-1 K b
+#   et la base de Krylov de K (Arnoldi , K V = V H) est la meme pour tous les s : chaque frequence est un petit
+#   probleme aux moindres carres (taille de la base) au lieu d'une factorisation. La base est agrandie tant que
+#   le residu depasse SPARSE_KRYLOV_TOL , une nouvelle ancre est prise quand elle atteint SPARSE_KRYLOV_MAX_BASIS
+# - poles : seulement les poles dominants (eigs / ARPACK) , les plus lents (autour de 0) et les plus rapides ,
+#   ils suffisent pour la grille du temps et la grille des frequences. Les zeros , la carte des poles et zeros
+#   et les conversions (fonction de transfert , boucle fermee) ne sont pas disponibles pour ces modeles.
+
+# permutation des colonnes de la LU : degre minimum sur A + A^T (moins de remplissage que COLAMD pour les
+# matrices de structure symetrique , maillages et reseaux)
+PERMUTATION = "MMD_AT_PLUS_A"
+SPARSE_UNSUPPORTED = "Not available for large sparse models: send a dense model (fewer than {} states)."
+
+
+class SparseStateSpace:
+    def __init__(self, A, B, C, D):
+        self.A = sparse.csc_array(A, dtype=np.float64)
+        self.B = np.ascontiguousarray(B, dtype=np.float64)
+        self.C = np.ascontiguousarray(C, dtype=np.float64)
+        self.D = np.ascontiguousarray(D, dtype=np.float64)
+
+    @property
+    def nstates(self) -> int:
+        return self.A.shape[0]
+
+    @property
+    def ninputs(self) -> int:
+        return self.B.shape[1]
+
+    @property
+    def noutputs(self) -> int:
+        return self.C.shape[0]
+
+    def issiso(self) -> bool:
+        return self.ninputs == 1 and self.noutputs == 1
+
+    @property
+    def nbytes(self) -> int:
+        return (self.A.data.nbytes + self.A.indices.nbytes + self.A.indptr.nbytes
+                + self.B.nbytes + self.C.nbytes + self.D.nbytes)
+
+    def __repr__(self):
+        return f"SparseStateSpace(states={self.nstates}, inputs={self.ninputs}, outputs={self.noutputs}, " \
+               f"nnz={self.A.nnz})"
+
+
+# A est gardee creuse si elle l'est deja et si le modele est assez grand
+def is_large_sparse(A) -> bool:
+    return sparse.issparse(A) and A.shape[0] >= settings.SPARSE_MIN_STATES
+
+
+def dense(matrix) -> np.ndarray:
+    return matrix.toarray() if sparse.issparse(matrix) else matrix
+
+
+def unsupported_error() -> ValueError:
+    return ValueError(SPARSE_UNSUPPORTED.format(settings.SPARSE_MIN_STATES))
+
+
+# poles dominants : `count` poles les plus proches de 0 (inverse decale , sigma = 0) et `count` poles de plus grand
+# module , une estimation (disques de Gershgorin) si ARPACK ne converge pas
+def dominant_poles(A, count: int = None) -> np.ndarray:
+    count = settings.SPARSE_POLES if count is None else count
+    count = max(1, min(count, A.shape[0] - 2))
+    try:
+        # le module suffit (pas du temps , fin de la grille des frequences) : tolerance large
+        fast = sparse_linalg.eigs(A, k=count, which="LM", tol=1e-2, return_eigenvectors=False)
+    except sparse_linalg.ArpackNoConvergence as err:
+        fast = err.eigenvalues
+    if fast.size == 0:
+        radius = abs(A).sum(axis=1).max()
+        fast = np.array([-radius], dtype=complex)
+    try:
+        slow = sparse_linalg.eigs(A, k=count, sigma=0, which="LM", tol=1e-8, return_eigenvectors=False)
+    except sparse_linalg.ArpackNoConvergence as err:
+        slow = err.eigenvalues
+    except RuntimeError:
+        # A singuliere : un integrateur , le pole nul est ignore par les grilles
+        slow = np.zeros(1, dtype=complex)
+    return np.unique(np.concatenate([slow, fast]).astype(complex))
+
+
+# gain statique - C A^-1 B + D , infini si A est singuliere (comme ctrl.dcgain)
+def sparse_dcgain(system: SparseStateSpace) -> np.ndarray:
+    try:
+        solution = sparse_linalg.splu(system.A, permc_spec=PERMUTATION).solve(system.B)
+    except RuntimeError:
+        return np.full(system.D.shape, np.inf)
+    gain = system.D - system.C @ solution
+    return gain[0, 0] if system.issiso() else gain
+
+
+# sorties (sorties , entrees) a chaque instant des segments [(debut , fin , nombre d'intervalles)] , instant 0 compris
+def trapezoidal_outputs(system: SparseStateSpace, segments: list, kind: str):
+    A, B, C, D = system.A, system.B, system.C, system.D
+    identity = sparse.identity(system.nstates, format="csc")
+    state = B.copy() if kind == "impulse" else np.zeros(B.shape)
+    yield 0.0, C @ state + D * input_signal(np.zeros(1), kind)[0]
+    for start, end, count in segments:
+        if count < 1:
+            continue
+        step = (end - start) / count
+        implicit = sparse_linalg.splu(sparse.csc_array(identity - step / 2 * A), permc_spec=PERMUTATION)
+        explicit = sparse.csr_array(identity + step / 2 * A)
+        times = start + step * np.arange(count + 1)
+        times[-1] = end
+        inputs = input_signal(times, kind)
+        for k in range(1, count + 1):
+            state = implicit.solve(explicit @ state + B * (step / 2 * (inputs[k - 1] + inputs[k])))
+            yield times[k], C @ state + D * inputs[k]
+
+
+# reponses (sorties , entrees , temps) sur la grille , meme forme que helpers/simulator.simulate_exact
+def simulate_sparse(system: SparseStateSpace, grid: TimeGrid, kind: str) -> np.ndarray:
+    segments = [(segment[0], segment[-1], len(segment) - 1) for segment in grid.segments]
+    responses = np.empty((system.noutputs, system.ninputs, len(grid)))
+    for index, (_, outputs) in enumerate(trapezoidal_outputs(system, segments, kind)):
+        responses[:, :, index] = outputs
+    return responses
+
+
+# simulation en flux : (temps , reponses (sorties , entrees , temps)) par morceaux d'au plus `chunk` instants
+# (meme interface que helpers/simulator.stream_exact)
+def stream_sparse(system: SparseStateSpace, segments: list, kind: str, chunk: int):
+    times, outputs = [], []
+    for time, output in trapezoidal_outputs(system, segments, kind):
+        times.append(time)
+        outputs.append(output)
+        if len(times) == chunk:
+            yield np.array(times), np.stack(outputs, axis=-1)
+            times, outputs = [], []
+    if times:
+        yield np.array(times), np.stack(outputs, axis=-1)
+
+
+# base de Krylov d'une colonne de B autour d'une ancre : V (k + 1 , n) orthonormee (une ligne par vecteur) ,
+# H (k + 1 , k) , C V (sorties , k + 1) et beta = |K b|
+class KrylovBasis:
+    def __init__(self, anchor: "KrylovAnchor", column: np.ndarray, max_basis: int):
+        start = anchor.lu.solve(column.astype(complex))
+        self.anchor = anchor
+        self.beta = np.linalg.norm(start)
+        self.vectors = np.zeros((max_basis + 1, len(column)), dtype=complex)
+        self.hessenberg = np.zeros((max_basis + 1, max_basis), dtype=complex)
+        self.outputs = np.zeros((anchor.C.shape[0], max_basis + 1), dtype=complex)
+        self.size = 0  # nombre de colonnes de H
+        self.exhausted = self.beta == 0
+        self.decomposition = None  # (taille , valeurs propres de H_k , C V_k W , W^-1 beta e1 , W[k - 1])
+        if not self.exhausted:
+            self.vectors[0] = start / self.beta
+            self.outputs[:, 0] = anchor.C @ self.vectors[0]
+
+    @property
+    def full(self) -> bool:
+        return self.size == self.hessenberg.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.hessenberg.nbytes + self.outputs.nbytes
+
+    # une iteration d'Arnoldi (Gram-Schmidt classique , deux passes)
+    def extend(self):
+        k = self.size
+        w = self.anchor.lu.solve(self.vectors[k])
+        basis = self.vectors[:k + 1]
+        for _ in range(2):
+            coefficients = np.conj(basis @ w.conj())
+            self.hessenberg[:k + 1, k] += coefficients
+            w -= coefficients @ basis
+        norm = np.linalg.norm(w)
+        self.size = k + 1
+        if norm <= 1e-14 * max(abs(self.hessenberg[:k + 1, k]).max(), 1e-300):
+            # sous-espace invariant : la solution est exacte dans la base actuelle
+            self.exhausted = True
+            return
+        self.hessenberg[k + 1, k] = norm
+        self.vectors[k + 1] = w / norm
+        self.outputs[:, k + 1] = self.anchor.C @ self.vectors[k + 1]
+
+    # C (s I - A)^-1 b pour chaque s (Galerkin : (I + (s - s0) H_k) y = beta e1 , x = V_k y) et masque des valeurs
+    # dont le residu relatif |s - s0| h(k + 1 , k) |y_k| / beta est sous `tol`.
+    # Avec H_k = W diag(l) W^-1 , y = W (W^-1 beta e1) / (1 + (s - s0) l) : O(k) par frequence
+    def evaluate(self, s: np.ndarray, tol: float):
+        outputs = self.outputs.shape[0]
+        if self.beta == 0:
+            return np.zeros((outputs, len(s)), dtype=complex), np.ones(len(s), dtype=bool)
+        k = self.size
+        if k == 0:
+            return np.zeros((outputs, len(s)), dtype=complex), np.zeros(len(s), dtype=bool)
+        shift = s - self.anchor.shift
+        if self.decomposition is None or self.decomposition[0] != k:
+            self.decomposition = self.decompose(k)
+        _, eigenvalues, output_modes, weights, last_row = self.decomposition
+        with np.errstate(all="ignore"):
+            if eigenvalues is not None:
+                coordinates = weights[:, None] / (1 + shift[None, :] * eigenvalues[:, None])  # (k , frequences)
+                values = output_modes @ coordinates
+                last = last_row @ coordinates
+            else:
+                # H_k mal conditionnee pour la decomposition : un systeme k x k par frequence
+                solutions = np.empty((k, len(s)), dtype=complex)
+                rhs = np.zeros(k, dtype=complex)
+                rhs[0] = self.beta
+                for index, value in enumerate(shift):
+                    matrix = np.eye(k) + value * self.hessenberg[:k, :k]
+                    try:
+                        solutions[:, index] = np.linalg.solve(matrix, rhs)
+                    except np.linalg.LinAlgError:
+                        solutions[:, index] = np.nan
+                values = self.outputs[:, :k] @ solutions
+                last = solutions[-1]
+            residual = np.abs(shift) * self.hessenberg[k, k - 1].real * np.abs(last) / self.beta
+        converged = np.isfinite(values).all(axis=0) & (residual <= tol)
+        if self.exhausted:
+            converged = np.isfinite(values).all(axis=0)
+        return values, converged
+
+    def decompose(self, k: int):
+        eigenvalues, modes = np.linalg.eig(self.hessenberg[:k, :k])
+        if not np.isfinite(modes).all() or np.linalg.cond(modes) > 1e10:
+            return k, None, None, None, None
+        weights = np.linalg.solve(modes, np.eye(k, 1)[:, 0] * self.beta)
+        return k, eigenvalues, self.outputs[:, :k] @ modes, weights, modes[k - 1]
+
+
+class KrylovAnchor:
+    def __init__(self, system: SparseStateSpace, shift: complex):
+        self.shift = shift
+        self.C = system.C
+        n = system.nstates
+        self.lu = sparse_linalg.splu(sparse.csc_array(shift * sparse.identity(n, format="csc") - system.A),
+                                     permc_spec=PERMUTATION)
+        self.bases = {}  # colonne de B -> KrylovBasis
+
+    @property
+    def nbytes(self) -> int:
+        return (self.lu.L.nnz + self.lu.U.nnz) * 20 + sum(basis.nbytes for basis in self.bases.values())
+
+
+# reponse frequentielle d'un modele creux , gardee dans le cache des systemes : les ancres et leurs bases servent
+# aussi aux appels suivants (raffinement des croisements , marges de stabilite , autres requetes)
+# resize(octets) est appele quand la memoire occupee change (voir helpers/system_cache.CachedSystem.grow)
+class SparseFrequencyResponse:
+    def __init__(self, system: SparseStateSpace, resize=None, max_basis: int = None, tol: float = None,
+                 max_anchors: int = None):
+        self.system = system
+        self.resize = resize or (lambda size: None)
+        self.max_basis = settings.SPARSE_KRYLOV_MAX_BASIS if max_basis is None else max_basis
+        self.tol = settings.SPARSE_KRYLOV_TOL if tol is None else tol
+        self.max_anchors = settings.SPARSE_KRYLOV_MAX_ANCHORS if max_anchors is None else max_anchors
+        self.anchors = []  # de la moins recente a la plus recente
+        self.lock = threading.Lock()
+        self.factorizations = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(anchor.nbytes for anchor in self.anchors)
+
+    # H(jw) (sorties , entrees , frequences)
+    def __call__(self, omega) -> np.ndarray:
+        omega = np.atleast_1d(np.asarray(omega, dtype=float))
+        system = self.system
+        response = np.empty((system.noutputs, system.ninputs, len(omega)), dtype=complex)
+        with self.lock:
+            before = self.nbytes
+            for column in range(system.ninputs):
+                response[:, column, :] = self.solve(1j * omega, column)
+            self.resize(self.nbytes - before)
+        return response + system.D[:, :, None]
+
+    # C (s I - A)^-1 b pour une colonne de B : les bases existantes d'abord (sans les agrandir) , puis la base
+    # la plus proche de la plus petite frequence restante est agrandie , une nouvelle ancre est factorisee
+    # a cette frequence quand la base est pleine
+    def solve(self, s: np.ndarray, column: int) -> np.ndarray:
+        values = np.empty((self.system.noutputs, len(s)), dtype=complex)
+        pending = np.argsort(np.abs(s), kind="stable")
+        for anchor in reversed(self.anchors):
+            pending = self.assign(self.basis(anchor, column), s, pending, values)
+        while pending.size:
+            first = s[pending[0]]
+            anchor = min(self.anchors, key=lambda candidate: abs(first - candidate.shift), default=None)
+            if anchor is None or self.basis(anchor, column).full:
+                anchor = self.anchor(first)
+            basis = self.basis(anchor, column)
+            while pending.size and not basis.full and not basis.exhausted:
+                basis.extend()
+                pending = self.assign(basis, s, pending, values)
+            if pending.size and basis.exhausted:
+                # base exacte : les valeurs non finies sont des poles sur l'axe imaginaire
+                values[:, pending] = basis.evaluate(s[pending], self.tol)[0]
+                pending = pending[:0]
+        return values
+
+    # valeurs convergees avec la base , retourne les indices restants
+    def assign(self, basis: KrylovBasis, s: np.ndarray, pending: np.ndarray, values: np.ndarray) -> np.ndarray:
+        if not pending.size:
+            return pending
+        result, converged = basis.evaluate(s[pending], self.tol)
+        values[:, pending[converged]] = result[:, converged]
+        return pending[~converged]
+
+    def anchor(self, shift: complex) -> KrylovAnchor:
+        anchor = KrylovAnchor(self.system, shift)
+        self.factorizations += 1
+        self.anchors.append(anchor)
+        if len(self.anchors) > self.max_anchors:
+            self.anchors.pop(0)
+        return anchor
+
+    def basis(self, anchor: KrylovAnchor, column: int) -> KrylovBasis:
+        if column not in anchor.bases:
+            anchor.bases[column] = KrylovBasis(anchor, self.system.B[:, column], self.max_basis)
+        return anchor.bases[column]
@@ -0,0 +1,110 @@
+import numpy as np
+
+from config import settings
+
+# Caracteristiques de la reponse indicielle calculees sans boucle python , pour un tableau 2-D de reponses
+# (une reponse par ligne : les canaux d'un systeme MIMO ou les candidats d'une famille , voir /sweep).
+#
+# Chaque reponse est normalisee z = (y - y0) / (yf - y0) : z part de 0 et tend vers 1 , quel que soit
+# le signe de la valeur finale yf. Les instants de croisement (10% , 90% , sortie de la bande) sont
+# interpoles lineairement entre les deux echantillons qui encadrent le croisement.
+# - depassement : max(z) - 1 (en %) , 0 si la reponse ne depasse pas la valeur finale
+# - sous-depassement (undershoot) : -min(z) (en %) , la reponse part d'abord dans le mauvais sens
+# - temps de montee : de 10% a 90% de yf - y0
+# - temps de stabilisation : dernier instant ou |z - 1| sort de la bande (settling_band , 5% par defaut) ,
+#   0 si la reponse reste dans la bande , NaN si elle n'y est pas encore a la fin de la simulation
+# - erreur statique : reference - yf (reference = 1 pour un echelon unitaire)
+# Si yf = y0 (gain statique nul) les grandeurs relatives a yf sont NaN , la bande est relative au pic.
+
+RISE_LOW = 0.1
+RISE_HIGH = 0.9
+
+
+# instant ou chaque ligne de `values` atteint `level` pour la premiere fois (interpolation lineaire)
+def first_crossing(time: np.ndarray, values: np.ndarray, level: float) -> np.ndarray:
+    rows = np.arange(values.shape[0])
+    reached = values >= level
+    index = np.argmax(reached, axis=1)
+    previous = np.maximum(index - 1, 0)
+    v0, v1 = values[rows, previous], values[rows, index]
+    t0, t1 = time[rows, previous], time[rows, index]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where((index > 0) & (v1 != v0), (level - v0) / (v1 - v0), 0.0)
+    return np.where(reached.any(axis=1), t0 + fraction * (t1 - t0), np.nan)
+
+
+# sommet de la parabole qui passe par les echantillons i - 1 , i , i + 1 (pas quelconque)
+def refine_peak(time: np.ndarray, values: np.ndarray, index: np.ndarray):
+    rows = np.arange(values.shape[0])
+    inside = (index > 0) & (index < values.shape[1] - 1)
+    left, right = np.maximum(index - 1, 0), np.minimum(index + 1, values.shape[1] - 1)
+    t0, t1, t2 = time[rows, left], time[rows, index], time[rows, right]
+    y0, y1, y2 = values[rows, left], values[rows, index], values[rows, right]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d0 = (y1 - y0) / (t1 - t0)
+        d1 = (y2 - y1) / (t2 - t1)
+        curvature = (d1 - d0) / (t2 - t0)
+        slope = d0 - curvature * (t1 - t0)
+        peak_time = t0 - slope / (2 * curvature)
+        peak_value = y0 + slope * (peak_time - t0) + curvature * (peak_time - t0) * (peak_time - t1)
+    usable = inside & (curvature < 0) & (peak_time >= t0) & (peak_time <= t2)
+    return np.where(usable, peak_time, t1), np.where(usable, peak_value, y1)
+
+
+def step_metrics(time, response, final_value=None, settling_band: float = None, reference: float = 1.0) -> dict:
+    settling_band = settings.STEP_SETTLING_BAND if settling_band is None else settling_band
+    response = np.asarray(response, dtype=float)
+    single = response.ndim == 1
+    response = np.atleast_2d(response)
+    time = np.broadcast_to(np.asarray(time, dtype=float), response.shape)
+    rows = np.arange(response.shape[0])
+
+    initial = response[:, 0]
+    if final_value is None:
+        final_value = response[:, -1]
+    final_value = np.broadcast_to(np.asarray(final_value, dtype=float).ravel(), initial.shape)
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        amplitude = final_value - initial
+        moving = np.isfinite(amplitude) & (amplitude != 0)
+        # sans valeur finale distincte de y0 , la normalisation utilise le plus grand ecart a y0
+        excursion = np.nanmax(np.abs(response - initial[:, None]), axis=1)
+        scale = np.where(moving, amplitude, np.where(excursion > 0, excursion, 1.0))
+        normalized = (response - initial[:, None]) / scale[:, None]
+        filled = np.where(np.isnan(normalized), -np.inf, normalized)
+
+        peak_index = np.argmax(filled, axis=1)
+        peak_time, peak_normalized = refine_peak(time, normalized, peak_index)
+        peak_amplitude = initial + peak_normalized * scale
+        overshoot = np.where(moving, np.maximum(peak_normalized - 1, 0) * 100, np.nan)
+        undershoot = np.where(moving, np.maximum(-np.nanmin(normalized, axis=1), 0) * 100, np.nan)
+
+        rise_time = first_crossing(time, normalized, RISE_HIGH) - first_crossing(time, normalized, RISE_LOW)
+        rise_time = np.where(moving, rise_time, np.nan)
+
+        target = np.where(moving, 1.0, (final_value - initial) / scale)
+        error = np.abs(normalized - target[:, None])
+        outside = ~(error <= settling_band)
+        last = response.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1)
+        following = np.minimum(last + 1, response.shape[1] - 1)
+        e0, e1 = error[rows, last], error[rows, following]
+        t0, t1 = time[rows, last], time[rows, following]
+        fraction = np.where(e0 != e1, (e0 - settling_band) / (e0 - e1), 0.0)
+        settling_time = t0 + np.clip(fraction, 0, 1) * (t1 - t0)
+        settling_time = np.where(outside.any(axis=1), settling_time, time[:, 0])
+        # encore hors de la bande au dernier echantillon : la reponse n'est pas stabilisee
+        settling_time = np.where(outside[:, -1], np.nan, settling_time)
+
+    metrics = {
+        "final_value": np.array(final_value, dtype=float),
+        "overshoot": overshoot,
+        "undershoot": undershoot,
+        "peak_time": peak_time,
+        "peak_amplitude": peak_amplitude,
+        "rise_time": rise_time,
+        "settling_time": settling_time,
+        "steady_state_error": reference - final_value,
+    }
+    if single:
+        return {name: float(value[0]) for name, value in metrics.items()}
+    return metrics
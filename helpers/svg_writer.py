@@ -0,0 +1,287 @@
+import io
+import math
+import zlib
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from config import settings
+
+# Ecriture directe du svg des graphiques simples (reponses temporelles , diagramme de bode) sans matplotlib.
+#
+# matplotlib construit pour chaque rendu des objets figure , axes , textes et graduations (quelques dizaines de ms)
+# et ecrit un svg lourd : coordonnees en pleine precision , chaque caractere des textes dessine en chemin.
+# Ici le svg est ecrit directement : graduations lineaires et logarithmiques , grille , titre , legende ,
+# textes en <text> , chaque courbe en un seul <path> avec SVG_PRECISION decimales (en pixels).
+# Avant l'ecriture les courbes peuvent etre simplifiees (option "simplify") , dans l'espace des pixels :
+#   - "rdp" : Ramer-Douglas-Peucker , les points a moins de SVG_SIMPLIFY_TOLERANCE pixel de la courbe simplifiee
+#             sont retires (pas de difference visible)
+#   - "lttb" : Largest-Triangle-Three-Buckets , au plus SVG_LTTB_POINTS points (forme generale gardee)
+#   - "none" : tous les points
+#
+# SvgWriter a la meme interface que FigureEngine pour ces graphiques (time_plot , bode_plot) ,
+# Service l'utilise avec l'option "renderer": "native" (voir RENDERERS).
+
+RENDERERS = ("matplotlib", "native")
+SIMPLIFICATIONS = ("none", "rdp", "lttb")
+
+WIDTH = 640
+HEIGHT = 480
+FONT = "DejaVu Sans, Arial, Helvetica, sans-serif"
+# couleurs des courbes (cycle par defaut de matplotlib)
+COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22",
+          "#17becf")
+# pas des graduations lineaires : m * 10^k
+TICK_STEPS = (1, 2, 2.5, 5, 10)
+# les coordonnees hors de l'image sont bornees (le chemin reste valide , la partie cachee n'est pas changee)
+COORDINATE_LIMIT = 1e6
+
+
+# graduations lineaires "rondes" entre low et high , retourne (valeurs , pas)
+def linear_ticks(low: float, high: float, count: int = 6):
+    raw = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in TICK_STEPS if m * magnitude >= raw * (1 - 1e-9))
+    first = math.ceil(low / step - 1e-9)
+    last = math.floor(high / step + 1e-9)
+    return np.arange(first, last + 1) * step, step
+
+
+# graduations logarithmiques : (decades , graduations secondaires 2..9 x 10^k)
+def log_ticks(low: float, high: float):
+    first, last = math.floor(math.log10(low)), math.ceil(math.log10(high))
+    decades = np.arange(first, last + 1)
+    major = 10.0 ** decades
+    minor = (np.arange(2, 10)[None, :] * major[:, None]).ravel()
+    inside = lambda values: values[(values >= low * (1 - 1e-9)) & (values <= high * (1 + 1e-9))]
+    return inside(major), inside(minor)
+
+
+# valeur d'une graduation avec juste assez de decimales pour le pas (2.5 -> 1 , 0.25 -> 2 ...)
+def format_tick(value: float, step: float) -> str:
+    decimals = 0
+    while decimals < 12 and abs(step * 10 ** decimals - round(step * 10 ** decimals)) > 1e-6 * step * 10 ** decimals:
+        decimals += 1
+    text = f"{value:.{decimals}f}"
+    if float(text) == 0:
+        text = text.lstrip("-")
+    return text.replace("-", "−")
+
+
+# limites d'un axe a partir des donnees finies , avec une marge (comme l'autoscale de matplotlib)
+def data_limits(values, margin: float = 0.05, log: bool = False):
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values) & ((values > 0) if log else True)]
+    if values.size == 0:
+        return (1.0, 10.0) if log else (-1.0, 1.0)
+    low, high = float(values.min()), float(values.max())
+    if log:
+        return low, high if high > low else low * 10
+    if high == low:
+        spread = abs(low) * 0.1 or 1.0
+        return low - spread, high + spread
+    spread = (high - low) * margin
+    return low - spread, high + spread
+
+
+# Ramer-Douglas-Peucker , retourne les indices des points gardes (x , y en pixels)
+def rdp(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(x) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = math.hypot(dx, dy)
+        distance = np.abs(px * dy - py * dx) / length if length > 0 else np.hypot(px, py)
+        index = int(np.argmax(distance))
+        if distance[index] > tolerance:
+            middle = first + 1 + index
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+    return np.flatnonzero(keep)
+
+
+# Largest-Triangle-Three-Buckets , retourne les indices d'au plus `count` points
+def lttb(x: np.ndarray, y: np.ndarray, count: int) -> np.ndarray:
+    size = len(x)
+    if count >= size or count < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, count - 1).astype(int)
+    selected = np.empty(count, dtype=int)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(count - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # le point moyen du seau suivant (le dernier point pour le dernier seau)
+        following = slice(edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else slice(size - 1, size)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+# identifiant de la zone de decoupe , unique pour des donnees differentes (plusieurs svg dans la meme page html)
+# et toujours le meme pour les memes donnees (svg reproductible , meme ETag)
+def clip_id(x, y) -> str:
+    checksum = zlib.crc32(np.asarray(x, dtype=float).tobytes())
+    return f"clip{zlib.crc32(np.asarray(y, dtype=float).tobytes(), checksum):08x}"
+
+
+class Axes:
+    # zone de trace (en pixels) et transformation donnees -> pixels
+    def __init__(self, left: float, top: float, width: float, height: float, xlim, ylim, xlog: bool = False):
+        self.left, self.top, self.width, self.height = left, top, width, height
+        self.xlim, self.ylim, self.xlog = (float(xlim[0]), float(xlim[1])), (float(ylim[0]), float(ylim[1])), xlog
+
+    def x(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        low, high = self.xlim
+        if self.xlog:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values, low, high = np.log10(values), math.log10(low), math.log10(high)
+        return self.left + (values - low) / (high - low) * self.width
+
+    def y(self, values) -> np.ndarray:
+        low, high = self.ylim
+        return self.top + (high - np.asarray(values, dtype=float)) / (high - low) * self.height
+
+
+class SvgWriter:
+    def __init__(self, precision: int = None):
+        self.precision = settings.SVG_PRECISION if precision is None else precision
+
+    def time_plot(self, t, y, title="State-Space Step Response", xlabel="Time (seconds)", ylabel="Response",
+                  grid=True, legend="Response", xlim=(0, 10), ylim=(-5, 5), simplify=None) -> io.BytesIO:
+        t = np.asarray(t, dtype=float)
+        curves = np.asarray(y, dtype=float).reshape(-1, len(t))
+        axes = Axes(72, 40, WIDTH - 96, HEIGHT - 96, xlim, ylim)
+        clip = clip_id(t, curves)
+        parts = [self.header()]
+        parts += self.frame(axes, grid, clip)
+        parts.append(self.text(axes.left + axes.width / 2, 24, title, size=14))
+        parts.append(self.text(axes.left + axes.width / 2, HEIGHT - 14, xlabel))
+        parts.append(self.text(18, axes.top + axes.height / 2, ylabel, rotate=True))
+        parts += self.curves(axes, t, curves, simplify, clip)
+        if legend and len(curves) == 1:
+            parts += self.legend(axes, legend)
+        parts.append("</svg>\n")
+        return io.BytesIO("".join(parts).encode("utf-8"))
+
+    # deux axes (amplitude en dB , phase en degres) , frequence en echelle log , limites des donnees
+    def bode_plot(self, omega, magnitude_db, phase_deg, img_format="svg", tight=False, simplify=None) -> io.BytesIO:
+        omega = np.asarray(omega, dtype=float)
+        xlim = data_limits(omega, log=True)
+        panels = (
+            (Axes(72, 40, WIDTH - 96, 160, xlim, data_limits(magnitude_db), xlog=True), magnitude_db,
+             "Magnitude (dB)"),
+            (Axes(72, 264, WIDTH - 96, 160, xlim, data_limits(phase_deg), xlog=True), phase_deg, "Phase (degrees)"),
+        )
+        parts = [self.header(), self.text(WIDTH / 2, 24, "Bode Plot", size=14)]
+        for index, (axes, values, label) in enumerate(panels):
+            clip = f"{clip_id(omega, values)}-{index}"
+            parts += self.frame(axes, True, clip)
+            parts.append(self.text(18, axes.top + axes.height / 2, label, rotate=True))
+            parts += self.curves(axes, omega, np.asarray(values, dtype=float).reshape(-1, len(omega)), simplify, clip)
+        parts.append(self.text(WIDTH / 2, HEIGHT - 14, "Frequency (rad/s)"))
+        parts.append("</svg>\n")
+        return io.BytesIO("".join(parts).encode("utf-8"))
+
+    def header(self) -> str:
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" '
+                f'viewBox="0 0 {WIDTH} {HEIGHT}" font-family="{FONT}" font-size="11">\n'
+                f'<rect width="{WIDTH}" height="{HEIGHT}" fill="#fff"/>\n')
+
+    def text(self, x: float, y: float, value: str, size: int = 12, anchor: str = "middle", rotate: bool = False) -> str:
+        position = f'transform="translate({x:.1f},{y:.1f}) rotate(-90)"' if rotate else f'x="{x:.1f}" y="{y:.1f}"'
+        return f'<text {position} font-size="{size}" text-anchor="{anchor}">{escape(str(value))}</text>\n'
+
+    # cadre , graduations , valeurs des graduations et grille d'un axe , zone de decoupe des courbes
+    def frame(self, axes: Axes, grid: bool, clip: str) -> list:
+        left, top, right, bottom = axes.left, axes.top, axes.left + axes.width, axes.top + axes.height
+        parts = [f'<clipPath id="{clip}"><rect x="{left}" y="{top}" width="{axes.width}" height="{axes.height}"/>'
+                 f'</clipPath>\n']
+        lines = []  # graduations
+        grid_lines = []
+        labels = []
+        if axes.xlog:
+            major, minor = log_ticks(*axes.xlim)
+            for value, px in zip(minor, axes.x(minor)):
+                lines.append(f"M{px:.1f},{bottom}v2")
+                grid_lines.append(f"M{px:.1f},{top}V{bottom}")
+            decades = np.round(np.log10(major)).astype(int)
+            every = max(1, math.ceil(len(major) / 8))  # pas plus de 8 valeurs
+            for index, (decade, px) in enumerate(zip(decades, axes.x(major))):
+                lines.append(f"M{px:.1f},{bottom}v4")
+                grid_lines.append(f"M{px:.1f},{top}V{bottom}")
+                if index % every == 0:
+                    labels.append(f'<text x="{px:.1f}" y="{bottom + 17:.1f}" text-anchor="middle">10'
+                                  f'<tspan dy="-5" font-size="8">{str(decade).replace("-", chr(0x2212))}</tspan>'
+                                  f'</text>\n')
+        else:
+            ticks, step = linear_ticks(*axes.xlim)
+            for value, px in zip(ticks, axes.x(ticks)):
+                lines.append(f"M{px:.1f},{bottom}v4")
+                grid_lines.append(f"M{px:.1f},{top}V{bottom}")
+                labels.append(f'<text x="{px:.1f}" y="{bottom + 16:.1f}" text-anchor="middle">'
+                              f'{format_tick(value, step)}</text>\n')
+        ticks, step = linear_ticks(*axes.ylim)
+        for value, py in zip(ticks, axes.y(ticks)):
+            lines.append(f"M{left},{py:.1f}h-4")
+            grid_lines.append(f"M{left},{py:.1f}H{right}")
+            labels.append(f'<text x="{left - 7}" y="{py + 4:.1f}" text-anchor="end">{format_tick(value, step)}</text>\n')
+        if grid:
+            parts.append(f'<path d="{"".join(grid_lines)}" stroke="#b0b0b0" stroke-width="0.6" fill="none"/>\n')
+        parts.append(f'<path d="{"".join(lines)}" stroke="#000" stroke-width="0.8" fill="none"/>\n')
+        parts += labels
+        parts.append(f'<rect x="{left}" y="{top}" width="{axes.width}" height="{axes.height}" fill="none" '
+                     f'stroke="#000" stroke-width="0.8"/>\n')
+        return parts
+
+    # une courbe par ligne de `curves` , un <path> par courbe , interrompu aux points non finis
+    def curves(self, axes: Axes, x: np.ndarray, curves: np.ndarray, simplify, clip: str) -> list:
+        simplify = simplify or settings.SVG_SIMPLIFY
+        parts = []
+        for index, curve in enumerate(curves):
+            px = np.clip(axes.x(x), -COORDINATE_LIMIT, COORDINATE_LIMIT)
+            py = np.clip(axes.y(curve), -COORDINATE_LIMIT, COORDINATE_LIMIT)
+            finite = np.isfinite(px) & np.isfinite(py)
+            path = []
+            # morceaux continus de points finis
+            bounds = np.flatnonzero(np.diff(np.concatenate([[0], finite.astype(np.int8), [0]])))
+            for start, end in zip(bounds[::2], bounds[1::2]):
+                path.append(self.polyline(px[start:end], py[start:end], simplify))
+            parts.append(f'<path d="{"".join(path)}" clip-path="url(#{clip})" fill="none" '
+                         f'stroke="{COLORS[index % len(COLORS)]}" stroke-width="1.5" stroke-linejoin="round"/>\n')
+        return parts
+
+    def polyline(self, x: np.ndarray, y: np.ndarray, simplify: str) -> str:
+        if len(x) > 2 and simplify == "rdp":
+            kept = rdp(x, y, settings.SVG_SIMPLIFY_TOLERANCE)
+            x, y = x[kept], y[kept]
+        elif len(x) > 2 and simplify == "lttb":
+            kept = lttb(x, y, settings.SVG_LTTB_POINTS)
+            x, y = x[kept], y[kept]
+        coordinates = np.empty(2 * len(x))
+        coordinates[0::2], coordinates[1::2] = x, y
+        point = f"%.{self.precision}f,%.{self.precision}f"
+        return "M" + ("L".join([point] * len(x)) % tuple(np.round(coordinates, self.precision)))
+
+    def legend(self, axes: Axes, label: str) -> list:
+        width = 40 + 7 * len(str(label))
+        x, y = axes.left + axes.width - width - 8, axes.top + 8
+        return [
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{width}" height="22" fill="#fff" fill-opacity="0.8" '
+            f'stroke="#ccc" rx="3"/>\n',
+            f'<path d="M{x + 6:.1f},{y + 11:.1f}h22" stroke="{COLORS[0]}" stroke-width="1.5"/>\n',
+            self.text(x + 34, y + 15, label, size=11, anchor="start"),
+        ]
+
+
+svg_writer = SvgWriter()
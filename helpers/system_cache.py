@@ -0,0 +1,301 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Union
+
+import control as ctrl
+import numpy as np
+from control import TransferFunction, StateSpace
+
+from config import settings
+from helpers.metrics import timed
+from helpers.model_reduction import BalancedRealization
+from helpers.sparse_lti import SparseFrequencyResponse, SparseStateSpace, dense, dominant_poles, is_large_sparse, \
+    sparse_dcgain, unsupported_error
+
+# Cache LRU des systemes LTI , partage par ss_router , tf_router et le Service.
+# La cle d'un systeme est un hash sha256 de ses coefficients (ou matrices) normalises ,
+# donc les requetes step , impulse , bode , nyquist ... envoyees pour le meme modele
+# partagent le meme objet systeme et les memes donnees derivees (poles , zeros , gain statique ...)
+# qui sont calculees une seule fois , a la premiere demande.
+# L'eviction est faite selon la memoire estimee des entrees (et un nombre max d'entrees).
+# Les grands modeles creux (voir helpers/sparse_lti.py) sont gardes en SparseStateSpace , leur cle est le hash
+# de la matrice A au format CSR canonique (indices tries , doublons additionnes).
+# Les modeles du registre (voir helpers/model_registry.py) passent a la validation les tableaux normalises de leur
+# entree : l'entree est retrouvee par l'identite des tableaux (comme by_id pour les systemes) , sans hash.
+
+# taille forfaitaire d'un objet python-control (attributs , noms des signaux ...)
+OBJECT_OVERHEAD = 2048
+
+
+def normalize_polynomial(coefficients) -> np.ndarray:
+    array = np.atleast_1d(np.asarray(coefficients, dtype=np.float64)).ravel()
+    nonzero = np.flatnonzero(array)
+    # on supprime les zeros en tete , comme le fait ctrl.tf
+    array = array[nonzero[0]:] if nonzero.size else array[-1:]
+    # + 0.0 remplace -0.0 par 0.0 pour avoir le meme hash
+    return np.ascontiguousarray(array + 0.0)
+
+
+def normalize_matrix(matrix) -> np.ndarray:
+    array = np.asarray(dense(matrix), dtype=np.float64)
+    if array.ndim < 2:
+        array = array.reshape(1, -1) if array.size else array.reshape(0, 0)
+    return np.ascontiguousarray(array + 0.0)
+
+
+# A creuse au format CSR canonique : (forme , indptr , indices , valeurs)
+def normalize_sparse(matrix) -> tuple:
+    matrix = matrix.tocsr(copy=True)
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    return (np.array(matrix.shape, dtype=np.int64), matrix.indptr.astype(np.int64), matrix.indices.astype(np.int64),
+            np.ascontiguousarray(matrix.data + 0.0))
+
+
+def hash_arrays(kind: str, arrays) -> str:
+    digest = hashlib.sha256(kind.encode())
+    for array in arrays:
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+# estimation de la memoire occupee par une valeur stockee dans le cache
+def estimate_nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, TransferFunction):
+        return OBJECT_OVERHEAD + sum(
+            np.asarray(poly).nbytes for rows in (value.num, value.den) for row in rows for poly in row
+        )
+    if isinstance(value, StateSpace):
+        return OBJECT_OVERHEAD + sum(np.asarray(m).nbytes for m in (value.A, value.B, value.C, value.D))
+    if isinstance(value, (SparseStateSpace, SparseFrequencyResponse, BalancedRealization)):
+        return OBJECT_OVERHEAD + value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(item) for item in value.values())
+    return 64
+
+
+class CachedSystem:
+    def __init__(self, key: Union[str, None], system: Union[TransferFunction, StateSpace], inputs: tuple = (),
+                 cache=None):
+        self.key = key
+        self.system = system
+        self.inputs = inputs  # les tableaux normalises qui ont servi a construire le systeme
+        self.cache = cache
+        self.derived = {}
+        self.lock = threading.RLock()
+        self.nbytes = estimate_nbytes(system) + estimate_nbytes(inputs)
+
+    # retourne la donnee derivee `name` , elle est calculee par `compute` seulement a la premiere demande
+    def get(self, name: str, compute):
+        with self.lock:
+            if name in self.derived:
+                return self.derived[name]
+            value = compute()
+            self.derived[name] = value
+        self.grow(estimate_nbytes(value))
+        return value
+
+    # memoire ajoutee (ou liberee) par une donnee derivee
+    def grow(self, size: int):
+        if self.cache is not None:
+            self.cache.resize(self, size)
+        else:
+            self.nbytes += size
+
+    def is_tf(self) -> bool:
+        return isinstance(self.system, TransferFunction)
+
+    def is_sparse(self) -> bool:
+        return isinstance(self.system, SparseStateSpace)
+
+    # poles dominants seulement pour un modele creux
+    def poles(self) -> np.ndarray:
+        if self.is_sparse():
+            return self.get("poles", lambda: dominant_poles(self.system.A))
+        return self.get("poles", lambda: ctrl.poles(self.system))
+
+    def zeros(self) -> np.ndarray:
+        if self.is_sparse():
+            raise unsupported_error()
+        return self.get("zeros", lambda: ctrl.zeros(self.system))
+
+    def dcgain(self):
+        if self.is_sparse():
+            return self.get("dcgain", lambda: sparse_dcgain(self.system))
+        return self.get("dcgain", lambda: ctrl.dcgain(self.system))
+
+    # H(jw) d'un modele creux (Krylov decale) , les factorisations sont gardees d'un appel a l'autre
+    def sparse_frequency_response(self) -> SparseFrequencyResponse:
+        return self.get("sparse_frequency_response", lambda: SparseFrequencyResponse(self.system, self.grow))
+
+    def as_tf(self) -> TransferFunction:
+        if self.is_tf():
+            return self.system
+        if self.is_sparse():
+            raise unsupported_error()
+        return self.get("tf", lambda: ctrl.ss2tf(self.system))
+
+    def as_ss(self) -> StateSpace:
+        if not self.is_tf():
+            return self.system
+        return self.get("ss", lambda: ctrl.tf2ss(self.system))
+
+    def closed_loop(self) -> Union[TransferFunction, StateSpace]:
+        if self.is_sparse():
+            raise unsupported_error()
+        return self.get("closed_loop", lambda: ctrl.feedback(self.system, 1))
+
+
+class SystemCache:
+    def __init__(self, max_bytes: int = None, max_entries: int = None):
+        self.max_bytes = settings.SYSTEM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entries = settings.SYSTEM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.entries = OrderedDict()  # key -> CachedSystem , du moins recent au plus recent
+        self.by_id = {}  # id(system) -> CachedSystem , pour retrouver l'entree d'un systeme deja construit
+        self.by_inputs = {}  # id(A) -> CachedSystem , pour les matrices normalisees d'une entree (modele enregistre)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    # construire (ou recuperer) une fonction de transfert
+    @timed("model")
+    def tf(self, num, den) -> TransferFunction:
+        return self.tf_entry(num, den).system
+
+    # construire (ou recuperer) un modele d'espace d'etat , SparseStateSpace si A est creuse et assez grande
+    @timed("model")
+    def ss(self, A, B, C, D) -> Union[StateSpace, SparseStateSpace]:
+        return self.ss_entry(A, B, C, D).system
+
+    def tf_entry(self, num, den) -> CachedSystem:
+        inputs = (normalize_polynomial(num), normalize_polynomial(den))
+        return self.lookup("tf", inputs, lambda: ctrl.tf(*inputs))
+
+    def ss_entry(self, A, B, C, D) -> CachedSystem:
+        entry = self.known((A, B, C, D))
+        if entry is not None:
+            return entry
+        if is_large_sparse(A):
+            inputs = normalize_sparse(A) + tuple(normalize_matrix(m) for m in (B, C, D))
+            return self.lookup("sparse_ss", inputs, lambda: SparseStateSpace(A, *inputs[4:]))
+        inputs = tuple(normalize_matrix(m) for m in (A, B, C, D))
+        return self.lookup("ss", inputs, lambda: ctrl.ss(*inputs))
+
+    def lookup(self, kind: str, inputs: tuple, build) -> CachedSystem:
+        key = hash_arrays(kind, inputs)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # la construction est faite hors du verrou , une autre requete peut construire le meme systeme
+        # en parallele , dans ce cas la premiere entree inseree est gardee
+        entry = CachedSystem(key, build(), inputs, cache=self)
+        with self.lock:
+            existing = self.entries.get(key)
+            if existing is not None:
+                return existing
+            self.insert(entry)
+            self.evict()
+        return entry
+
+    # entree dont les tableaux normalises sont exactement `arrays` (memes objets) , None sinon
+    def known(self, arrays: tuple):
+        with self.lock:
+            entry = self.by_inputs.get(id(arrays[0]))
+            if entry is None or len(entry.inputs) != len(arrays) or \
+                    any(array is not expected for array, expected in zip(arrays, entry.inputs)):
+                return None
+            if self.entries.get(entry.key) is entry:
+                self.entries.move_to_end(entry.key)
+            self.hits += 1
+        return entry
+
+    # entree gardee hors du cache (modele enregistre , voir helpers/model_registry.py) : remise dans le cache
+    # si elle a ete evincee , avec ses donnees derivees (elle remplace une entree reconstruite entre-temps)
+    def adopt(self, entry: CachedSystem):
+        with self.lock:
+            existing = self.entries.get(entry.key)
+            if existing is entry:
+                self.entries.move_to_end(entry.key)
+                return
+            if existing is not None:
+                self.discard(entry.key)
+            entry.cache = self
+            self.insert(entry)
+            self.evict()
+
+    def insert(self, entry: CachedSystem):
+        self.entries[entry.key] = entry
+        self.by_id[id(entry.system)] = entry
+        if entry.inputs:
+            self.by_inputs[id(entry.inputs[0])] = entry
+        self.total_bytes += entry.nbytes
+
+    def discard(self, key: str) -> CachedSystem:
+        entry = self.entries.pop(key)
+        self.by_id.pop(id(entry.system), None)
+        if entry.inputs and self.by_inputs.get(id(entry.inputs[0])) is entry:
+            del self.by_inputs[id(entry.inputs[0])]
+        self.total_bytes -= entry.nbytes
+        return entry
+
+    # retourne l'entree du cache d'un systeme , ou une entree temporaire (non stockee)
+    # si le systeme n'a pas ete construit par le cache (ex: resultat d'un ctrl.feedback)
+    def entry(self, system: Union[TransferFunction, StateSpace]) -> CachedSystem:
+        with self.lock:
+            entry = self.by_id.get(id(system))
+        if entry is not None and entry.system is system:
+            return entry
+        return CachedSystem(None, system)
+
+    # appele par une entree quand une donnee derivee est ajoutee
+    def resize(self, entry: CachedSystem, size: int):
+        with self.lock:
+            entry.nbytes += size
+            if self.entries.get(entry.key) is entry:
+                self.total_bytes += size
+                self.evict()
+
+    def evict(self):
+        while self.entries and (self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries):
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_id.clear()
+            self.by_inputs.clear()
+            self.total_bytes = 0
+
+    # remise a zero des compteurs (apres la chauffe du demarrage , voir helpers/warmup.py)
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+system_cache = SystemCache()
@@ -0,0 +1,117 @@
+import numpy as np
+
+from config import settings
+
+# Generation du vecteur du temps a partir de la dynamique du systeme (ses poles).
+#
+# Chaque pole p_i donne un mode de la reponse :
+# - son echelle de temps est 1 / |p_i| , le pas doit etre plus petit (POINTS_PER_TIME_CONSTANT points)
+# - le mode est actif jusqu'a ~ SETTLING_TIME_CONSTANTS / |Re(p_i)| (infini si Re(p_i) >= 0)
+# Le pas necessaire a l'instant t est donc le plus petit pas des modes encore actifs :
+# petit au debut (regime transitoire) et grand quand les modes rapides sont eteints (regime permanent).
+#
+# python-control exige un temps equidistant pour chaque simulation , la grille est donc une suite
+# de segments uniformes (le pas double d'un segment au suivant au minimum) , la simulation est faite
+# segment par segment en gardant l'etat (voir Service.simulate).
+# Le nombre total de points est limite par TIME_GRID_MAX_POINTS.
+
+POINTS_PER_TIME_CONSTANT = 20
+SETTLING_TIME_CONSTANTS = 7
+MAX_SEGMENTS = 8
+
+
+class TimeGrid:
+    def __init__(self, segments: list):
+        # segments uniformes et contigus : segments[i][-1] == segments[i + 1][0]
+        self.segments = segments
+
+    @property
+    def time(self) -> np.ndarray:
+        # le premier point de chaque segment (sauf le premier) est le dernier du segment precedent
+        return np.concatenate([self.segments[0]] + [segment[1:] for segment in self.segments[1:]])
+
+    # grille suivie d'une autre grille decalee a la fin de celle-ci (la simulation continue sur `tail`)
+    def extend(self, tail: "TimeGrid") -> "TimeGrid":
+        end = self.segments[-1][-1]
+        return TimeGrid(self.segments + [segment + end for segment in tail.segments])
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments) - len(self.segments) + 1
+
+
+# grille uniforme de pas 0.01 , la methode utilisee avant la grille adaptative
+def fixed_time_grid(t_end: float, step: float = 0.01) -> TimeGrid:
+    return TimeGrid([np.arange(0, t_end, step)])
+
+
+# duree necessaire pour voir la reponse complete (utilisee quand le client ne donne pas t_max)
+def settling_horizon(poles: np.ndarray, default: float = 10.0) -> float:
+    poles = np.asarray(poles, dtype=complex)
+    poles = poles[np.isfinite(poles) & (np.abs(poles) > 0)]
+    if poles.size == 0:
+        return default
+    decay = -poles.real
+    stable = decay > 0
+    horizon = 0.0
+    if stable.any():
+        horizon = SETTLING_TIME_CONSTANTS / decay[stable].min()
+    if not stable.all():
+        # poles instables ou marginalement stables : quelques periodes / constantes de temps
+        horizon = max(horizon, SETTLING_TIME_CONSTANTS / np.abs(poles[~stable]).min())
+    return float(horizon)
+
+
+def adaptive_time_grid(poles: np.ndarray, t_end: float, max_points: int = None, min_points: int = None) -> TimeGrid:
+    return TimeGrid([np.linspace(start, end, count + 1)
+                     for start, end, count in adaptive_segments(poles, t_end, max_points, min_points)])
+
+
+# segments de la grille adaptative sans les construire : [(debut , fin , nombre d'intervalles)]
+# (utilise directement par la simulation en flux , voir helpers/simulator.stream_exact)
+def adaptive_segments(poles: np.ndarray, t_end: float, max_points: int = None, min_points: int = None) -> list:
+    max_points = settings.TIME_GRID_MAX_POINTS if max_points is None else max_points
+    min_points = settings.TIME_GRID_MIN_POINTS if min_points is None else min_points
+    min_points = min(min_points, max_points)
+
+    poles = np.asarray(poles, dtype=complex).ravel()
+    poles = poles[np.isfinite(poles) & (np.abs(poles) > 0)]
+    coarse_step = t_end / (min_points - 1)
+    if poles.size == 0 or t_end <= 0:
+        return [(0.0, t_end, min_points - 1)]
+
+    # pas de chaque mode et instant a partir duquel le mode est eteint
+    steps = 1 / (POINTS_PER_TIME_CONSTANT * np.abs(poles))
+    decay = -poles.real
+    with np.errstate(divide="ignore"):
+        active_until = np.where(decay > 0, SETTLING_TIME_CONSTANTS / np.where(decay > 0, decay, 1), np.inf)
+
+    # intervalles [debut , fin] et pas de chaque intervalle
+    breakpoints = np.unique(np.concatenate([[0.0], np.clip(active_until, 0, t_end), [t_end]]))
+    intervals = []
+    for start, end in zip(breakpoints[:-1], breakpoints[1:]):
+        active = active_until > start
+        step = min(steps[active].min(), coarse_step) if active.any() else coarse_step
+        intervals.append([start, end, step])
+
+    # le pas ne diminue jamais avec le temps , et on arrondit les pas a h0 * 2^k pour regrouper les intervalles
+    for i in range(len(intervals) - 2, -1, -1):
+        intervals[i][2] = min(intervals[i][2], intervals[i + 1][2])
+    base = intervals[0][2]
+    for interval in intervals:
+        interval[2] = base * 2 ** np.floor(np.log2(interval[2] / base))
+    merged = [intervals[0]]
+    for start, end, step in intervals[1:]:
+        if step == merged[-1][2] or len(merged) >= MAX_SEGMENTS:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end, step])
+
+    # respect du budget de points : tous les pas sont multiplies par le meme facteur
+    total = sum((end - start) / step for start, end, step in merged)
+    scale = 1.0
+    if total > max_points:
+        scale = total / max_points
+    elif total < min_points:
+        scale = total / min_points
+
+    return [(start, end, max(int(np.ceil((end - start) / (step * scale))), 1)) for start, end, step in merged]
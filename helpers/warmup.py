@@ -0,0 +1,106 @@
+import gc
+import time
+
+from config import settings
+from helpers.metrics import metrics
+from helpers.response_cache import response_cache
+from helpers.system_cache import system_cache
+
+# Chauffe du serveur avant la premiere requete : chaque route est appelee une fois avec un petit modele
+# (client de test de Flask , rien ne passe par le reseau) pour que les chemins paresseux soient deja faits :
+# sous-modules de scipy importes au premier appel , schemas marshmallow , routes de Flask , gabarits des
+# figures matplotlib et polices (si le rendu est fait dans le processus) , ecriture directe du svg ...
+#
+# Avec gunicorn --preload (voir docs/performance.md) la chauffe est faite une seule fois dans le processus maitre
+# avant le fork : les workers partagent ces pages memoire (copie a l'ecriture) et la premiere requete
+# d'un worker a deja la latence du regime etabli.
+#
+# Pas de thread ni de processus demarre par warm_up : ils ne survivent pas au fork , le pool de rendu est demarre
+# dans chaque worker (warm_worker). Pas de requete /models non plus : le registre des modeles ouvrirait sa base SQLite
+# avant le fork et garderait le modele de chauffe (voir helpers/model_registry.py).
+
+TF = {"num": [1, 2], "den": [1, 3, 3, 1]}
+SS = {"A": [[0, 1], [-2, -3]], "B": [[0], [1]], "C": [[1, 0]], "D": [[0]]}
+AXES = {"t_max": 10, "x_axis": [0, 10], "y_axis": [-1, 2]}
+FREQUENCY_AXES = {"t_max": 10, "x_axis": [-2, 2]}
+ANALYSES = ["poles_zeros", "step", "impulse", "ramp", "bode", "nyquist", "step_performance", "bode_performance",
+            "close_loop", "convert"]
+SWEEP = {"parameters": [{"target": "gain", "start": 0.5, "stop": 2, "count": 4}],
+         "metrics": ["poles", "step", "margins"]}
+
+
+# (route , payload) : format json pour les calculs , svg "native" pour l'ecriture directe ,
+# svg matplotlib seulement si le rendu est fait dans ce processus (sinon les processus du pool sont deja chauds)
+def warmup_requests() -> list:
+    requests = []
+    for prefix, model, convert in (("/tf", TF, "/tf_to_ss"), ("/ss", SS, "/ss_to_tf")):
+        for path in ("/step", "/impulse", "/ramp"):
+            requests.append((prefix + path, {**model, **AXES, "format": "json"}))
+            requests.append((prefix + path, {**model, **AXES, "format": "svg", "renderer": "native"}))
+        requests += [
+            (prefix + "/bode", {**model, **FREQUENCY_AXES, "format": "json"}),
+            (prefix + "/bode", {**model, **FREQUENCY_AXES, "format": "svg", "renderer": "native"}),
+            (prefix + "/nyquist", {**model, **AXES, "format": "json"}),
+            (prefix + "/poles_zeros_map", {**model, "format": "json"}),
+            (prefix + "/step/performance", model),
+            (prefix + "/bode/performance", model),
+            (prefix + "/close_loop", model),
+            (prefix + convert, model),
+            (prefix + "/analyze", {**model, "analyses": ANALYSES, "format": "json"}),
+            (prefix + "/sweep", {**model, **SWEEP}),
+        ]
+        if not settings.RENDER_POOL:
+            requests += [
+                (prefix + "/step", {**model, **AXES, "format": "svg", "renderer": "matplotlib"}),
+                (prefix + "/bode", {**model, **FREQUENCY_AXES, "format": "svg", "renderer": "matplotlib"}),
+                (prefix + "/nyquist", {**model, **AXES, "format": "svg"}),
+                (prefix + "/poles_zeros_map", {**model, "format": "svg"}),
+            ]
+    requests.append(("/ss/reduce", {**SS, "reduction": {"order": 1}}))
+    if not settings.RENDER_POOL:
+        requests.append(("/ss/bode/opt", {**SS, **FREQUENCY_AXES}))
+    return requests
+
+
+# retourne la duree de chaque requete de chauffe (ms) , une requete qui echoue n'arrete pas le demarrage
+def replay(app) -> dict:
+    timings = {}
+    client = app.test_client()
+    for path, payload in warmup_requests():
+        start = time.perf_counter()
+        try:
+            response = client.post(path, json=payload)
+            if response.status_code >= 400:
+                print(f"warm up {path}: {response.status_code}")
+        except Exception as err:
+            print(f"warm up {path}: {err}")
+        timings[path] = timings.get(path, 0.0) + (time.perf_counter() - start) * 1000
+
+    # les modeles de chauffe ne doivent pas rester dans les caches ni compter dans leurs statistiques
+    for cache in (system_cache, response_cache):
+        cache.clear()
+        cache.reset_stats()
+    metrics.reset()
+    return timings
+
+
+# chauffe du processus maitre , avant le fork des workers
+def warm_up(app) -> dict:
+    timings = replay(app)
+    # objets du demarrage sortis du ramasse-miettes : il ne les parcourt plus , donc n'ecrit plus
+    # dans leurs pages memoire et ne casse pas le partage avec les workers apres le fork
+    if settings.STARTUP_GC_FREEZE:
+        gc.collect()
+        gc.freeze()
+    return timings
+
+
+# chauffe d'un worker apres le fork (ou du serveur sans fork) : le pool de rendu est demarre avant la premiere
+# requete au lieu de pendant , et les requetes de chauffe sont rejouees pour que les pages partagees
+# touchees par une requete (compteurs de references) soient copiees maintenant et pas pendant la premiere requete
+def warm_worker(app):
+    if settings.RENDER_POOL:
+        from helpers.render_pool import render_pool
+        render_pool.start()
+    if settings.STARTUP_WARMUP:
+        replay(app)
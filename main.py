@@ -1,9 +1,19 @@
-from server import Server
-import os
+from config import settings
 
-# Fichier main.py , creer une instance de classs Server et demarrer le backend
+# Fichier main.py , creer l'application (voir create_app dans server.py) et demarrer le backend
+# en developpement : python main.py (serveur de Werkzeug)
+# en production : gunicorn -c gunicorn.conf.py (voir gunicorn.conf.py et /docs/performance.md)
+#
+# les processus des pools (jobs et rendu , voir helpers/job_pool.py et helpers/render_pool.py) sont demarres
+# avec "spawn" et importent ce fichier sous le nom __mp_main__ : ils n'ont pas besoin du serveur ,
+# l'application n'est creee (et chauffee , voir helpers/warmup.py) que dans le processus du serveur
+if __name__ != "__mp_main__":
+    from server import create_app
+    from helpers.warmup import warm_worker
 
-server = Server()
+    # avec gunicorn --preload cet import est fait dans le processus maitre , avant le fork des workers
+    app = create_app()
 
-app = server.app
-app.run(host="0.0.0.0",port=3000)
\ No newline at end of file
+if __name__ == "__main__":
+    warm_worker(app)
+    app.run(host=settings.SERVER_HOST, port=settings.SERVER_PORT, threaded=True)
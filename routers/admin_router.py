@@ -0,0 +1,63 @@
+from flask import request, send_file
+
+from base.base_router import BaseRouter
+from helpers.profiler import profiler
+
+# Routes /admin : profils des requetes enregistres par helpers/profiler.py (PROFILE_ENABLED) ,
+# protegees par l'entete X-Profile-Token si PROFILE_TOKEN est defini (voir /docs/performance.md)
+
+class AdminRouter(BaseRouter):
+    def __init__(self):
+        super().__init__("admin", __name__)
+        self.store = profiler.store
+        self.register_routes()
+
+    def register_routes(self):
+        self.router.before_request(self.authorize)
+        self.get("/profiles", "profiles", self.profiles)
+        self.get("/profiles/<profile_id>", "profile", self.profile)
+        self.get("/profiles/<profile_id>/stats", "profile_stats", self.profile_stats)
+        self.get("/profiles/<profile_id>/payload", "profile_payload", self.profile_payload)
+
+    def authorize(self):
+        if not profiler.authorized():
+            return {"error": "Invalid profile token."}, 403
+
+    # profils les plus recents en premier
+    def profiles(self):
+        return {"profiles": self.store.entries()}
+
+    # fichier du profil : .prof (cprofile , pstats / snakeviz) ou .txt (piles "collapsed" , flamegraph / speedscope)
+    def profile(self, profile_id: str):
+        info = self.store.info(profile_id)
+        if info is None:
+            return {"error": "Profile not found."}, 404
+        path = self.store.file(profile_id, info["extension"])
+        if path is None:
+            return {"error": "Profile not found."}, 404
+        mimetype = "text/plain" if info["extension"] == ".txt" else "application/octet-stream"
+        return send_file(path, mimetype=mimetype, as_attachment=True, download_name=profile_id + info["extension"])
+
+    # fonctions les plus couteuses d'un profil cprofile , ?sort=cumulative|tottime|calls&limit=40
+    def profile_stats(self, profile_id: str):
+        sort = request.args.get("sort", "cumulative")
+        if sort not in ("cumulative", "tottime", "calls", "ncalls", "time"):
+            return {"error": "sort must be cumulative, tottime, calls, ncalls or time."}, 400
+        try:
+            limit = int(request.args.get("limit", 40))
+        except ValueError:
+            return {"error": "limit must be an integer."}, 400
+        stats = self.store.stats(profile_id, sort, limit)
+        if stats is None:
+            return {"error": "Profile not found."}, 404
+        return stats, 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+    # corps de la requete profilee (a rejouer sur la meme route) , si sa taille est sous PROFILE_MAX_PAYLOAD_BYTES
+    def profile_payload(self, profile_id: str):
+        path = self.store.file(profile_id, ".body")
+        if path is None:
+            return {"error": "Payload not found."}, 404
+        return send_file(path, mimetype="application/json", as_attachment=True, download_name=profile_id + ".json")
+
+
+admin_router = AdminRouter()
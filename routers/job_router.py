@@ -0,0 +1,46 @@
+from flask import request
+
+from base.base_router import BaseRouter
+from helpers.metrics import timed
+from services.job_service import JobService
+from validation.job_validation import JobInput
+
+# Routes /jobs : analyses executees en arriere-plan (voir services/job_service.py et /docs/performance.md)
+
+class JobRouter(BaseRouter):
+    def __init__(self):
+        super().__init__("jobs", __name__)
+        self.service = JobService()
+        self.register_routes()
+
+    def register_routes(self):
+        self.post("", "submit", self.submit)
+        self.get("/<job_id>", "status", self.status)
+        self.get("/<job_id>/result", "result", self.result)
+        self.delete("/<job_id>", "cancel", self.cancel)
+
+    def submit(self):
+        job_input = self.schema(JobInput)
+        try:
+            with timed("validation"):
+                data = job_input.load(request.get_json())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        return self.service.submit(data)
+
+    def status(self, job_id: str):
+        try:
+            wait = float(request.args.get("wait", 0))
+        except ValueError:
+            return {"error": "wait must be a number of seconds."}, 400
+        return self.service.status(job_id, wait)
+
+    def result(self, job_id: str):
+        return self.service.result(job_id)
+
+    def cancel(self, job_id: str):
+        return self.service.cancel(job_id)
+
+
+job_router = JobRouter()
@@ -0,0 +1,59 @@
+from base.base_router import BaseRouter
+from helpers.matrix_codec import request_payload
+from helpers.metrics import timed
+from helpers.model_registry import model_registry
+from validation.model_validation import ModelInput
+from validation.state_space_validation import StateSpaceInput
+from validation.transfer_function_validation import TransferFunctionInput
+
+# Routes /models : registre des modeles (voir helpers/model_registry.py et /docs/performance.md)
+#   POST /models          -> 201 {"id": ..., "model": "tf" | "ss", ...} , le modele est valide comme par les routes
+#   GET /models/<id>      -> description du modele (dimensions , expiration , donnees derivees deja calculees)
+#   DELETE /models/<id>   -> 204
+# L'identifiant est ensuite passe aux routes de /tf et /ss dans l'attribut "model_id".
+
+MODEL_SCHEMAS = {"tf": TransferFunctionInput, "ss": StateSpaceInput}
+
+
+class ModelRouter(BaseRouter):
+    def __init__(self):
+        super().__init__("models", __name__)
+        self.registry = model_registry
+        self.register_routes()
+
+    def register_routes(self):
+        self.post("", "register", self.register)
+        self.get("/<model_id>", "describe", self.describe)
+        self.delete("/<model_id>", "remove", self.remove)
+
+    def register(self):
+        try:
+            with timed("validation"):
+                # les modeles d'etat peuvent etre envoyes en binaire (voir helpers/matrix_codec.py)
+                payload = request_payload()
+                kind = self.schema(ModelInput).load(payload)["model"]
+                data = self.schema(MODEL_SCHEMAS[kind]).load(payload)
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        names = ("num", "den") if kind == "tf" else ("A", "B", "C", "D")
+        try:
+            model = self.registry.register(kind, {name: data[name] for name in names})
+        except ValueError as err:
+            # modele valide par le schema mais que python-control ne construit pas (denominateur nul ...)
+            return {"error": str(err)}, 400
+        return model.describe(), 201, {"Location": f"/models/{model.id}"}
+
+    def describe(self, model_id: str):
+        model = self.registry.get(model_id)
+        if model is None:
+            return {"error": "Model not found."}, 404
+        return model.describe()
+
+    def remove(self, model_id: str):
+        if not self.registry.delete(model_id):
+            return {"error": "Model not found."}, 404
+        return "", 204
+
+
+model_router = ModelRouter()
@@ -1,157 +1,229 @@
-from flask import request
+from flask import make_response
+
 from base.base_router import BaseRouter
-from services.service import Service
-from validation.state_space_validation import StateSpacePlotInput, StateSpaceInput, StateSpacePlotInputWithAxis
-import control as ctrl
+from helpers.matrix_codec import encode_matrices, request_payload, response_matrix_format
+from helpers.metrics import timed
+from helpers.sparse_lti import SparseStateSpace, dense, is_large_sparse, unsupported_error
+from helpers.system_cache import system_cache
+from services.analysis_service import analysis_service
+from services.reduction_service import reduction_service
+from services.service import service
+from services.sweep_service import sweep_service
+from validation.analysis_validation import ANALYSIS_FORMATS
+from validation.state_space_validation import StateSpacePlotInput, StateSpaceInput, StateSpacePlotInputWithAxis, \
+    StateSpaceAnalysisInput, StateSpaceSweepInput, StateSpacePerformanceInput, StateSpaceBodeInput, \
+    StateSpaceConversionInput, StateSpaceBodePerformanceInput, StateSpaceReductionInput
 
 # Une description est faite dans /docs/routers.md
 
 class StateSpaceRouter(BaseRouter):
     def __init__(self):
         super().__init__("state_space",__name__)
-        self.service = Service()
+        # services partages entre les routeurs (une seule instance , chauffee au demarrage , voir helpers/warmup.py)
+        self.service = service
+        self.analysis = analysis_service
+        self.sweep_service = sweep_service
+        self.reduction = reduction_service
         self.register_routes()
 
     def register_routes(self):
-        self.post("/step","step",self.step)
-        self.post("/impulse", "impulse", self.impulse)
-        self.post("/ramp","ramp",self.ramp)
-        self.post("/bode", "bode", self.bode)
-        self.post("/bode/opt","opt bode",self.bode_opt)
-        self.post("/nyquist", "nyquist", self.nyquist)
-        self.post("/poles_zeros_map","poles_zeros",self.poles_zeros)
+        self.post_cached("/step","step",self.step)
+        self.post_cached("/impulse", "impulse", self.impulse)
+        self.post_cached("/ramp","ramp",self.ramp)
+        self.post_cached("/bode", "bode", self.bode)
+        self.post_cached("/bode/opt","opt bode",self.bode_opt)
+        self.post_cached("/nyquist", "nyquist", self.nyquist)
+        self.post_cached("/poles_zeros_map","poles_zeros",self.poles_zeros)
         self.post("/step/performance","step_performance",self.step_performance)
         self.post("/bode/performance","bode_performance",self.bode_performance)
         self.post("/close_loop","closed_loop",self.closed_loop)
         self.post("/ss_to_tf","convert ss form to tf form",self.convert_ss_to_tf)
+        self.post_cached("/analyze","analyze",self.analyze)
+        self.post_cached("/sweep","sweep",self.sweep)
+        self.post("/reduce","reduce",self.reduce)
 
     def step(self):
-        ss_step_input = StateSpacePlotInputWithAxis()
+        ss_step_input = self.schema(StateSpacePlotInputWithAxis)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error":str(err)},400
         A,B,C,D,t_max,x_axis,y_axis =self.extract_input(data)
-        system = ctrl.ss(A,B,C,D)
-        return self.service.step(system,t_max,x_axis, y_axis)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.step(system,t_max,x_axis, y_axis,engine=data.get("engine"),
+                                                     **self.render_options(data), **self.extract_options(data)),
+                                   reduction)
 
     def step_performance(self):
-        ss_input=StateSpaceInput()
+        ss_input=self.schema(StateSpacePerformanceInput)
         try:
-            data = ss_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D = data["A"],data["B"],data["C"],data["D"]
-        system = ctrl.ss(A,B,C,D)
-        return self.service.performance(system)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.performance(system, data.get("settling_band"), data.get("engine")),
+                                   reduction)
 
     def impulse(self):
-        ss_step_input = StateSpacePlotInputWithAxis()
+        ss_step_input = self.schema(StateSpacePlotInputWithAxis)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D, t_max,x_axis,y_axis = self.extract_input(data)
-        system = ctrl.ss(A,B,C,D)
-        return self.service.impulse(system, t_max,x_axis,y_axis)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.impulse(system, t_max,x_axis,y_axis,engine=data.get("engine"),
+                                                        **self.render_options(data), **self.extract_options(data)),
+                                   reduction)
 
     def ramp(self):
-        ss_step_input = StateSpacePlotInputWithAxis()
+        ss_step_input = self.schema(StateSpacePlotInputWithAxis)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D, t_max,x_axis,y_axis = self.extract_input(data)
-        system = ctrl.ss(A,B,C,D)
-        return self.service.ramp(system, t_max,x_axis,y_axis)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.ramp(system, t_max,x_axis,y_axis,engine=data.get("engine"),
+                                                     **self.render_options(data), **self.extract_options(data)),
+                                   reduction)
 
     def bode_opt(self):
-        ss_step_input = StateSpacePlotInput()
+        ss_step_input = self.schema(StateSpacePlotInput)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D,x_axis= data["A"],data["B"],data["C"],data["D"],data["x_axis"]
-        system = ctrl.ss(A,B,C,D)
-        return self.service.bode_png(system,x_axis,img_format="jpeg")
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.bode_png(system,x_axis,img_format="jpeg",**self.extract_options(data)),
+                                   reduction)
 
 
     def bode(self):
-        ss_step_input = StateSpacePlotInput()
+        ss_step_input = self.schema(StateSpaceBodeInput)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D,x_axis= data["A"],data["B"],data["C"],data["D"],data["x_axis"]
-        system = ctrl.ss(A,B,C,D)
-        return self.service.bode(system,x_axis)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.bode(system,x_axis,**self.render_options(data),
+                                                     **self.extract_options(data)), reduction)
 
     def bode_performance(self):
-        ss_input = StateSpaceInput()
+        ss_input = self.schema(StateSpaceBodePerformanceInput)
         try:
-            data = ss_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D = data["A"],data["B"],data["C"],data["D"]
-        system = ctrl.ss(A,B,C,D)
-        return self.service.bode_performance(system)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.bode_performance(system), reduction)
 
     def nyquist(self):
-        ss_step_input = StateSpacePlotInput()
+        ss_step_input = self.schema(StateSpacePlotInput)
         try:
-            data = ss_step_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_step_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D, _, x_axis, y_axis = self.extract_input(data)
-        system = ctrl.ss(A,B,C,D)
-        return self.service.nyquist(system, x_axis,y_axis)
+        system = system_cache.ss(A,B,C,D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        return self.with_reduction(self.service.nyquist(system, x_axis,y_axis,**self.extract_options(data)), reduction)
 
     def poles_zeros(self):
-        ss_input = StateSpaceInput()
+        ss_input = self.schema(StateSpaceInput)
         try:
-            data = ss_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D = data["A"],data["B"],data["C"],data["D"]
-        system = ctrl.ss(A,B,C,D)
-        return self.service.pole_zero(system)
+        system = system_cache.ss(A,B,C,D)
+        if self.is_sparse(system):
+            return {"error": str(unsupported_error())}, 400
+        return self.service.pole_zero(system,**self.extract_options(data))
 
     def closed_loop(self):
-        ss_input = StateSpaceInput()
+        ss_input = self.schema(StateSpaceConversionInput)
         try:
-            data = ss_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D = data["A"],data["B"],data["C"],data["D"]
-        system = ctrl.ss(A,B,C,D)
+        system = system_cache.ss(A,B,C,D)
+        if self.is_sparse(system):
+            return {"error": str(unsupported_error())}, 400
         tf_system = self.service.closed_loop(system)
-        response =  {
-            "A": tf_system.A.tolist(),
-            "B": tf_system.B.tolist(),
-            "C":tf_system.C.tolist(),
-            "D":tf_system.D.tolist()
-        }
-        return response
+        # matrices en json (listes) , base64 , binary , npz ou npy (voir helpers/matrix_codec.py)
+        matrices = {"A": tf_system.A, "B": tf_system.B, "C": tf_system.C, "D": tf_system.D}
+        return self.register_output(encode_matrices(matrices, response_matrix_format(data), data["dtype"]), data,
+                                    "ss", matrices)
 
     def convert_ss_to_tf(self):
-        ss_input = StateSpaceInput()
+        ss_input = self.schema(StateSpaceInput)
         try:
-            data = ss_input.load(request.get_json())
+            with timed("validation"):
+                data = ss_input.load(request_payload())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         A, B, C, D = data["A"], data["B"], data["C"], data["D"]
-        system = ctrl.ss(A, B, C, D)
+        system = system_cache.ss(A, B, C, D)
+        if self.is_sparse(system):
+            return {"error": str(unsupported_error())}, 400
         tf_system = self.service.convert_ss_to_tf(system)
 
         response = {
@@ -159,8 +231,96 @@ class StateSpaceRouter(BaseRouter):
             "den": tf_system.den[0][0].tolist(),
         }
 
+        return self.register_output(response, data, "tf", {"num": response["num"], "den": response["den"]})
+
+    # plusieurs analyses du meme modele en une seule requete (voir services/analysis_service.py)
+    def analyze(self):
+        ss_input = self.schema(StateSpaceAnalysisInput)
+        try:
+            with timed("validation"):
+                data = ss_input.load(request_payload())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        output_format = self.extract_options(data)["output_format"]
+        unsupported = self.unsupported_format(output_format, ANALYSIS_FORMATS)
+        if unsupported is not None:
+            return unsupported
+        A, B, C, D = data["A"], data["B"], data["C"], data["D"]
+        system = system_cache.ss(A, B, C, D)
+        try:
+            system, reduction = self.reduced_model(system, data)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        result = self.analysis.analyze(system, data, output_format)
+        if reduction is not None:
+            result["reduction"] = self.reduction_summary(reduction)
+        return self.with_reduction(result, reduction)
+
+    # famille de modeles : le modele de base avec des parametres qui varient (voir services/sweep_service.py)
+    def sweep(self):
+        ss_input = self.schema(StateSpaceSweepInput)
+        try:
+            with timed("validation"):
+                data = ss_input.load(request_payload())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        if is_large_sparse(data["A"]):
+            return {"error": str(unsupported_error())}, 400
+        A, B, C, D = (dense(data[name]) for name in "ABCD")
+        try:
+            return self.sweep_service.sweep_ss(A, B, C, D, data, self.extract_options(data)["output_format"])
+        except ValueError as err:
+            # parametre hors du modele , trop de candidats ...
+            return {"error": str(err)}, 400
+
+    # modele reduit (voir services/reduction_service.py) : matrices dans le format demande ,
+    # ordre , borne d'erreur et valeurs singulieres de Hankel dans le JSON et les entetes X-Reduced-Order ...
+    def reduce(self):
+        ss_input = self.schema(StateSpaceReductionInput)
+        try:
+            with timed("validation"):
+                data = ss_input.load(request_payload())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        A, B, C, D = data["A"], data["B"], data["C"], data["D"]
+        system = system_cache.ss(A, B, C, D)
+        try:
+            reduced, reduction = self.reduction.reduce(system, data["reduction"])
+        except ValueError as err:
+            return {"error": str(err)}, 400
+        matrices = {"A": reduced.A, "B": reduced.B, "C": reduced.C, "D": reduced.D}
+        response = encode_matrices(matrices, response_matrix_format(data), data["dtype"])
+        if isinstance(response, dict):
+            response.update(self.reduction_summary(reduction))
+        return self.with_reduction(self.register_output(response, data, "ss", matrices), reduction)
+
+    # modele a analyser : le modele recu , ou son modele reduit si l'option "reduction" est presente
+    def reduced_model(self, system, data):
+        if not data.get("reduction"):
+            return system, None
+        return self.reduction.reduce(system, data["reduction"])
+
+    def reduction_summary(self, reduction: dict) -> dict:
+        return {**reduction, "hankel_singular_values": reduction["hankel_singular_values"].tolist()}
+
+    # entetes de la reduction (gardes par le cache des reponses avec les autres entetes X-)
+    def with_reduction(self, response, reduction):
+        if reduction is None:
+            return response
+        response = make_response(response)
+        response.headers["X-Reduced-Order"] = str(reduction["order"])
+        response.headers["X-Original-Order"] = str(reduction["original_order"])
+        response.headers["X-Reduction-Error-Bound"] = repr(reduction["error_bound"])
         return response
 
+    # grand modele creux (voir helpers/sparse_lti.py) : pas de zeros ni de conversion , les analyses
+    # de /analyze qui en ont besoin sont dans "errors"
+    def is_sparse(self, system) -> bool:
+        return isinstance(system, SparseStateSpace)
+
     def extract_input(self,data:StateSpacePlotInput):
         return data["A"], data["B"], data["C"], data["D"], data["t_max"], data["x_axis"], data["y_axis"]
 
@@ -1,128 +1,151 @@
 from flask import request
-import control as ctrl
 from base.base_router import BaseRouter
-from services.service import Service
+from helpers.matrix_codec import encode_matrices, response_matrix_format
+from helpers.metrics import timed
+from helpers.system_cache import system_cache
+from services.analysis_service import analysis_service
+from services.service import service
+from services.sweep_service import sweep_service
+from validation.analysis_validation import ANALYSIS_FORMATS
 from validation.transfer_function_validation import TransferFunctionPlotInput, TransferFunctionInput, \
-    TransferFunctionPlotInputWithAxis
+    TransferFunctionPlotInputWithAxis, TransferFunctionAnalysisInput, TransferFunctionSweepInput, \
+    TransferFunctionPerformanceInput, TransferFunctionBodeInput, TransferFunctionConversionInput
 
 # Une description est faite dans /docs/routers.md
 
 class TransferFunctionRouter(BaseRouter):
     def __init__(self):
         super().__init__("transfer_function", __name__)
-        self.service = Service()
+        # services partages entre les routeurs (une seule instance , chauffee au demarrage , voir helpers/warmup.py)
+        self.service = service
+        self.analysis = analysis_service
+        self.sweep_service = sweep_service
         self.register_routes()
 
     def register_routes(self):
-        self.post("/step", "step", self.step)
-        self.post("/impulse", "impulse", self.impulse)
-        self.post("/ramp", "ramp", self.ramp)
-        self.post("/bode", "bode", self.bode)
-        self.post("/nyquist", "nyquist", self.nyquist)
-        self.post("/poles_zeros_map","poles_zeros",self.poles_zeros)
+        self.post_cached("/step", "step", self.step)
+        self.post_cached("/impulse", "impulse", self.impulse)
+        self.post_cached("/ramp", "ramp", self.ramp)
+        self.post_cached("/bode", "bode", self.bode)
+        self.post_cached("/nyquist", "nyquist", self.nyquist)
+        self.post_cached("/poles_zeros_map","poles_zeros",self.poles_zeros)
         self.post("/step/performance","step_performance",self.step_performance)
         self.post("/bode/performance","bode_performance",self.bode_performance)
         self.post("/close_loop","close_loop",self.close_loop)
         self.post("/tf_to_ss","convert tf form to ss form",self.convert_tf_to_ss)
+        self.post_cached("/analyze","analyze",self.analyze)
+        self.post_cached("/sweep","sweep",self.sweep)
 
     def step(self):
-        tf_input = TransferFunctionPlotInputWithAxis()
+        tf_input = self.schema(TransferFunctionPlotInputWithAxis)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num,den, t_max, x_axis, y_axis = self.extract_input(data)
-        system = ctrl.tf(num,den)
-        return self.service.step(system, t_max, x_axis, y_axis)
+        system = system_cache.tf(num,den)
+        return self.service.step(system, t_max, x_axis, y_axis, engine=data.get("engine"),
+                                 **self.render_options(data), **self.extract_options(data))
 
     def step_performance(self):
-        tf_input=TransferFunctionInput()
+        tf_input=self.schema(TransferFunctionPerformanceInput)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num,den = data["num"],data["den"]
-        system = ctrl.tf(num,den)
-        return self.service.performance(system)
+        system = system_cache.tf(num,den)
+        return self.service.performance(system, data.get("settling_band"), data.get("engine"))
 
 
     def impulse(self):
-        tf_input = TransferFunctionPlotInputWithAxis()
+        tf_input = self.schema(TransferFunctionPlotInputWithAxis)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den, t_max, x_axis, y_axis = self.extract_input(data)
-        system = ctrl.tf(num,den)
-        return self.service.impulse(system, t_max, x_axis, y_axis)
+        system = system_cache.tf(num,den)
+        return self.service.impulse(system, t_max, x_axis, y_axis, engine=data.get("engine"),
+                                    **self.render_options(data), **self.extract_options(data))
 
     def ramp(self):
-        tf_input = TransferFunctionPlotInputWithAxis()
+        tf_input = self.schema(TransferFunctionPlotInputWithAxis)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den, t_max, x_axis, y_axis = self.extract_input(data)
-        system = ctrl.tf(num,den)
-        return self.service.ramp(system, t_max, x_axis, y_axis)
+        system = system_cache.tf(num,den)
+        return self.service.ramp(system, t_max, x_axis, y_axis, engine=data.get("engine"),
+                                 **self.render_options(data), **self.extract_options(data))
 
     def bode(self):
-        tf_input = TransferFunctionPlotInput()
+        tf_input = self.schema(TransferFunctionBodeInput)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den, t_max,x_axis = data["num"],data["den"],data["t_max"],data["x_axis"]
-        system = ctrl.tf(num,den)
-        return self.service.bode(system,x_axis)
+        system = system_cache.tf(num,den)
+        return self.service.bode(system,x_axis,**self.render_options(data), **self.extract_options(data))
 
     def bode_performance(self):
-        tf_input = TransferFunctionInput()
+        tf_input = self.schema(TransferFunctionInput)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den = data["num"], data["den"]
-        system = ctrl.tf(num, den)
+        system = system_cache.tf(num, den)
         return self.service.bode_performance(system)
 
     def nyquist(self):
-        tf_input = TransferFunctionPlotInputWithAxis()
+        tf_input = self.schema(TransferFunctionPlotInputWithAxis)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den, _, x_axis, y_axis = self.extract_input(data)
-        system = ctrl.tf(num,den)
-        return self.service.nyquist(system, x_axis, y_axis)
+        system = system_cache.tf(num,den)
+        return self.service.nyquist(system, x_axis, y_axis, **self.extract_options(data))
 
     def poles_zeros(self):
-        tf_input = TransferFunctionInput()
+        tf_input = self.schema(TransferFunctionInput)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num,den = data["num"],data["den"]
-        system = ctrl.tf(num,den)
-        return self.service.pole_zero(system)
+        system = system_cache.tf(num,den)
+        return self.service.pole_zero(system,**self.extract_options(data))
 
     def close_loop(self):
-        tf_input = TransferFunctionInput()
+        tf_input = self.schema(TransferFunctionInput)
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den = data["num"], data["den"]
-        system = ctrl.tf(num, den)
+        system = system_cache.tf(num, den)
         ss_system = self.service.closed_loop(system)
 
         response = {
@@ -130,27 +153,58 @@ class TransferFunctionRouter(BaseRouter):
             "den":ss_system.den[0][0].tolist()
         }
         print(response)
-        return response
+        return self.register_output(response, data, "tf", {"num": response["num"], "den": response["den"]})
 
     def convert_tf_to_ss(self):
-        tf_input = TransferFunctionInput()
+        tf_input = self.schema(TransferFunctionConversionInput)
         # utilise try et except pour collecter les erreur et pouvoir travaille avec une solution
         try:
-            data = tf_input.load(request.get_json())
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
         except Exception as err:
             print(err)
             return {"error": str(err)}, 400
         num, den = data["num"], data["den"]
-        system = ctrl.tf(num, den)
+        system = system_cache.tf(num, den)
         ss_system = self.service.convert_tf_to_ss(system)
         print(ss_system)
-        response = {
-            "A":ss_system.A.tolist(),
-            "B":ss_system.B.tolist(),
-            "C":ss_system.C.tolist(),
-            "D":ss_system.D.tolist(),
-        }
-        return response
+        # matrices en json (listes) , base64 , binary , npz ou npy (voir helpers/matrix_codec.py)
+        matrices = {"A": ss_system.A, "B": ss_system.B, "C": ss_system.C, "D": ss_system.D}
+        return self.register_output(encode_matrices(matrices, response_matrix_format(data), data["dtype"]), data,
+                                    "ss", matrices)
+
+    # plusieurs analyses du meme modele en une seule requete (voir services/analysis_service.py)
+    def analyze(self):
+        tf_input = self.schema(TransferFunctionAnalysisInput)
+        try:
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        output_format = self.extract_options(data)["output_format"]
+        unsupported = self.unsupported_format(output_format, ANALYSIS_FORMATS)
+        if unsupported is not None:
+            return unsupported
+        num, den = data["num"], data["den"]
+        system = system_cache.tf(num, den)
+        return self.analysis.analyze(system, data, output_format)
+
+    # famille de modeles : le modele de base avec des parametres qui varient (voir services/sweep_service.py)
+    def sweep(self):
+        tf_input = self.schema(TransferFunctionSweepInput)
+        try:
+            with timed("validation"):
+                data = tf_input.load(request.get_json())
+        except Exception as err:
+            print(err)
+            return {"error": str(err)}, 400
+        num, den = data["num"], data["den"]
+        try:
+            return self.sweep_service.sweep_tf(num, den, data, self.extract_options(data)["output_format"])
+        except ValueError as err:
+            # parametre hors du modele , trop de candidats ...
+            return {"error": str(err)}, 400
 
     # extraire les donnee dans la requette (request)
     def extract_input(self, data: TransferFunctionPlotInput):
@@ -1,7 +1,19 @@
-from flask import Flask, Config
+from flask import Flask
+
+from config import settings
+from helpers.metrics import metrics
+from helpers.model_registry import model_registry
+from helpers.profiler import profiler
+from helpers.render_pool import RenderError
+from helpers.response_cache import response_cache
+from helpers.system_cache import system_cache
+from helpers.warmup import warm_up
 from flask_cors import CORS
 from routers.transfer_function_router import tf_router
 from routers.state_space_router import ss_router
+from routers.job_router import job_router
+from routers.model_router import model_router
+from routers.admin_router import admin_router
 
 # La classe Server , creer l'instance (l'objet) app , quel doit enregistrer tous les routeurs de projects
 # et ces routeurs doit recoit les requettes , executer la logique dans les services
@@ -13,16 +25,54 @@ from routers.state_space_router import ss_router
 class Server:
     def __init__(self):
         self.app = Flask(__name__)
-        self.app.config.from_object(Config)
+        self.app.config.from_object(settings)
 
-        CORS(self.app)  # This will allow all origins by default
+        # This will allow all origins by default , les entetes du cache sont exposes au frontend
+        CORS(self.app, expose_headers=["ETag", "X-Cache", "Server-Timing", "X-Profile-Id",
+                                           "X-Reduced-Order", "X-Original-Order", "X-Reduction-Error-Bound",
+                                           "X-Model-Id"])
         self.register_routes()
         self.app.add_url_rule("/","home",self.hello,methods=["GET"])
+        self.app.add_url_rule("/cache/stats","cache_stats",self.cache_stats,methods=["GET"])
+        self.app.register_error_handler(RenderError,self.render_error)
+        # duree des etapes de chaque requete (Server-Timing) et route /metrics (voir helpers/metrics.py)
+        if settings.METRICS_ENABLED:
+            metrics.init_app(self.app)
+        # profil a la demande des requetes et routes /admin/profiles (voir helpers/profiler.py)
+        if settings.PROFILE_ENABLED:
+            profiler.init_app(self.app)
 
     def hello(self):
         return "HELLO"
 
+    # statistiques des caches , utile pour ajuster les tailles (voir /docs/performance.md)
+    def cache_stats(self):
+        return {
+            "systems": system_cache.stats(),
+            "responses": response_cache.stats(),
+            "models": model_registry.stats(),
+        }
+
+    # pool de rendu occupe (503) ou rendu trop long (504) , voir helpers/render_pool.py
+    def render_error(self, err):
+        print(err)
+        headers = {"Retry-After": "1"} if err.status_code == 503 else {}
+        return {"error": str(err)}, err.status_code, headers
+
     def register_routes(self):
         self.app.register_blueprint(ss_router.router, url_prefix='/ss')
         self.app.register_blueprint(tf_router.router, url_prefix='/tf')
+        self.app.register_blueprint(job_router.router, url_prefix='/jobs')
+        self.app.register_blueprint(model_router.router, url_prefix='/models')
+        # les profils gardent le corps des requetes : pas de route /admin sans jeton
+        if settings.PROFILE_ENABLED and settings.PROFILE_TOKEN:
+            self.app.register_blueprint(admin_router.router, url_prefix='/admin')
+
 
+# fabrique de l'application : serveur de developpement (main.py) , gunicorn (gunicorn.conf.py) et asgi.py ,
+# l'application est chauffee avant de servir (voir helpers/warmup.py)
+def create_app() -> Flask:
+    app = Server().app
+    if settings.STARTUP_WARMUP:
+        warm_up(app)
+    return app
@@ -0,0 +1,165 @@
+from typing import Union
+
+import numpy as np
+from control import TransferFunction, StateSpace
+
+from base.base_service import BaseService
+from helpers.data_encoder import arrays_to_json
+from helpers.sanitize_data import sanitize_data
+from helpers.time_grid import settling_horizon
+from services.service import Service, NYQUIST_DECADES, service
+
+# Service de la route /analyze : un seul modele , plusieurs analyses dans la meme requete.
+# Les analyses demandees sont les noeuds finaux d'un graphe de dependances , les donnees intermediaires
+# (poles , reponse indicielle , reponse frequentielle ...) sont des noeuds calcules une seule fois
+# par requete , meme si plusieurs analyses en ont besoin :
+#
+#   step , step_performance        -> step_response -> time_grid -> poles
+#   impulse / ramp                 -> impulse_response / ramp_response -> time_grid
+#   nyquist , bode_performance     -> nyquist_frequency (grille large autour des poles et zeros)
+#   bode                           -> bode_frequency
+#   poles_zeros                    -> poles , zeros
+#
+# La reponse est une enveloppe JSON : {"model": "tf" | "ss", "results": {...}, "errors": {...}, "computed": [...]}
+# une analyse qui echoue (par exemple les performances d'un systeme instable) est dans "errors"
+# sans empecher les autres analyses.
+
+
+class AnalysisGraph:
+    def __init__(self):
+        self.nodes = {}  # nom -> (dependances , fonction de calcul)
+        self.values = {}
+        self.computed = []  # ordre de calcul des noeuds
+
+    def add(self, name: str, requires: tuple, compute):
+        self.nodes[name] = (requires, compute)
+
+    def resolve(self, name: str):
+        if name not in self.values:
+            requires, compute = self.nodes[name]
+            arguments = [self.resolve(dependency) for dependency in requires]
+            self.values[name] = compute(*arguments)
+            self.computed.append(name)
+        return self.values[name]
+
+
+class AnalysisService(BaseService):
+    def __init__(self, service: Service):
+        super().__init__()
+        self.service = service
+
+    def analyze(self, system: Union[TransferFunction, StateSpace], data: dict, output_format: str = "svg"):
+        analyses = list(dict.fromkeys(data["analyses"]))
+        graph = self.build_graph(system, data, analyses, output_format)
+
+        results = {}
+        errors = {}
+        for name in analyses:
+            try:
+                results[name] = graph.resolve(name)
+            except Exception as err:
+                print(err)
+                errors[name] = str(err)
+
+        return {
+            "model": self.service.get_system_type(system),
+            "results": sanitize_data(results),
+            "errors": errors,
+            "computed": [name for name in graph.computed if name not in analyses],
+        }
+
+    def build_graph(self, system: Union[TransferFunction, StateSpace], data: dict, analyses: list,
+                    output_format: str) -> AnalysisGraph:
+        service = self.service
+        entry = service.cache.entry(system)
+        graph = AnalysisGraph()
+        images = output_format == "svg"
+
+        # donnees intermediaires
+        graph.add("poles", (), entry.poles)
+        graph.add("zeros", (), entry.zeros)
+        graph.add("t_max", ("poles",), lambda poles: data.get("t_max") or settling_horizon(poles))
+        graph.add("time_grid", ("t_max",), lambda t_max: service.time_grid(t_max, system))
+        graph.add("step_grid", ("time_grid", "t_max", "poles"),
+                  lambda grid, t_max, poles: self.step_grid(system, grid, t_max, poles,
+                                                            "step_performance" in analyses))
+        engine = data.get("engine")
+        graph.add("step_response", ("step_grid",), lambda grid: service.simulate(system, grid, "step", engine))
+        graph.add("impulse_response", ("time_grid",), lambda grid: service.simulate(system, grid, "impulse", engine))
+        graph.add("ramp_response", ("time_grid",), lambda grid: service.simulate(system, grid, "ramp", engine))
+        graph.add("bode_frequency", (), lambda: service.frequency_grid(system, data["frequency_axis"]))
+        graph.add("nyquist_frequency", (), lambda: service.frequency_grid(system, decades=NYQUIST_DECADES))
+
+        # analyses demandees
+        graph.add("poles_zeros", ("poles", "zeros"), lambda poles, zeros: self.pole_zero_result(poles, zeros, images))
+        for kind, name in (("step", "Step"), ("impulse", "Impulse"), ("ramp", "Ramp")):
+            graph.add(kind, (f"{kind}_response", "time_grid", "t_max"),
+                      lambda simulation, grid, t_max, name=name: self.time_result(system, simulation, len(grid), t_max,
+                                                                                  name, data, images))
+        graph.add("bode", ("bode_frequency",), lambda frequency: self.bode_result(system, data, frequency, images))
+        graph.add("nyquist", ("nyquist_frequency",), lambda frequency: self.nyquist_result(system, frequency, images))
+        graph.add("step_performance", ("step_response",),
+                  lambda simulation: service.performance_data(system, simulation, data.get("settling_band")))
+        graph.add("bode_performance", ("nyquist_frequency",),
+                  lambda frequency: service.bode_performance(system, frequency))
+        graph.add("close_loop", (), lambda: self.model_result(entry.closed_loop()))
+        graph.add("convert", (), lambda: self.model_result(entry.as_ss() if entry.is_tf() else entry.as_tf()))
+        return graph
+
+    # la reponse indicielle du graphique (sur t_max) sert aussi aux performances (sur la duree de stabilisation) :
+    # la grille de t_max est prolongee jusqu'a la duree de stabilisation , une seule simulation pour les deux
+    def step_grid(self, system, grid, t_max: float, poles, performance: bool):
+        horizon = settling_horizon(poles)
+        if not performance or horizon <= t_max:
+            return grid
+        return grid.extend(self.service.time_grid(horizon - t_max, system))
+
+    # les `length` premiers points de la simulation sont ceux de la grille de t_max
+    def time_result(self, system, simulation, length: int, t_max: float, name: str, data: dict, images: bool):
+        time, response = simulation
+        arrays = {"time": time[:length], "response": response[..., :length]}
+        if not images:
+            return arrays_to_json(arrays)
+        x_axis = data.get("x_axis") or [0, t_max]
+        y_axis = data.get("y_axis") or self.data_limits(arrays["response"])
+        return self.svg_result(self.service.time_image(system, arrays, name, x_axis, y_axis, data.get("renderer"),
+                                                       data.get("simplify")))
+
+    def bode_result(self, system, data: dict, frequency, images: bool):
+        arrays = self.service.bode_data(system, data["frequency_axis"], frequency)
+        if not images:
+            return arrays_to_json(arrays)
+        return self.svg_result(self.service.bode_image(arrays, data.get("renderer"), data.get("simplify")))
+
+    def nyquist_result(self, system, frequency, images: bool):
+        arrays = self.service.nyquist_data(system, frequency)
+        if not images:
+            return arrays_to_json(arrays)
+        return self.svg_result(self.service.figures.nyquist_plot(arrays["real"], arrays["imag"]))
+
+    def pole_zero_result(self, poles, zeros, images: bool):
+        if not images:
+            return arrays_to_json({"poles": poles, "zeros": zeros})
+        return self.svg_result(self.service.figures.pole_zero_plot(poles, zeros))
+
+    # meme format que les routes /close_loop , /tf_to_ss et /ss_to_tf
+    def model_result(self, system: Union[TransferFunction, StateSpace]):
+        if isinstance(system, TransferFunction):
+            return {"num": system.num[0][0].tolist(), "den": system.den[0][0].tolist()}
+        return {"A": system.A.tolist(), "B": system.B.tolist(), "C": system.C.tolist(), "D": system.D.tolist()}
+
+    def svg_result(self, img_stream):
+        return {"mimetype": "image/svg+xml", "image": img_stream.getvalue().decode("utf-8")}
+
+    # limites de l'axe y quand le client ne les donne pas : toute la courbe avec 10% de marge
+    def data_limits(self, values) -> list:
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return [-1.0, 1.0]
+        low, high = float(values.min()), float(values.max())
+        margin = 0.1 * (high - low) if high > low else max(abs(high), 1.0) * 0.1
+        return [low - margin, high + margin]
+
+
+analysis_service = AnalysisService(service)
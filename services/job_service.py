@@ -0,0 +1,60 @@
+from flask import Response
+
+from base.base_service import BaseService
+from config import settings
+from helpers.job_pool import job_pool
+from helpers.job_store import job_store, QUEUED, DONE, FAILED, TIMEOUT, CANCELLED
+
+# Service de la route /jobs : les analyses longues (grand t_max , grand modele d'etat , grille dense ...)
+# sont executees par le pool de processus (voir helpers/job_pool.py) au lieu de bloquer un worker Flask.
+#   POST /jobs                 -> 202 {"id": ..., "status": "queued", ...}
+#   GET /jobs/<id>?wait=10     -> etat du job , attente longue jusqu'a la fin du job (au plus JOBS_MAX_WAIT)
+#   GET /jobs/<id>/result      -> la reponse de la route (svg , json , binary ...) quand le job est termine
+#   DELETE /jobs/<id>          -> annulation (le processus d'un job en cours est arrete)
+
+
+class JobService(BaseService):
+    def __init__(self):
+        super().__init__()
+        self.store = job_store
+        self.pool = job_pool
+
+    def submit(self, data: dict):
+        if self.store.count(QUEUED) >= settings.JOBS_MAX_QUEUED:
+            return {"error": "Too many queued jobs, retry later."}, 503
+        job = self.store.create(data["model"], data["analysis"], data["payload"],
+                                data.get("timeout") or settings.JOBS_DEFAULT_TIMEOUT)
+        self.pool.submit()
+        return self.job_data(job), 202, {"Location": f"/jobs/{job['id']}"}
+
+    def status(self, job_id: str, wait: float = 0.0):
+        wait = min(max(wait, 0.0), settings.JOBS_MAX_WAIT)
+        job = self.pool.wait(job_id, wait) if wait > 0 else self.store.get(job_id)
+        if job is None:
+            return {"error": "Job not found."}, 404
+        return self.job_data(job), 200
+
+    def result(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return {"error": "Job not found."}, 404
+        if job["status"] not in (DONE, FAILED, TIMEOUT, CANCELLED):
+            return {"error": "Job is not finished.", "status": job["status"]}, 409
+        status_code, mimetype, body = self.store.result(job_id)
+        if body is None:
+            # pas de reponse de la route : timeout , annulation ou processus arrete
+            status_code = status_code or (410 if job["status"] == CANCELLED else 500)
+            return {"error": job["error"], "status": job["status"]}, status_code
+        return Response(body, status=status_code, mimetype=mimetype)
+
+    def cancel(self, job_id: str):
+        job = self.store.cancel(job_id)
+        if job is None:
+            return {"error": "Job not found."}, 404
+        return self.job_data(job), 200
+
+    def job_data(self, job: dict) -> dict:
+        data = dict(job)
+        if job["status"] in (DONE, FAILED, TIMEOUT, CANCELLED):
+            data["result"] = f"/jobs/{job['id']}/result"
+        return data
@@ -0,0 +1,40 @@
+from typing import Union
+
+from control import StateSpace
+
+from base.base_service import BaseService
+from helpers.metrics import timed
+from helpers.model_reduction import balanced_realization, reduce_realization
+from helpers.sparse_lti import SparseStateSpace, unsupported_error
+from helpers.system_cache import system_cache
+
+# Reduction d'ordre des modeles d'etat (voir helpers/model_reduction.py) , utilisee par la route /ss/reduce
+# et par les analyses de ss_router qui recoivent l'option "reduction" (voir validation/options_validation.py).
+# Tout est garde dans le cache des systemes :
+# - la realisation equilibree (gramiens , valeurs singulieres de Hankel) est une donnee derivee du modele recu ,
+#   calculee une seule fois quel que soit l'ordre demande
+# - chaque reduction (methode , ordre ou tolerance) est une donnee derivee du modele recu
+# - le modele reduit est une entree du cache comme un modele envoye directement , ses poles , reponses ...
+#   sont partages par les requetes suivantes
+
+
+class ReductionService(BaseService):
+    def __init__(self):
+        super().__init__()
+        self.cache = system_cache
+
+    # (modele reduit , description de la reduction) , ValueError si la reduction est impossible
+    @timed("reduction")
+    def reduce(self, system: Union[StateSpace, SparseStateSpace], options: dict):
+        entry = self.cache.entry(system)
+        if entry.is_sparse():
+            raise unsupported_error()
+        method, order, tolerance = options["method"], options.get("order"), options.get("tolerance")
+        realization = entry.get("balanced_realization",
+                                lambda: balanced_realization(system.A, system.B, system.C, system.D))
+        matrices, info = entry.get(f"reduction:{method}:{order}:{tolerance}",
+                                   lambda: reduce_realization(realization, order, tolerance, method))
+        return self.cache.ss(*matrices), info
+
+
+reduction_service = ReductionService()
@@ -1,201 +1,227 @@
 import io
+import math
 from typing import Union
-import matplotlib
-import matplotlib.pyplot as plt
 import control as ctrl
 import numpy as np
-from PIL import Image
 from control import TransferFunction, StateSpace
 from flask import send_file, jsonify
 
 from base.base_service import BaseService
+from config import settings
+from helpers.data_encoder import arrays_to_json, encode_arrays, encode_ndjson
+from helpers.frequency_grid import frequency_grid, refine_crossovers, stability_margins
+from helpers.frequency_response import polynomial_response, schur_form, state_space_response
+from helpers.metrics import timed
 from helpers.plotter import Plotter
+from helpers.render_pool import renderer
 from helpers.sanitize_data import sanitize_data
-
-# utilise pour utiliser matplotlib seulement pour la generation des images svg
-matplotlib.use("SVG")
+from helpers.simulator import discretize, modal_form, simulate_exact, simulate_modal, stream_exact
+from helpers.sparse_lti import simulate_sparse, stream_sparse
+from helpers.step_metrics import step_metrics
+from helpers.svg_writer import svg_writer
+from helpers.system_cache import system_cache
+from helpers.time_grid import TimeGrid, adaptive_segments, adaptive_time_grid, fixed_time_grid, settling_horizon
 
 # Une description de Classe Service est faite dans /docs/service.md
 
+# marge (en decades) autour des poles et zeros pour le diagramme de nyquist et le calcul des marges
+NYQUIST_DECADES = 3
+
 class Service(BaseService):
     def __init__(self):
         super().__init__()
         self.plotter = Plotter()
+        # les graphiques sont generes avec des figures reutilisables (voir helpers/figure_engine.py) ,
+        # dans un pool de processus si RENDER_POOL (voir helpers/render_pool.py)
+        self.figures = renderer()
+        # svg ecrit directement , sans matplotlib (option "renderer": "native" , voir helpers/svg_writer.py)
+        self.svg = svg_writer
+        # les donnees derivees des systemes (poles , gain statique , conversions ...) sont partagees
+        # entre les requetes grace au cache des systemes (voir helpers/system_cache.py)
+        self.cache = system_cache
 
     # pour generer une map contient la position des poles et des zeros
-    def pole_zero(self, system: Union[TransferFunction, StateSpace]):
-        plt.figure()
-        ctrl.pzmap(system, plot=True, title="Pole-Zero Map")
-        plt.grid(True)
+    def pole_zero(self, system: Union[TransferFunction, StateSpace], output_format="svg", dtype="float64"):
+        data = self.pole_zero_data(system)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
 
         # pour sauvegarder l'image dans un stream , puis dans la reponse de cette fonction (handler)
-        img_stream = io.BytesIO()
-        plt.savefig(img_stream, format='svg')
-        img_stream.seek(0)
+        with timed("render"):
+            img_stream = self.figures.pole_zero_plot(data["poles"], data["zeros"])
 
         # pour retourner la reponse en format d'image svg
-        response = send_file(img_stream, mimetype="image/svg+xml")
+        response = self.send_image(img_stream, "image/svg+xml")
         return response
 
+    def pole_zero_data(self, system: Union[TransferFunction, StateSpace]):
+        entry = self.cache.entry(system)
+        return {"poles": entry.poles(), "zeros": entry.zeros()}
+
     # pour generer la reponse indicielle
     def step(self,
              system: Union[TransferFunction, StateSpace],
              t_max: float,
              x_axis,
-             y_axis
+             y_axis,
+             output_format="svg",
+             dtype="float64",
+             engine=None,
+             renderer=None,
+             simplify=None
              ):
-        time = self.generate_time(t_max)
+        if output_format == "ndjson":
+            return self.stream(system, t_max, "step")
+        data = self.step_data(system, t_max, engine)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
 
-        _, response = ctrl.step_response(system, T=time)
+        img_stream = self.time_image(system, data, "Step", x_axis, y_axis, renderer, simplify)
 
-        system_type = "Transfer Function" if self.get_system_type(system) == "tf" else "State Space"
+        return self.send_image(img_stream, "image/svg+xml")
 
-        img_stream = self.plotter.plot(
-            time, response,
-            title=f"{system_type} Step Response",
+    # graphique temporel (svg) d'une reponse , name : "Step" , "Impulse" ou "Ramp"
+    # renderer : "matplotlib" ou "native" (svg ecrit directement) , settings.SVG_RENDERER si absent
+    @timed("render")
+    def time_image(self, system: Union[TransferFunction, StateSpace], data: dict, name: str, x_axis, y_axis,
+                   renderer: str = None, simplify: str = None):
+        system_type = "Transfer Function" if self.get_system_type(system) == "tf" else "State Space"
+        title = f"{system_type} {name} Response"
+        if (renderer or settings.SVG_RENDERER) == "native":
+            return self.svg.time_plot(data["time"], data["response"], title=title, legend="Response",
+                                      xlim=x_axis, ylim=y_axis, simplify=simplify)
+
+        return self.plotter.plot(
+            data["time"], data["response"],
+            title=title,
             grid=True,
             legend="Response",
             xlim=x_axis,
             ylim=y_axis
         )
 
-        return send_file(img_stream, mimetype="image/svg+xml")
+    def step_data(self, system: Union[TransferFunction, StateSpace], t_max: float, engine: str = None):
+        time, response = self.simulate(system, self.time_grid(t_max, system), "step", engine)
+
+        return {"time": time, "response": response}
 
     # pour generer la reponse impulsionnel
     def impulse(self,
                 system: Union[TransferFunction, StateSpace],
                 t_max: float,
                 x_axis,
-                y_axis
+                y_axis,
+                output_format="svg",
+                dtype="float64",
+                engine=None,
+                renderer=None,
+                simplify=None
                 ):
-        time = self.generate_time(t_max)
+        if output_format == "ndjson":
+            return self.stream(system, t_max, "impulse")
+        data = self.impulse_data(system, t_max, engine)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
 
-        _, response = ctrl.impulse_response(system, T=time)
+        img_stream = self.time_image(system, data, "Impulse", x_axis, y_axis, renderer, simplify)
 
-        system_type = "Transfer Function" if self.get_system_type(system) == "tf" else "State Space"
+        return self.send_image(img_stream, "image/svg+xml")
 
-        img_stream = self.plotter.plot(
-            time, response,
-            title=f"{system_type} Impulse Response",
-            grid=True,
-            legend="Response",
-            xlim=x_axis,
-            ylim=y_axis
-        )
+    def impulse_data(self, system: Union[TransferFunction, StateSpace], t_max: float, engine: str = None):
+        time, response = self.simulate(system, self.time_grid(t_max, system), "impulse", engine)
 
-        return send_file(img_stream, mimetype="image/svg+xml")
+        return {"time": time, "response": response}
 
     # pour generer la reponse a une entree rampe
     def ramp(self,
              system: Union[TransferFunction, StateSpace],
              t_max: float,
              x_axis,
-             y_axis
+             y_axis,
+             output_format="svg",
+             dtype="float64",
+             engine=None,
+             renderer=None,
+             simplify=None
              ):
-        time = self.generate_time(t_max)
-        ramp_input = time
-        _, response = ctrl.forced_response(system, T=time, U=ramp_input)
+        if output_format == "ndjson":
+            return self.stream(system, t_max, "ramp")
+        data = self.ramp_data(system, t_max, engine)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
 
-        system_type = "Transfer Function" if self.get_system_type(system) == "tf" else "State Space"
+        img_stream = self.time_image(system, data, "Ramp", x_axis, y_axis, renderer, simplify)
 
-        img_stream = self.plotter.plot(
-            time, response,
-            title=f"{system_type} Ramp Response",
-            grid=True,
-            legend="Response",
-            xlim=x_axis,
-            ylim=y_axis
-        )
+        return self.send_image(img_stream, "image/svg+xml")
 
-        return send_file(img_stream, mimetype="image/svg+xml")
+    def ramp_data(self, system: Union[TransferFunction, StateSpace], t_max: float, engine: str = None):
+        # l'entree rampe u(t) = t est construite segment par segment dans simulate
+        time, response = self.simulate(system, self.time_grid(t_max, system), "ramp", engine)
 
-    # cette fonction pour avoir diagramme de bode en format svg (non utilise svg est mieux pour les sites web)
-    def bode_png(self,system: Union[TransferFunction, StateSpace], x_axis=None, img_format='svg', compress=True):
-        if x_axis is None:
-            x_axis = [-1, 2]
+        return {"time": time, "response": response}
 
-        omega = np.logspace(x_axis[0], x_axis[1], 1000)
-        mag, phase, omega = ctrl.bode(system, omega, plot=False)
-
-        fig, ax = plt.subplots(2, 1, figsize=(8, 6))
-
-        # diagramme d'amplitude
-        ax[0].semilogx(omega, 20 * np.log10(mag))
-        ax[0].set_title('Bode Plot')
-        ax[0].set_ylabel('Magnitude (dB)')
-        ax[0].grid(True, which='both', axis='both')
-        ax[0].minorticks_on()
-        ax[0].set_xscale('log')
-        ax[0].set_yscale('linear')
-
-        # diagramme de phase
-        ax[1].semilogx(omega, np.degrees(phase))
-        ax[1].set_xlabel('Frequency (rad/s)')
-        ax[1].set_ylabel('Phase (degrees)')
-        ax[1].grid(True, which='both', axis='both')
-        ax[1].minorticks_on()
-        ax[1].set_xscale('log')
-        ax[1].set_yscale('linear')
-
-        plt.tight_layout()
-
-        img = io.BytesIO()
-        fig.savefig(img, format=img_format)
-        img.seek(0)
-
-        if compress and img_format in ['png', 'jpeg', 'jpg']:
-            img_compressed = io.BytesIO()
-            pil_img = Image.open(img)
-            pil_img.save(img_compressed, format=img_format, optimize=True,
-                         quality=85)
-            img_compressed.seek(0)
-            img = img_compressed
+    # cette fonction pour avoir diagramme de bode en format svg (non utilise svg est mieux pour les sites web)
+    def bode_png(self,system: Union[TransferFunction, StateSpace], x_axis=None, img_format='svg', compress=True,
+                 output_format="svg", dtype="float64"):
+        data = self.bode_data(system, x_axis)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
+
+        with timed("render"):
+            img = self.figures.bode_plot(data["omega"], data["magnitude_db"], data["phase_deg"],
+                                         img_format=img_format, tight=True)
+
+            if compress and img_format in ['png', 'jpeg', 'jpg']:
+                from PIL import Image  # import fait seulement par cette route (voir docs/performance.md)
+                img_compressed = io.BytesIO()
+                pil_img = Image.open(img)
+                pil_img.save(img_compressed, format=img_format, optimize=True,
+                             quality=85)
+                img_compressed.seek(0)
+                img = img_compressed
 
         mime_type = f'image/{img_format}'
-        response = send_file(img, mimetype=mime_type)
+        response = self.send_image(img, mime_type)
 
         return response
 
     # pour generer diagramme de bode
-    def bode(self, system: Union[TransferFunction, StateSpace], x_axis=None):
-        if x_axis is None:
-            x_axis = [-1, 2]
-        omega = np.logspace(x_axis[0], x_axis[1], 1000)
-        mag, phase, omega = ctrl.bode(system, omega, plot=False)
-        fig, ax = plt.subplots(2, 1, figsize=(8, 6))
-
-        # diagramme d'amplitude
-        ax[0].semilogx(omega, 20 * np.log10(mag))
-        ax[0].set_title('Bode Plot')
-        ax[0].set_ylabel('Magnitude (dB)')
-        ax[0].grid(True, which='both', axis='both')
-        ax[0].minorticks_on()
-        ax[0].set_xscale('log')  # pour avoir un plan logarithmic
-        ax[0].set_yscale('linear')
-
-        # diagramme de phase
-        ax[1].semilogx(omega, np.degrees(phase))
-        ax[1].set_xlabel('Frequency (rad/s)')
-        ax[1].set_ylabel('Phase (degrees)')
-        ax[1].grid(True, which='both', axis='both')
-        ax[1].minorticks_on()
-        ax[1].set_xscale('log')  # pour avoir un plan logarithmic
-        ax[1].set_yscale('linear')
-
-        img = io.BytesIO()
-        fig.savefig(img, format='svg')
-        img.seek(0)
-
-        response = send_file(
-            img,
-            mimetype='image/svg+xml',
-        )
+    def bode(self, system: Union[TransferFunction, StateSpace], x_axis=None, output_format="svg", dtype="float64",
+             renderer=None, simplify=None):
+        data = self.bode_data(system, x_axis)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
+
+        img = self.bode_image(data, renderer, simplify)
+
+        response = self.send_image(img, 'image/svg+xml')
 
         return response
 
+    # diagramme d'amplitude (dB) et diagramme de phase (degres) , renderer : comme time_image
+    @timed("render")
+    def bode_image(self, data: dict, renderer: str = None, simplify: str = None):
+        if (renderer or settings.SVG_RENDERER) == "native":
+            return self.svg.bode_plot(data["omega"], data["magnitude_db"], data["phase_deg"], simplify=simplify)
+        return self.figures.bode_plot(data["omega"], data["magnitude_db"], data["phase_deg"])
+
+    # reponse http d'une image (stream ou BytesIO)
+    @timed("send")
+    def send_image(self, img, mimetype: str):
+        return send_file(img, mimetype=mimetype)
+
+    # omega (rad/s) , amplitude (dB) et phase (degres) du diagramme de bode
+    # frequency : (omega , H(jw)) deja calcule avec frequency_grid (utilise par /analyze)
+    def bode_data(self, system: Union[TransferFunction, StateSpace], x_axis=None, frequency=None):
+        if x_axis is None:
+            x_axis = [-1, 2]
+        omega, response = self.frequency_grid(system, x_axis) if frequency is None else frequency
+        mag, phase = self.magnitude_phase(response)
+        return {"omega": omega, "magnitude_db": 20 * np.log10(mag), "phase_deg": np.degrees(phase)}
+
     # pour calculer les caracteristique d'etude frequentielle (marge de phase , marge de gain , marge de stability ...)
-    def bode_performance(self,system:Union[TransferFunction|StateSpace]):
-        gm,pm,sm,wpc,wgc,wms = ctrl.stability_margins(system)
+    def bode_performance(self,system:Union[TransferFunction|StateSpace],frequency=None):
+        gm,pm,sm,wpc,wgc,wms = self.stability_margins(system, frequency)
         print(gm,pm,sm,wpc,wgc,wms)
         response = [
             {"key":"Gain Margin","value":sanitize_data(gm)}, # Marge de gain
@@ -213,95 +239,93 @@ class Service(BaseService):
                 system: Union[TransferFunction, StateSpace],
                 x_axis,
                 y_axis,
+                output_format="svg",
+                dtype="float64"
                 ):
+        data = self.nyquist_data(system)
+        if output_format != "svg":
+            return encode_arrays(data, output_format, dtype)
 
-        omega = np.logspace(-100, 100, 10000)
+        with timed("render"):
+            img_stream = self.figures.nyquist_plot(data["real"], data["imag"])
 
-        plt.figure(figsize=(8, 6))
+        response = self.send_image(img_stream, 'image/svg+xml')
 
-        ctrl.nyquist(system,omega)
+        return response
 
-        img_stream = io.BytesIO()
-        plt.savefig(img_stream, format='svg')
-        plt.close()
-        img_stream.seek(0)
+    # omega (rad/s) , partie reelle et partie imaginaire de H(jw)
+    def nyquist_data(self, system: Union[TransferFunction, StateSpace], frequency=None):
+        omega, response = self.frequency_grid(system, decades=NYQUIST_DECADES) if frequency is None else frequency
+        # les points non finis (pole sur l'axe imaginaire) ne sont pas traces
+        finite = np.isfinite(response)
 
-        response = send_file(
-            img_stream,
-            mimetype='image/svg+xml',
-            # as_attachment=True,
-        )
-
-        return response
+        return {"omega": omega[finite], "real": response[finite].real, "imag": response[finite].imag}
 
     # calcule de caracteristique de performance en reponse indicielle
-    def performance(self, system: Union[TransferFunction, StateSpace]):
-        time, response = ctrl.step_response(system)
-        # static_gain = self.calculate_static_gain(system)
+    def performance(self, system: Union[TransferFunction, StateSpace], settling_band: float = None, engine: str = None):
+        return jsonify(self.performance_data(system, settling_band=settling_band, engine=engine)), 200
+
+    # step : (temps , reponse indicielle) deja calcule (utilise par /analyze) , sinon la simulation est faite
+    # sur la duree de stabilisation du systeme
+    def performance_data(self, system: Union[TransferFunction, StateSpace], step=None, settling_band: float = None,
+                         engine: str = None):
+        if step is None:
+            t_end = settling_horizon(self.cache.entry(system).poles())
+            step = self.simulate(system, self.time_grid(t_end, system), "step", engine)
+        time, response = step
         final_value = self.calculate_final_value(system)
-        overshoot = self.calculate_overshoot(response, final_value)
-        peak_time, peak_amplitude = self.calculate_peak(time, response)
-        rise_time = self.calculate_rise_time(time, response, final_value)
-        # settling_time = self.calculate_settling_time(time,response,final_value)
-        settling_time = self.settling(time, response, final_value)
-        # steady_error = self.calculate_steady_error(final_value)
+        # une ligne par canal (sortie , entree) , voir helpers/step_metrics.py
+        metrics = step_metrics(time, np.reshape(response, (-1, len(time))), np.ravel(final_value), settling_band)
+        values = {name: float(value[0]) if len(value) == 1 else value.tolist() for name, value in metrics.items()}
         response = [
-            # "static_gain":static_gain.tolist()[0][0],
-            {"key":"Final Value","value": float(final_value)},
-            {"key":"Overshoot","value": float(overshoot)},
-            {"key":"Peak Time","value": float(peak_time)},
-            {"key":"Peak Amplitude","value": float(peak_amplitude)},
-            {"key":"Rise Time","value": float(rise_time)},
-            {"key":"Settling Time","value": float(settling_time)},
-            # "steady_error":self.steady_error(final_value)
+            {"key":"Final Value","value": values["final_value"]},
+            {"key":"Overshoot","value": values["overshoot"]},
+            {"key":"Undershoot","value": values["undershoot"]},
+            {"key":"Peak Time","value": values["peak_time"]},
+            {"key":"Peak Amplitude","value": values["peak_amplitude"]},
+            {"key":"Rise Time","value": values["rise_time"]},
+            {"key":"Settling Time","value": values["settling_time"]},
+            {"key":"Steady-State Error","value": values["steady_state_error"]},
         ]
         print(response)
-        return jsonify(response), 200
+        # NaN : grandeur non definie (gain statique nul , reponse non stabilisee ...)
+        return sanitize_data(response)
 
     # calcule de boucle fermee
     def closed_loop(self,system:Union[TransferFunction,StateSpace]):
-        sys = ctrl.feedback(system,1)
+        sys = self.cache.entry(system).closed_loop()
         print(sys)
         return sys
 
     def convert_tf_to_ss(self,system:TransferFunction):
-        return ctrl.tf2ss(system)
+        return self.cache.entry(system).as_ss()
 
     def convert_ss_to_tf(self,system:StateSpace):
-        return ctrl.ss2tf(system)
+        return self.cache.entry(system).as_tf()
 
     def steady_error(self, final_value):
         return 1 / (final_value + 1)
 
-    # calcul de temps de stabilisation entre + et - 2% de valeur finale
-    def settling(self, time, response, final_value: float):
-        tolerance = 0.05 * final_value  # 5% tolerance
-        settling_time = None
-
-        for t, y in zip(time, response):
-            if np.abs(y - final_value) > tolerance:
-                settling_time = t
-        return settling_time
+    # calcul de temps de stabilisation entre + et - 5% de valeur finale
+    def settling(self, time, response, final_value: float, settling_band: float = None):
+        return step_metrics(time, response, final_value, settling_band)["settling_time"]
 
     # calcule de depassement
     def calculate_overshoot(self, response, final_value: float):
-        peak_value = np.max(response)
-        overshoot = (peak_value - final_value) / final_value * 100
-        return overshoot
+        return step_metrics(np.arange(len(response)), response, final_value)["overshoot"]
 
     # calcule de pic et return temps de pic , valeur d'amplitude max
     def calculate_peak(self, time, response):
-        return time[np.argmax(response)], np.max(response)
+        metrics = step_metrics(time, response)
+        return metrics["peak_time"], metrics["peak_amplitude"]
 
     # calcule de temps de reponse
     def calculate_rise_time(self, time, response, final_value):
-        rise_time_start = np.where(response >= 0.1 * final_value)[0][0]
-        rise_time_end = np.where(response >= 0.9 * final_value)[0][0]
-        return time[rise_time_end] - time[rise_time_start]
+        return step_metrics(time, response, final_value)["rise_time"]
 
-    # calcule de temps de stabilisation entre + et - 2% de valeur finale (methode non utilise)
+    # calcule de temps de stabilisation entre + et - 2% de valeur finale
     def calculate_settling_time(self, time, response, final_value):
-        return time[np.where(np.abs(response - final_value) <= 0.02 * final_value)[0][0]]
+        return self.settling(time, response, final_value, 0.02)
 
     # calcule d'erreur
     def calculate_steady_error(self, final_value, static_gain):
@@ -317,7 +341,7 @@ class Service(BaseService):
 
     # calcule de valeur final de system
     def calculate_final_value(self, system: Union[TransferFunction | StateSpace]):
-        return ctrl.dcgain(system)
+        return self.cache.entry(system).dcgain()
 
     # dans les methode de ce service , les methodes recoit system comme argument ,
     # ce system est de type Union[TransferFunction,StateSpace] , donc il peut etre un model espace d'etat ,
@@ -329,6 +353,158 @@ class Service(BaseService):
         else:
             return "ss"
 
-    # calcule de vecteur du temps
-    def generate_time(self, t_end: float):
-        return np.arange(0, t_end, 0.01)
\ No newline at end of file
+    # reponse frequentielle complexe H(jw) du premier canal (entree 0 , sortie 0)
+    # H(jw) sur la grille omega (premier canal pour un modele MIMO) , avec helpers/frequency_response.py
+    # (FREQUENCY_RESPONSE_ENGINE = "native") ou python-control (FREQUENCY_RESPONSE_ENGINE = "control")
+    # (modele creux : Krylov decale , quel que soit le moteur , voir helpers/sparse_lti.py)
+    def frequency_response(self, system: Union[TransferFunction, StateSpace], omega: np.ndarray) -> np.ndarray:
+        entry = self.cache.entry(system)
+        if entry.is_sparse():
+            return entry.sparse_frequency_response()(omega)[0, 0]
+        if settings.FREQUENCY_RESPONSE_ENGINE == "native":
+            if entry.is_tf() and system.ninputs == 1 and system.noutputs == 1:
+                return polynomial_response(system.num[0][0], system.den[0][0], 1j * np.atleast_1d(omega))
+            if not entry.is_tf():
+                A, B, C, D = (np.asarray(matrix, dtype=float) for matrix in (system.A, system.B, system.C, system.D))
+                modes = entry.get("modal_form", lambda: modal_form(A, B, C))
+                schur = None if modes is not None else entry.get("schur_form", lambda: schur_form(A, B, C))
+                return state_space_response(A, B, C, D, omega, modes, schur)[0, 0]
+        response = ctrl.frequency_response(system, omega)
+        return response.fresp[0, 0]
+
+    # amplitude et phase (radians) , la phase est deroulee et commence entre 0 et -360 degres
+    # comme dans ctrl.bode
+    def frequency_data(self, system: Union[TransferFunction, StateSpace], omega: np.ndarray):
+        return self.magnitude_phase(self.frequency_response(system, omega))
+
+    def magnitude_phase(self, response: np.ndarray):
+        phase = np.angle(response)
+        if abs(phase[0] + math.pi) > math.pi:
+            phase -= 2 * math.pi * round((phase[0] + math.pi) / (2 * math.pi))
+        return np.abs(response), np.unwrap(phase)
+
+    # frequences adaptees aux poles et zeros (voir helpers/frequency_grid.py) et H(jw) sur ces frequences ,
+    # x_axis = [a , b] limite la grille a [10^a , 10^b] , sinon `decades` decades autour des poles et zeros
+    @timed("frequency")
+    def frequency_grid(self, system: Union[TransferFunction, StateSpace], x_axis=None, decades: float = 2.0):
+        entry = self.cache.entry(system)
+        # modele creux : grille sur les poles dominants seulement (zeros non calcules)
+        zeros = np.empty(0, dtype=complex) if entry.is_sparse() else entry.zeros()
+        omega = frequency_grid(entry.poles(), zeros, x_axis, decades)
+        response = self.frequency_response(system, omega)
+        return refine_crossovers(omega, response, lambda w: self.frequency_response(system, w))
+
+    # marges de stabilite calculees sur la grille des frequences , gardees dans le cache du systeme
+    # frequency : (omega , H(jw)) deja calcule sur la grille de nyquist
+    @timed("margins")
+    def stability_margins(self, system: Union[TransferFunction, StateSpace], frequency=None):
+        if not system.issiso():
+            # ctrl.stability_margins refuse les systemes MIMO avec le meme message
+            return ctrl.stability_margins(system)
+
+        def compute():
+            omega, response = self.frequency_grid(system, decades=NYQUIST_DECADES) if frequency is None else frequency
+            return stability_margins(omega, response, lambda w: self.frequency_response(system, w))
+
+        return self.cache.entry(system).get("stability_margins", compute)
+
+    # calcule de vecteur du temps , adapte a la dynamique du systeme si il est donne
+    def generate_time(self, t_end: float, system: Union[TransferFunction, StateSpace] = None):
+        return self.time_grid(t_end, system).time
+
+    def time_grid(self, t_end: float, system: Union[TransferFunction, StateSpace] = None) -> TimeGrid:
+        if system is None:
+            return fixed_time_grid(t_end)
+        return adaptive_time_grid(self.cache.entry(system).poles(), t_end)
+
+    # simulation sur la grille du temps , kind : "step" (echelon unitaire) , "impulse" (impulsion de Dirac)
+    # ou "ramp" (u(t) = t) , engine : "exact" , "modal" ou "control" (voir helpers/simulator.py) ,
+    # settings.SIMULATION_ENGINE si absent
+    # retourne (temps , reponse) avec la meme forme que ctrl.step_response (sorties x entrees x temps
+    # pour un systeme MIMO , un vecteur pour un systeme SISO)
+    @timed("simulation")
+    def simulate(self, system: Union[TransferFunction, StateSpace], grid: TimeGrid, kind: str, engine: str = None):
+        engine = engine or settings.SIMULATION_ENGINE
+        entry = self.cache.entry(system)
+        if entry.is_sparse():
+            # modele creux : schema des trapezes avec LU creuse , quel que soit le moteur (voir helpers/sparse_lti.py)
+            responses = simulate_sparse(system, grid, kind)
+            return grid.time, responses[0, 0] if system.issiso() else responses
+        ss = entry.as_ss()
+        A, B, C, D = (np.asarray(matrix, dtype=float) for matrix in (ss.A, ss.B, ss.C, ss.D))
+        responses = None
+        # chaque moteur se replie sur le suivant s'il ne peut pas traiter le modele : modal -> exact -> control
+        if engine == "modal":
+            modes = entry.get("modal_form", lambda: modal_form(A, B, C))
+            responses = simulate_modal(A, B, C, D, grid, kind, modes)
+        if responses is None and engine in ("modal", "exact"):
+            # une discretisation par pas de la grille , gardee dans le cache des systemes
+            def discretization(step: float):
+                return entry.get(f"discretization:{float(step)!r}", lambda: discretize(A, B, step))
+            responses = simulate_exact(A, B, C, D, grid, kind, discretization)
+        if responses is None:
+            responses = self.simulate_control(ss, grid, kind)
+        if ss.noutputs == 1 and ss.ninputs == 1:
+            responses = responses[0, 0]
+        return grid.time, responses
+
+    # reponse temporelle en flux (format "ndjson") : une premiere ligne decrit la reponse , puis une ligne
+    # {"time": [...], "response": [...]} par morceau de STREAM_CHUNK_POINTS instants. La simulation est faite
+    # morceau par morceau avec le moteur "exact" (l'etat est garde d'un morceau au suivant) pendant l'envoi ,
+    # la memoire ne depend pas de t_max (au plus STREAM_MAX_POINTS instants).
+    # Un modele creux est simule par le schema des trapezes (une resolution LU par instant) sur au plus
+    # TIME_GRID_MAX_POINTS instants
+    def stream(self, system: Union[TransferFunction, StateSpace], t_max: float, kind: str):
+        entry = self.cache.entry(system)
+        ss = entry.as_ss()
+        siso = ss.noutputs == 1 and ss.ninputs == 1
+        if entry.is_sparse():
+            segments = adaptive_segments(entry.poles(), t_max, settings.TIME_GRID_MAX_POINTS)
+            chunks = stream_sparse(ss, segments, kind, settings.STREAM_CHUNK_POINTS)
+        else:
+            A, B, C, D = (np.asarray(matrix, dtype=float) for matrix in (ss.A, ss.B, ss.C, ss.D))
+            segments = adaptive_segments(entry.poles(), t_max, settings.STREAM_MAX_POINTS)
+
+            def discretization(step: float):
+                return entry.get(f"discretization:{float(step)!r}", lambda: discretize(A, B, step))
+
+            chunks = stream_exact(A, B, C, D, segments, kind, settings.STREAM_CHUNK_POINTS, discretization)
+
+        def lines():
+            yield {"kind": kind, "points": sum(count for _, _, count in segments) + 1, "outputs": ss.noutputs,
+                   "inputs": ss.ninputs, "chunk": settings.STREAM_CHUNK_POINTS}
+            try:
+                for time, responses in chunks:
+                    yield arrays_to_json({"time": time, "response": responses[0, 0] if siso else responses})
+            except ValueError as err:
+                # le code HTTP est deja envoye , l'erreur est la derniere ligne du flux
+                yield {"error": str(err)}
+
+        return encode_ndjson(lines())
+
+    # simulation avec python-control segment par segment , l'etat final d'un segment est l'etat initial du suivant
+    def simulate_control(self, ss: StateSpace, grid: TimeGrid, kind: str) -> np.ndarray:
+        responses = np.empty((ss.noutputs, ss.ninputs, len(grid)))
+        for j in range(ss.ninputs):
+            channel = ctrl.ss(ss.A, ss.B[:, j:j + 1], ss.C, ss.D[:, j:j + 1])
+            state = ss.B[:, j] if kind == "impulse" else np.zeros(ss.nstates)
+            start = 0
+            for i, segment in enumerate(grid.segments):
+                if kind == "step":
+                    inputs = np.ones_like(segment)
+                elif kind == "ramp":
+                    inputs = segment
+                else:
+                    inputs = np.zeros_like(segment)
+                result = ctrl.forced_response(channel, T=segment, U=inputs, X0=state, return_x=True)
+                outputs = np.reshape(result.outputs, (ss.noutputs, len(segment)))
+                # le premier point d'un segment est deja le dernier point du segment precedent
+                skip = 0 if i == 0 else 1
+                responses[:, j, start:start + len(segment) - skip] = outputs[:, skip:]
+                start += len(segment) - skip
+                state = np.reshape(result.states, (ss.nstates, len(segment)))[:, -1]
+        return responses
+
+
+# une seule instance partagee par les routeurs , les analyses et les jobs
+service = Service()
@@ -0,0 +1,190 @@
+import json
+
+import numpy as np
+from flask import Response
+
+from base.base_service import BaseService
+from config import settings
+from helpers.batch_lti import pad_polynomial, poly_from_roots, roots_batch, settling_horizons, step_response_batch, \
+    stability_margins_batch
+from helpers.data_encoder import encode_binary
+from helpers.metrics import timed
+from helpers.sanitize_data import sanitize_data
+from helpers.step_metrics import step_metrics
+from helpers.system_cache import normalize_matrix
+
+# Service de la route /sweep : une famille de modeles (un modele de base dont certains coefficients varient)
+# est evaluee en une seule requete avec des calculs vectorises (voir helpers/batch_lti.py) :
+# poles , caracteristiques de la reponse indicielle et marges de stabilite de chaque candidat.
+# Tous les candidats sont ramenes a des fonctions de transfert de meme ordre , un modele d'etat SISO
+# est converti pour toute la famille avec des valeurs propres empilees :
+#   den(s) = det(sI - A) , num(s) = det(sI - A + B C) - det(sI - A) + D det(sI - A)
+# Le resultat est un tableau compact : une ligne par candidat , une colonne par parametre ou grandeur.
+
+
+class SweepService(BaseService):
+    def __init__(self):
+        super().__init__()
+
+    @timed("sweep")
+    def sweep_tf(self, num, den, data: dict, output_format: str = "json") -> Response:
+        names, values = self.family(data["parameters"], data["mode"])
+        length = max(len(num), len(den))
+        num_family = np.tile(pad_polynomial(num, length), (len(values[0]), 1))
+        den_family = np.tile(pad_polynomial(den, length), (len(values[0]), 1))
+        gain = np.ones(len(values[0]))
+        for parameter, value in zip(data["parameters"], values):
+            target = parameter["target"]
+            if target == "gain":
+                gain = gain * value
+                continue
+            coefficients = num if target == "num" else den
+            index = parameter["index"]
+            if not 0 <= index < len(coefficients):
+                raise ValueError(f"{target} index {index} is out of range.")
+            family = num_family if target == "num" else den_family
+            family[:, length - len(coefficients) + index] = value
+        return self.evaluate(names, values, num_family, den_family, gain, data, output_format)
+
+    @timed("sweep")
+    def sweep_ss(self, A, B, C, D, data: dict, output_format: str = "json") -> Response:
+        matrices = {name: normalize_matrix(matrix) for name, matrix in zip("ABCD", (A, B, C, D))}
+        if matrices["B"].shape[1] != 1 or matrices["C"].shape[0] != 1:
+            raise ValueError("Sweeps are only available for SISO state-space models.")
+        names, values = self.family(data["parameters"], data["mode"])
+        count = len(values[0])
+        families = {name: np.repeat(matrix[None], count, axis=0) for name, matrix in matrices.items()}
+        gain = np.ones(count)
+        for parameter, value in zip(data["parameters"], values):
+            target = parameter["target"]
+            if target == "gain":
+                gain = gain * value
+                continue
+            if target not in families:
+                raise ValueError(f"{target} is not a state-space matrix.")
+            row, column = parameter["index"]
+            shape = matrices[target].shape
+            if not (0 <= row < shape[0] and 0 <= column < shape[1]):
+                raise ValueError(f"{target} index [{row}, {column}] is out of range.")
+            families[target][:, row, column] = value
+
+        # passage en fonction de transfert avec les valeurs propres de A et de A - B C
+        den_family = poly_from_roots(np.linalg.eigvals(families["A"]))
+        coupled = families["A"] - families["B"] @ families["C"]
+        num_family = poly_from_roots(np.linalg.eigvals(coupled)) - den_family + families["D"][:, 0] * den_family
+        return self.evaluate(names, values, num_family, den_family, gain, data, output_format)
+
+    # valeurs de chaque parametre , puis combinaison (grille ou zip) : une colonne (N ,) par parametre
+    def family(self, parameters: list, mode: str):
+        # nombre de candidats verifie avant de construire les plages : un count enorme ne doit pas etre alloue
+        lengths = [len(parameter["values"]) if "values" in parameter else parameter["count"]
+                   for parameter in parameters]
+        if mode == "zip":
+            if len(set(lengths)) != 1:
+                raise ValueError("All parameters must have the same number of values in zip mode.")
+            count = lengths[0]
+        else:
+            count = 1
+            for length in lengths:
+                count *= length  # entiers python : pas de depassement
+        if count > settings.SWEEP_MAX_CANDIDATES:
+            raise ValueError(f"A sweep is limited to {settings.SWEEP_MAX_CANDIDATES} candidates ({count} requested).")
+
+        names = []
+        ranges = []
+        for parameter in parameters:
+            if "values" in parameter:
+                values = np.asarray(parameter["values"], dtype=float)
+            elif parameter["scale"] == "log":
+                values = np.geomspace(parameter["start"], parameter["stop"], parameter["count"])
+            else:
+                values = np.linspace(parameter["start"], parameter["stop"], parameter["count"])
+            ranges.append(values)
+            names.append(parameter.get("name") or self.parameter_name(parameter))
+
+        if mode == "grid":
+            ranges = [grid.ravel() for grid in np.meshgrid(*ranges, indexing="ij")]
+        return names, ranges
+
+    def parameter_name(self, parameter: dict) -> str:
+        if parameter["target"] == "gain":
+            return "gain"
+        index = parameter["index"]
+        if isinstance(index, list):
+            return f"{parameter['target']}[{index[0]}][{index[1]}]"
+        return f"{parameter['target']}[{index}]"
+
+    def evaluate(self, names: list, values: list, num: np.ndarray, den: np.ndarray, gain: np.ndarray, data: dict,
+                 output_format: str) -> Response:
+        # boucle ouverte L = K G , et le systeme etudie (boucle ouverte ou fermee K G / (1 + K G))
+        loop_num = num * gain[:, None]
+        system_num, system_den = (loop_num, den + loop_num) if data["closed_loop"] else (loop_num, den)
+        # les colonnes de tete nulles pour toute la famille ne changent pas l'ordre des systemes
+        leading = min(np.argmax(np.any(system_den != 0, axis=0)), np.argmax(np.any(den != 0, axis=0)))
+        system_num, system_den = system_num[:, leading:], system_den[:, leading:]
+        loop_num, loop_den = loop_num[:, leading:], den[:, leading:]
+
+        columns = dict(zip(names, values))
+        poles = np.sort_complex(roots_batch(system_den))
+        valid = np.isfinite(poles).all(axis=1) & (system_den[:, 0] != 0)
+        columns["valid"] = valid.astype(float)
+        columns["stable"] = (valid & (poles.real < 0).all(axis=1)).astype(float)
+
+        if "poles" in data["metrics"]:
+            for i in range(poles.shape[1]):
+                columns[f"pole_{i}_real"] = poles[:, i].real
+                columns[f"pole_{i}_imag"] = poles[:, i].imag
+
+        # les reponses et les marges sont calculees par blocs pour limiter la memoire
+        block = settings.SWEEP_BLOCK_SIZE
+        if "step" in data["metrics"]:
+            horizon = settling_horizons(poles)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                final_value = system_num[:, -1] / system_den[:, -1]
+            metrics = {}
+            for start in range(0, len(valid), block):
+                rows = slice(start, start + block)
+                time, response = step_response_batch(system_num[rows], system_den[rows], horizon[rows],
+                                                     settings.SWEEP_TIME_POINTS)
+                for name, value in step_metrics(time, response, final_value[rows], data.get("settling_band")).items():
+                    metrics.setdefault(name, []).append(value)
+            columns.update({name: np.concatenate(value) for name, value in metrics.items()})
+
+        if "margins" in data["metrics"]:
+            omega = self.frequency_grid(loop_num, loop_den)
+            margins = {}
+            for start in range(0, len(valid), block):
+                rows = slice(start, start + block)
+                for name, value in stability_margins_batch(loop_num[rows], loop_den[rows], omega).items():
+                    margins.setdefault(name, []).append(value)
+            columns.update({name: np.concatenate(value) for name, value in margins.items()})
+
+        return self.table(columns, output_format, data.get("dtype", "float64"))
+
+    # grille log commune a toute la famille : 2 decades autour des poles et zeros de la boucle ouverte
+    def frequency_grid(self, num: np.ndarray, den: np.ndarray) -> np.ndarray:
+        leading = np.argmax(np.any(num != 0, axis=0))
+        roots = np.concatenate([roots_batch(den).ravel(), roots_batch(num[:, leading:]).ravel()])
+        magnitude = np.abs(roots[np.isfinite(roots)])
+        magnitude = magnitude[magnitude > 0]
+        start, stop = (-2.0, 2.0)
+        if magnitude.size:
+            start = np.floor(np.log10(magnitude.min())) - 2
+            stop = np.ceil(np.log10(magnitude.max())) + 2
+        points = int(min(np.ceil((stop - start) * settings.SWEEP_FREQUENCY_POINTS_PER_DECADE) + 1,
+                         settings.SWEEP_MAX_FREQUENCY_POINTS))
+        return np.logspace(start, stop, points)
+
+    # tableau compact : {"columns": [...], "rows": [[...], ...]} ou une colonne par tableau en binaire
+    def table(self, columns: dict, output_format: str, dtype: str = "float64") -> Response:
+        if output_format == "binary":
+            return encode_binary(columns, dtype)
+        matrix = np.column_stack(list(columns.values()))
+        rows = matrix.tolist()
+        if not np.isfinite(matrix).all():
+            rows = sanitize_data(rows)
+        body = {"columns": list(columns), "count": len(rows), "rows": rows}
+        return Response(json.dumps(body, separators=(",", ":")), mimetype="application/json")
+
+
+sweep_service = SweepService()
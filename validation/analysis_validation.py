@@ -0,0 +1,45 @@
+from marshmallow import fields, validate, validates_schema, ValidationError
+
+from validation.options_validation import PerformanceOptions, SimulationOptions, RenderOptions
+
+# Options de la route /analyze (ss_router et tf_router) , le modele (A , B , C , D ou num , den)
+# est valide par les classes de state_space_validation.py et transfer_function_validation.py
+# - analyses : liste des analyses demandees (au moins une)
+# - format : "svg" (les graphiques sont des images svg) ou "json" (les graphiques sont des tableaux) ,
+#   un autre format demande par l'entete Accept (binary , ndjson) repond 406
+# - t_max : duree des reponses temporelles , si absent la duree de stabilisation du systeme est utilisee
+# - x_axis , y_axis : limites des graphiques temporels (comme /step) , calculees si absentes
+# - frequency_axis : [a , b] , decades du diagramme de bode (comme x_axis de /bode)
+# - settling_band : bande de stabilisation de step_performance (voir validation/options_validation.py)
+# - engine : moteur de simulation des reponses temporelles (voir validation/options_validation.py)
+# - renderer , simplify : ecriture des graphiques svg (voir validation/options_validation.py)
+
+ANALYSES = (
+    "poles_zeros",
+    "step",
+    "impulse",
+    "ramp",
+    "bode",
+    "nyquist",
+    "step_performance",
+    "bode_performance",
+    "close_loop",
+    "convert",
+)
+ANALYSIS_FORMATS = ("svg", "json")
+
+
+class AnalysisOptions(RenderOptions, PerformanceOptions, SimulationOptions):
+    analyses = fields.List(fields.String(validate=validate.OneOf(ANALYSES)), required=True,
+                           validate=validate.Length(min=1))
+    format = fields.String(validate=validate.OneOf(ANALYSIS_FORMATS))
+    t_max = fields.Float(validate=validate.Range(min=0, min_inclusive=False))
+    x_axis = fields.List(fields.Float, validate=validate.Length(equal=2))
+    y_axis = fields.List(fields.Float, validate=validate.Length(equal=2))
+    frequency_axis = fields.List(fields.Float, load_default=[-1, 2], validate=validate.Length(equal=2))
+
+    @validates_schema
+    def validate_analysis_ranges(self, data, **kwargs):
+        for name in ("x_axis", "y_axis", "frequency_axis"):
+            if name in data and data[name][0] >= data[name][1]:
+                raise ValidationError(f"{name} must define a valid range: [min, max] with min < max.")
@@ -0,0 +1,45 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError, INCLUDE
+
+from config import settings
+
+# Validation de la route POST /jobs : une analyse (une route de ss_router ou tf_router) executee en arriere-plan
+# - model : "tf" ou "ss"
+# - analysis : la route appelee sans le prefixe (step , bode , step/performance , analyze , sweep , reduce ...)
+# - payload : le corps JSON qui serait envoye a la route , il est valide par la route elle-meme dans le job
+# - timeout : duree maximale du calcul en secondes (JOBS_DEFAULT_TIMEOUT si absent , au plus JOBS_MAX_TIMEOUT)
+
+COMMON_ANALYSES = (
+    "step",
+    "impulse",
+    "ramp",
+    "bode",
+    "nyquist",
+    "poles_zeros_map",
+    "step/performance",
+    "bode/performance",
+    "close_loop",
+    "analyze",
+    "sweep",
+)
+JOB_ANALYSES = {
+    "tf": COMMON_ANALYSES + ("tf_to_ss",),
+    "ss": COMMON_ANALYSES + ("ss_to_tf", "bode/opt", "reduce"),
+}
+
+
+class JobInput(Schema):
+    model = fields.String(required=True, validate=validate.OneOf(tuple(JOB_ANALYSES)))
+    analysis = fields.String(required=True)
+    payload = fields.Dict(required=True)
+    timeout = fields.Float(validate=validate.Range(min=0, min_inclusive=False))
+
+    class Meta:
+        unknown = INCLUDE
+
+    @validates_schema
+    def validate_job(self, data, **kwargs):
+        model = data.get("model")
+        if model in JOB_ANALYSES and data.get("analysis") not in JOB_ANALYSES[model]:
+            raise ValidationError(f"analysis must be one of: {', '.join(JOB_ANALYSES[model])}.")
+        if data.get("timeout", 0) > settings.JOBS_MAX_TIMEOUT:
+            raise ValidationError(f"timeout must be at most {settings.JOBS_MAX_TIMEOUT} seconds.")
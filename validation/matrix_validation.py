@@ -0,0 +1,119 @@
+import numpy as np
+from marshmallow import Schema, fields, validates_schema, ValidationError
+from scipy import sparse
+
+from config import settings
+from helpers.matrix_codec import check_shape, decode_base64_matrix, decode_coo_matrix
+
+# Matrices des modeles d'etat (A , B , C , D) lues directement en tableaux numpy :
+# la liste de listes du JSON est convertie en une seule fois (np.array) en tableau float64 contigu ,
+# la forme et les valeurs non finies sont verifiees sur le tableau , sans un appel python par element.
+# Les matrices peuvent aussi etre des tableaux deja decodes (corps binaire) , du base64 ou des matrices creuses
+# au format COO (scipy.sparse , voir helpers/matrix_codec.py et helpers/sparse_lti.py).
+# Si la conversion rapide echoue (texte , booleen , valeur non finie , lignes de longueurs differentes ...) ,
+# la valeur est validee par fields.List(fields.List(fields.Float)) comme avant : memes messages d'erreur.
+
+
+class Matrix(fields.Field):
+    default_error_messages = {
+        "ragged": "All rows must have the same length.",
+        "invalid_array": "Must be a finite 2-D numeric array.",
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # validation element par element , seulement pour les erreurs et les cas rares (nombres en texte)
+        self.fallback = fields.List(fields.List(fields.Float))
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        # matrice deja decodee d'un corps binaire , envoyee en base64 ou creuse (voir helpers/matrix_codec.py)
+        if isinstance(value, dict):
+            try:
+                value = decode_coo_matrix(value) if "row" in value else decode_base64_matrix(value)
+            except ValueError as err:
+                raise ValidationError(str(err))
+        if sparse.issparse(value):
+            self.check_size(value.shape, attr)
+            return value
+        if isinstance(value, np.ndarray):
+            if value.ndim != 2 or value.dtype.kind not in "iuf" or not np.isfinite(value).all():
+                raise self.make_error("invalid_array")
+            self.check_size(value.shape, attr)
+            return np.ascontiguousarray(value, dtype=np.float64)
+
+        array = fast_matrix(value)
+        if array is None:
+            rows = self.fallback.deserialize(value, attr, data, **kwargs)
+            if len({len(row) for row in rows}) > 1:
+                raise self.make_error("ragged")
+            array = np.array(rows, dtype=np.float64)
+        if array.ndim < 2:
+            array = array.reshape(0, 0)
+        return np.ascontiguousarray(array)
+
+    # forme limitee a SPARSE_MAX_STATES lignes et colonnes , B , C et D creuses sont rendues denses avec le modele :
+    # leur taille dense ne peut pas depasser celle d'un corps accepte (MAX_CONTENT_LENGTH)
+    def check_size(self, shape, attr):
+        try:
+            check_shape(shape)
+        except ValueError as err:
+            raise ValidationError(str(err))
+        if attr != "A" and shape[0] * shape[1] * 8 > settings.MAX_CONTENT_LENGTH:
+            raise ValidationError(f"{attr} is too large once dense: shape {list(shape)}.")
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        if sparse.issparse(value):
+            value = value.toarray()
+        return None if value is None else np.asarray(value).tolist()
+
+
+# tableau float64 a deux dimensions et fini , None si la valeur doit passer par la validation element par element
+def fast_matrix(value):
+    if not isinstance(value, list):
+        return None
+    try:
+        array = np.array(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if array.dtype.kind not in "iuf" or array.ndim != 2:
+        return None
+    array = array.astype(np.float64, copy=False)
+    if not np.isfinite(array).all():
+        return None
+    return array
+
+
+# Modele d'etat : matrices et coherence des dimensions (memes messages que python-control ,
+# mais l'erreur est un 400 de validation au lieu d'une exception pendant la construction du modele)
+class StateSpaceMatrices(Schema):
+    A = Matrix(required=True)  # Matrix A (list of lists of floats)
+    B = Matrix(required=True)  # Matrix B (list of lists of floats)
+    C = Matrix(required=True)  # Matrix C (list of lists of floats)
+    D = Matrix(required=True)  # Matrix D (list of lists of floats)
+
+    @validates_schema
+    def validate_dimensions(self, data, **kwargs):
+        if not all(name in data for name in "ABCD"):
+            return
+        A, B, C, D = data["A"], data["B"], data["C"], data["D"]
+        if 0 in A.shape:
+            # gain statique (aucun etat , A = [] ou [[]]) : B et C sans coefficient , D donne les entrees et sorties
+            if A.shape[0] > 1:
+                raise ValidationError("A must be square.", "A")
+            if 0 not in B.shape:
+                raise ValidationError("A and B must have the same number of rows.", "B")
+            if 0 not in C.shape:
+                raise ValidationError("A and C must have the same number of columns.", "C")
+            if C.shape[0] > 1 and C.shape[0] != D.shape[0]:
+                raise ValidationError("C and D must have the same number of rows.", "D")
+            return
+        if A.shape[0] != A.shape[1]:
+            raise ValidationError("A must be square.", "A")
+        if B.shape[0] != A.shape[0]:
+            raise ValidationError("A and B must have the same number of rows.", "B")
+        if C.shape[1] != A.shape[0]:
+            raise ValidationError("A and C must have the same number of columns.", "C")
+        if D.shape[1] != B.shape[1]:
+            raise ValidationError("B and D must have the same number of columns.", "D")
+        if D.shape[0] != C.shape[0]:
+            raise ValidationError("C and D must have the same number of rows.", "D")
@@ -0,0 +1,43 @@
+from marshmallow import Schema, fields, validate, pre_load, ValidationError, INCLUDE
+
+from helpers.model_registry import model_registry
+
+# Modeles enregistres (route /models , voir helpers/model_registry.py) :
+# - POST /models : "model" ("tf" ou "ss") et le modele (num , den ou A , B , C , D , valides par les classes
+#   de transfer_function_validation.py et state_space_validation.py)
+# - les routes de ss_router et tf_router acceptent "model_id" a la place du modele : les coefficients enregistres
+#   (deja valides) sont ajoutes a la requete avant la validation , les autres attributs sont valides comme avant
+
+MODEL_KINDS = ("tf", "ss")
+
+
+class ModelInput(Schema):
+    model = fields.String(required=True, validate=validate.OneOf(MODEL_KINDS))
+
+    class Meta:
+        unknown = INCLUDE
+
+
+class ModelReference(Schema):
+    model_kind = None  # "tf" ou "ss" , type de modele attendu par la route
+    model_id = fields.String()
+
+    @pre_load
+    def resolve_model(self, data, **kwargs):
+        if not isinstance(data, dict) or not data.get("model_id"):
+            return data
+        model = model_registry.resolve(str(data["model_id"]))
+        if model is None:
+            raise ValidationError("Unknown or expired model.", "model_id")
+        if model.kind != self.model_kind:
+            raise ValidationError(f"This route expects a {self.model_kind} model, model_id is a {model.kind} model.",
+                                  "model_id")
+        return {**data, **model.arrays}
+
+
+class StateSpaceReference(ModelReference):
+    model_kind = "ss"
+
+
+class TransferFunctionReference(ModelReference):
+    model_kind = "tf"
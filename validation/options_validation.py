@@ -0,0 +1,66 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+
+from helpers.data_encoder import FORMATS, DTYPES
+from helpers.matrix_codec import MATRIX_FORMATS
+from helpers.model_reduction import METHODS
+from helpers.simulator import ENGINES
+from helpers.svg_writer import RENDERERS, SIMPLIFICATIONS
+
+# Options communes a toutes les requetes , elles ne sont pas obligatoires :
+# - format : "svg" (image) , "json" ou "binary" (tableaux de donnees) , voir helpers/data_encoder.py
+#   si format est absent , il est choisi avec l'entete Accept de la requete
+# - dtype : precision des tableaux en format binary ("float32" ou "float64")
+
+class RequestOptions(Schema):
+    format = fields.String(validate=validate.OneOf(FORMATS))
+    dtype = fields.String(load_default="float64", validate=validate.OneOf(list(DTYPES)))
+
+
+# Options des reponses temporelles (/step , /impulse , /ramp , /step/performance , /analyze) :
+# - engine : moteur de simulation "exact" , "modal" ou "control" (voir helpers/simulator.py) ,
+#   si absent settings.SIMULATION_ENGINE est utilise
+class SimulationOptions(Schema):
+    engine = fields.String(validate=validate.OneOf(ENGINES))
+
+
+# Options des caracteristiques de la reponse indicielle (/step/performance , /analyze , /sweep) :
+# - settling_band : demi-largeur de la bande de stabilisation autour de la valeur finale (0.05 = 5%) ,
+#   si absent settings.STEP_SETTLING_BAND est utilise
+class PerformanceOptions(Schema):
+    settling_band = fields.Float(validate=validate.Range(min=0, max=1, min_inclusive=False))
+
+
+# Options des graphiques svg ecrits directement (/step , /impulse , /ramp , /bode , /analyze) :
+# - renderer : "matplotlib" ou "native" (voir helpers/svg_writer.py) , si absent settings.SVG_RENDERER est utilise
+# - simplify : simplification des courbes du renderer "native" ("none" , "rdp" ou "lttb") , settings.SVG_SIMPLIFY sinon
+class RenderOptions(Schema):
+    renderer = fields.String(validate=validate.OneOf(RENDERERS))
+    simplify = fields.String(validate=validate.OneOf(SIMPLIFICATIONS))
+
+
+# Options des conversions qui retournent un modele d'etat (/tf/tf_to_ss , /ss/close_loop) :
+# - matrix_format : "json" , "base64" , "binary" , "npz" ou "npy" (voir helpers/matrix_codec.py) ,
+#   si absent l'entete Accept ou le format du modele recu est utilise
+class MatrixOptions(Schema):
+    matrix_format = fields.String(validate=validate.OneOf(MATRIX_FORMATS))
+
+
+# Reduction d'ordre du modele d'etat avant l'analyse (voir services/reduction_service.py) :
+# - method : "truncate" (troncature equilibree) ou "matchdc" (perturbation singuliere , meme gain statique)
+# - order : ordre du modele reduit , ou tolerance : plus petit ordre dont la borne d'erreur est sous la tolerance
+#   (un seul des deux)
+class ReductionSettings(Schema):
+    method = fields.String(load_default="truncate", validate=validate.OneOf(METHODS))
+    order = fields.Integer(validate=validate.Range(min=0))
+    tolerance = fields.Float(validate=validate.Range(min=0, min_inclusive=False))
+
+    @validates_schema
+    def validate_target(self, data, **kwargs):
+        if ("order" in data) == ("tolerance" in data):
+            raise ValidationError("reduction needs exactly one of order or tolerance.")
+
+
+# Options des analyses d'un modele d'etat (/step , /impulse , /ramp , /bode , /nyquist , /performance , /analyze) :
+# - reduction : modele reduit utilise a la place du modele recu , si absent le modele n'est pas reduit
+class ReductionOptions(Schema):
+    reduction = fields.Nested(ReductionSettings)
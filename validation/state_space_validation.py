@@ -1,4 +1,11 @@
-from marshmallow import Schema, fields, validate, validates_schema, ValidationError, INCLUDE
+from marshmallow import fields, validate, validates_schema, ValidationError, INCLUDE
+
+from validation.analysis_validation import AnalysisOptions
+from validation.matrix_validation import StateSpaceMatrices
+from validation.model_validation import StateSpaceReference
+from validation.sweep_validation import SweepOptions
+from validation.options_validation import RequestOptions, PerformanceOptions, SimulationOptions, RenderOptions, \
+    MatrixOptions, ReductionOptions, ReductionSettings
 
 # Bibliotheque marshmallow est utilise pour la validation des requette HTTP
 
@@ -6,11 +13,11 @@ from marshmallow import Schema, fields, validate, validates_schema, ValidationEr
 # tous les attribus sont des fields required ( necessaires ) ,
 # si une ou plus ne sont pas disponibles , la requete est refuse
 
-class StateSpacePlotInput(Schema):
-    A = fields.List(fields.List(fields.Float), required=True)  # Matrix A (list of lists of floats)
-    B = fields.List(fields.List(fields.Float), required=True)  # Matrix B (list of lists of floats)
-    C = fields.List(fields.List(fields.Float), required=True)  # Matrix C (list of lists of floats)
-    D = fields.List(fields.List(fields.Float), required=True)  # Matrix D (list of lists of floats)
+# Les matrices A , B , C et D sont lues en tableaux numpy et leurs dimensions sont verifiees
+# (voir validation/matrix_validation.py) , ou elles sont remplacees par "model_id" (modele enregistre ,
+# voir validation/model_validation.py)
+
+class StateSpacePlotInput(ReductionOptions, StateSpaceReference, StateSpaceMatrices, RequestOptions):
     t_max = fields.Float(required=True, validate=validate.Range(min=0))  # t_max (float value)
 
     class Meta:
@@ -18,7 +25,7 @@ class StateSpacePlotInput(Schema):
 
 
 # Cette Classe de validation herite StateSpacePlotInput et ajoute deux autre attribus necessaires y_axis et x_axis
-class StateSpacePlotInputWithAxis(StateSpacePlotInput):
+class StateSpacePlotInputWithAxis(RenderOptions, SimulationOptions, StateSpacePlotInput):
     # Adding x_axis and y_axis fields
     x_axis = fields.List(fields.Float, required=True, validate=validate.Length(equal=2))  # Range for x-axis
     y_axis = fields.List(fields.Float, required=True, validate=validate.Length(equal=2))  # Range for y-axis
@@ -32,11 +39,41 @@ class StateSpacePlotInputWithAxis(StateSpacePlotInput):
         if "y_axis" in data and data["y_axis"][0] >= data["y_axis"][1]:
             raise ValidationError("y_axis must define a valid range: [min, max] with min < max.")
 
-class StateSpaceInput(Schema):
-    A = fields.List(fields.List(fields.Float), required=True)  # Matrix A (list of lists of floats)
-    B = fields.List(fields.List(fields.Float), required=True)  # Matrix B (list of lists of floats)
-    C = fields.List(fields.List(fields.Float), required=True)  # Matrix C (list of lists of floats)
-    D = fields.List(fields.List(fields.Float), required=True)  # Matrix D (
-
+class StateSpaceInput(StateSpaceReference, StateSpaceMatrices, RequestOptions):
     class Meta:
-        unknown = INCLUDE  # ne refuse pas la requette si il ya des attribus supplementaires dans le requette
\ No newline at end of file
+        unknown = INCLUDE  # ne refuse pas la requette si il ya des attribus supplementaires dans le requette
+
+
+# modele + options de la route /analyze (voir validation/analysis_validation.py)
+class StateSpaceAnalysisInput(ReductionOptions, AnalysisOptions, StateSpaceInput):
+    pass
+
+
+# modele de base + parametres de la route /sweep (voir validation/sweep_validation.py)
+class StateSpaceSweepInput(SweepOptions, StateSpaceInput):
+    pass
+
+
+# modele + bande de stabilisation et moteur de simulation de la route /step/performance
+class StateSpacePerformanceInput(ReductionOptions, PerformanceOptions, SimulationOptions, StateSpaceInput):
+    pass
+
+
+# modele + options du renderer svg de la route /bode
+class StateSpaceBodeInput(RenderOptions, StateSpacePlotInput):
+    pass
+
+
+# modele + format des matrices de la reponse de la route /close_loop
+class StateSpaceConversionInput(MatrixOptions, StateSpaceInput):
+    pass
+
+
+# modele + reduction d'ordre de la route /bode/performance
+class StateSpaceBodePerformanceInput(ReductionOptions, StateSpaceInput):
+    pass
+
+
+# modele + reduction (obligatoire) et format des matrices de la reponse de la route /reduce
+class StateSpaceReductionInput(MatrixOptions, StateSpaceInput):
+    reduction = fields.Nested(ReductionSettings, required=True)
@@ -0,0 +1,54 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError, INCLUDE
+
+from config import settings
+from validation.options_validation import PerformanceOptions
+
+# Options de la route /sweep (ss_router et tf_router) : un modele de base + des plages de parametres
+# - parameters : liste de parametres , chaque parametre modifie un coefficient du modele :
+#     target "gain"            : gain K de la boucle ouverte K * G(s)
+#     target "num" ou "den"    : coefficient num[index] ou den[index] (index dans la liste envoyee)
+#     target "A" , "B" , "C" , "D" : element [i , j] de la matrice (index = [i, j])
+#   les valeurs sont donnees avec "values" , ou avec "start" , "stop" , "count" et "scale" ("linear" ou "log")
+# - mode : "grid" (toutes les combinaisons des parametres) ou "zip" (les parametres varient ensemble)
+# - closed_loop : les poles et la reponse indicielle sont ceux de la boucle fermee K G / (1 + K G)
+# - metrics : les colonnes calculees , "poles" , "step" et / ou "margins"
+# - settling_band : bande du temps de stabilisation des colonnes "step" (voir validation/options_validation.py)
+# - format : "json" (tableau colonnes / lignes) ou "binary" (une colonne par tableau , voir helpers/data_encoder.py)
+
+SWEEP_TARGETS = ("gain", "num", "den", "A", "B", "C", "D")
+SWEEP_METRICS = ("poles", "step", "margins")
+SWEEP_FORMATS = ("json", "binary")
+
+
+class SweepParameter(Schema):
+    name = fields.String()
+    target = fields.String(required=True, validate=validate.OneOf(SWEEP_TARGETS))
+    index = fields.Raw()
+    values = fields.List(fields.Float, validate=validate.Length(min=1))
+    start = fields.Float()
+    stop = fields.Float()
+    count = fields.Integer(validate=validate.Range(min=1, max=settings.SWEEP_MAX_CANDIDATES))
+    scale = fields.String(load_default="linear", validate=validate.OneOf(("linear", "log")))
+
+    @validates_schema
+    def validate_parameter(self, data, **kwargs):
+        if "values" not in data and not all(name in data for name in ("start", "stop", "count")):
+            raise ValidationError("A parameter needs values or start, stop and count.")
+        if data.get("scale") == "log" and "values" not in data and (data["start"] <= 0 or data["stop"] <= 0):
+            raise ValidationError("A log scale needs start > 0 and stop > 0.")
+        target = data.get("target")
+        index = data.get("index")
+        if target in ("num", "den") and not isinstance(index, int):
+            raise ValidationError(f"A {target} parameter needs an integer index.")
+        if target in ("A", "B", "C", "D") and not (
+                isinstance(index, list) and len(index) == 2 and all(isinstance(i, int) for i in index)):
+            raise ValidationError(f"A {target} parameter needs an index [row, column].")
+
+
+class SweepOptions(PerformanceOptions):
+    parameters = fields.List(fields.Nested(SweepParameter, unknown=INCLUDE), required=True,
+                             validate=validate.Length(min=1))
+    mode = fields.String(load_default="grid", validate=validate.OneOf(("grid", "zip")))
+    closed_loop = fields.Boolean(load_default=False)
+    metrics = fields.List(fields.String(validate=validate.OneOf(SWEEP_METRICS)), load_default=list(SWEEP_METRICS))
+    format = fields.String(validate=validate.OneOf(SWEEP_FORMATS))
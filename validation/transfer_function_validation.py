@@ -1,8 +1,14 @@
-from marshmallow import Schema, fields, validate, validates_schema, ValidationError, INCLUDE
+from marshmallow import fields, validate, validates_schema, ValidationError, INCLUDE
+
+from validation.analysis_validation import AnalysisOptions
+from validation.model_validation import TransferFunctionReference
+from validation.sweep_validation import SweepOptions
+from validation.options_validation import RequestOptions, PerformanceOptions, SimulationOptions, RenderOptions, \
+    MatrixOptions
 
 # Une bonne description sur la validation est faites dans le fichier state_space_validation.py ou dans /docs/routers.md
 
-class TransferFunctionPlotInput(Schema):
+class TransferFunctionPlotInput(TransferFunctionReference, RequestOptions):
     num = fields.List(fields.Float, required=True)  # Numerator coefficients of the transfer function
     den = fields.List(fields.Float, required=True)  # Denominator coefficients of the transfer function
     t_max = fields.Float(required=True, validate=validate.Range(min=0))  # t_max (float value)
@@ -24,7 +30,7 @@ class TransferFunctionPlotInput(Schema):
                 raise ValidationError("The degree of the denominator must be greater than or equal to the numerator.")
 
 
-class TransferFunctionPlotInputWithAxis(TransferFunctionPlotInput):
+class TransferFunctionPlotInputWithAxis(RenderOptions, SimulationOptions, TransferFunctionPlotInput):
     x_axis = fields.List(fields.Float, required=True, validate=validate.Length(equal=2))  # Range for x-axis
     y_axis = fields.List(fields.Float, required=True, validate=validate.Length(equal=2))  # Range for y-axis
 
@@ -38,9 +44,34 @@ class TransferFunctionPlotInputWithAxis(TransferFunctionPlotInput):
             raise ValidationError("y_axis must define a valid range: [min, max] with min < max.")
 
 
-class TransferFunctionInput(Schema):
+class TransferFunctionInput(TransferFunctionReference, RequestOptions):
     num = fields.List(fields.Float, required=True)  # Numerator coefficients of the transfer function
     den = fields.List(fields.Float, required=True)  # Denominator coefficients of the transfer function
 
     class Meta:
         unknown = INCLUDE  # This will allow unknown fields in the payload
+
+
+# modele + options de la route /analyze (voir validation/analysis_validation.py)
+class TransferFunctionAnalysisInput(AnalysisOptions, TransferFunctionInput):
+    pass
+
+
+# modele de base + parametres de la route /sweep (voir validation/sweep_validation.py)
+class TransferFunctionSweepInput(SweepOptions, TransferFunctionInput):
+    pass
+
+
+# modele + bande de stabilisation et moteur de simulation de la route /step/performance
+class TransferFunctionPerformanceInput(PerformanceOptions, SimulationOptions, TransferFunctionInput):
+    pass
+
+
+# modele + options du renderer svg de la route /bode
+class TransferFunctionBodeInput(RenderOptions, TransferFunctionPlotInput):
+    pass
+
+
+# modele + format des matrices de la reponse de la route /tf_to_ss (voir helpers/matrix_codec.py)
+class TransferFunctionConversionInput(MatrixOptions, TransferFunctionInput):
+    pass